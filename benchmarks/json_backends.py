@@ -0,0 +1,79 @@
+# -*- coding:utf-8 -*-
+"""
+Compare installed json backends on fixtures from tests/*/fixtures:
+decoding of fixtures, encoding of decoded fixtures and encoding
+of list result with libcloud objects.
+
+Usage: python benchmarks/json_backends.py [iterations]
+"""
+import glob
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from libcloud.compute.base import Node, NodeState
+
+from libcloud_rest import json_codec
+from libcloud_rest.api.entries import ListEntry
+
+
+def load_fixtures():
+    fixtures = []
+    for fixtures_dir in sorted(glob.glob(os.path.join(ROOT, 'tests', '*',
+                                                      'fixtures'))):
+        for root, dirs, files in os.walk(fixtures_dir):
+            dirs.sort()
+            for file_name in sorted(files):
+                if not file_name.endswith('.json'):
+                    continue
+                fh = open(os.path.join(root, file_name))
+                try:
+                    fixtures.append(fh.read())
+                finally:
+                    fh.close()
+    return fixtures
+
+
+def measure(function, iterations):
+    results = []
+    for _ in range(3):
+        start = time.time()
+        for _ in xrange(iterations):
+            function()
+        results.append(time.time() - start)
+    return min(results) * 1000
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    fixtures = load_fixtures()
+    decoded = [json_codec.json.loads(fixture) for fixture in fixtures]
+    nodes = [Node(str(i), 'node%d' % (i), NodeState.RUNNING,
+                  ['10.0.%d.%d' % (i / 250, i % 250)], [], None,
+                  extra={'index': i})
+             for i in range(1000)]
+    list_entry = ListEntry('', 'C{list} of L{Node}', '', True)
+    print '%d fixtures, %d bytes, %d iterations' % (
+        len(fixtures), sum(len(f) for f in fixtures), iterations)
+    print '%-16s %12s %12s %16s' % ('backend', 'loads, ms', 'dumps, ms',
+                                    '1000 nodes, ms')
+    for backend in json_codec.BACKENDS + [None]:
+        try:
+            json_codec.set_backend(backend)
+        except ValueError:
+            print '%-16s %12s' % (backend, 'not installed')
+            continue
+        backend = json_codec.get_backend()
+        loads = lambda: [json_codec.loads(f) for f in fixtures]
+        dumps = lambda: [json_codec.dumps(d) for d in decoded]
+        render = lambda: list_entry.to_json(nodes)
+        print '%-16s %12.1f %12.1f %16.1f' % (
+            backend, measure(loads, iterations), measure(dumps, iterations),
+            measure(render, iterations / 20 or 1))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+# -*- coding:utf-8 -*-
+"""
+Measure encoding of list results to json: time of whole list
+and time before first response chunk is ready.
+Legacy is encoding of every object, parsing it back and encoding whole list.
+
+Usage: python benchmarks/list_encoding.py [objects]
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from libcloud.compute.base import Node, NodeState
+
+from libcloud_rest.api.entries import ListEntry
+from libcloud_rest.utils import json
+
+
+def legacy_to_json(entry, obj_list):
+    data = [json.loads(entry.object_entry.to_json(obj)) for obj in obj_list]
+    return json.dumps(data)
+
+
+def get_nodes(count):
+    return [Node(str(i), 'node%d' % (i), NodeState.RUNNING,
+                 ['10.0.%d.%d' % (i / 250, i % 250)], [], None)
+            for i in range(count)]
+
+
+def measure(function, *args):
+    start = time.time()
+    function(*args)
+    return (time.time() - start) * 1000
+
+
+def first_chunk(entry, obj_list):
+    next(entry.iter_json(obj_list))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    entry = ListEntry('result', 'C{list} of L{Node}', '', True)
+    nodes = get_nodes(count)
+    print '%-20s %12s' % ('%d nodes' % (count), 'ms')
+    print '%-20s %12.1f' % ('legacy', measure(legacy_to_json, entry, nodes))
+    print '%-20s %12.1f' % ('to_json', measure(entry.to_json, nodes))
+    print '%-20s %12.1f' % ('first chunk', measure(first_chunk, entry, nodes))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+# -*- coding:utf-8 -*-
+"""
+Streamed download of fake storage objects through application:
+throughput and peak memory of process for different chunk sizes,
+and ranged download of the last MB by driver ranged download
+and by reading stream from start.
+Object content is generated by patched driver which yields the same
+chunk string, no network is used, so MB/s shows overhead of application
+per chunk and peak memory shows that it does not depend on object size.
+
+Usage: python benchmarks/object_download.py [object size, GB]
+"""
+import os
+import resource
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import mock
+from werkzeug.test import EnvironBuilder, run_wsgi_app
+import libcloud
+from libcloud.storage.base import Container, Object
+from libcloud.storage.drivers.cloudfiles import CloudFilesUSStorageDriver
+
+from libcloud_rest.api.versions import versions
+from libcloud_rest.application import LibcloudRestApp
+
+URL = versions[libcloud.__version__] + \
+    '/storage/CLOUDFILES_US/containers/bench/objects/object'
+HEADERS = {'x-auth-user': 'user', 'x-api-key': 'key'}
+MB = 1024 * 1024
+
+
+def get_object(size):
+    container = Container(name='bench', extra={}, driver=None)
+    return Object(name='object', size=size, hash='0123456789abcdef',
+                  extra={'content_type': 'application/octet-stream'},
+                  container=container, meta_data=None, driver=None)
+
+
+def generate(size, chunk_size):
+    chunk = 'x' * chunk_size
+    for _ in xrange(size // chunk_size):
+        yield chunk
+    if size % chunk_size:
+        yield chunk[:size % chunk_size]
+
+
+def download(app, obj, headers, driver_range=False):
+    """
+    @param driver_range: If True driver has ranged download
+    @return: (status, number of received bytes)
+    """
+    def get_object_mock(self, container_name, object_name):
+        return obj
+
+    def download_mock(self, obj, chunk_size=None):
+        return generate(obj.size, chunk_size)
+
+    def download_range_mock(self, obj, start, stop, chunk_size=None):
+        return generate(stop - start, chunk_size)
+
+    environ = EnvironBuilder(URL, headers=headers).get_environ()
+    with mock.patch.object(CloudFilesUSStorageDriver, 'get_object',
+                           get_object_mock):
+        with mock.patch.object(CloudFilesUSStorageDriver,
+                               'download_object_as_stream', download_mock):
+            if driver_range:
+                with mock.patch.object(CloudFilesUSStorageDriver,
+                                       'download_object_range_as_stream',
+                                       download_range_mock, create=True):
+                    return consume(app, environ)
+            return consume(app, environ)
+
+
+def consume(app, environ):
+    app_iter, status, headers = run_wsgi_app(app, environ)
+    received = 0
+    try:
+        for chunk in app_iter:
+            received += len(chunk)
+    finally:
+        if hasattr(app_iter, 'close'):
+            app_iter.close()
+    return status, received
+
+
+def max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def main():
+    size = int(float(sys.argv[1] if len(sys.argv) > 1 else 2) * 1024 * MB)
+    obj = get_object(size)
+    print 'object size %.1f GB, peak RSS on start %.1f MB' % (
+        float(size) / (1024 * MB), max_rss_mb())
+    print '%-12s %10s %10s %14s' % ('chunk size', 'seconds', 'MB/s',
+                                    'peak RSS, MB')
+    for chunk_size in (8 * 1024, 64 * 1024, MB):
+        app = LibcloudRestApp(download_chunk_size=chunk_size)
+        start = time.time()
+        status, received = download(app, obj, HEADERS)
+        seconds = time.time() - start
+        assert received == size, (status, received)
+        print '%-12d %10.2f %10.1f %14.1f' % (
+            chunk_size, seconds, received / MB / seconds, max_rss_mb())
+
+    app = LibcloudRestApp()
+    print
+    print '%-24s %10s %10s' % ('last MB', 'ms', 'bytes')
+    for name, driver_range in (('driver range', True),
+                               ('stream from start', False)):
+        headers = dict(HEADERS, Range='bytes=-%d' % (MB))
+        start = time.time()
+        status, received = download(app, obj, headers, driver_range)
+        assert received == MB, (status, received)
+        print '%-24s %10.1f %10d' % (name, (time.time() - start) * 1000,
+                                     received)
+
+
+if __name__ == '__main__':
+    main()
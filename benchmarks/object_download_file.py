@@ -0,0 +1,125 @@
+# -*- coding:utf-8 -*-
+"""
+Download of object of local storage driver through worker of prefork
+server: CPU time of worker process per GB served when file is sent
+by sendfile (wsgi.file_wrapper of worker), when file is read by Python
+file wrapper (sendfile is disabled) and when object is streamed by
+driver through Python iterators (file path of object is not used).
+Worker runs in child process, its CPU time is taken from os.wait4.
+
+Usage: python benchmarks/object_download_file.py [object size, GB]
+"""
+import httplib
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import libcloud
+
+from libcloud_rest import prefork
+from libcloud_rest.api import downloads
+from libcloud_rest.api.versions import versions
+from libcloud_rest.application import LibcloudRestApp
+from libcloud_rest.prefork import WorkerWSGIServer
+
+URL = versions[libcloud.__version__] + \
+    '/storage/LOCAL/containers/bench/objects/object'
+MB = 1024 * 1024
+REQUESTS = 3
+
+
+def create_object(base_path, size):
+    os.mkdir(os.path.join(base_path, 'bench'))
+    block = os.urandom(MB)
+    fh = open(os.path.join(base_path, 'bench', 'object'), 'wb')
+    try:
+        for _ in xrange(size // MB):
+            fh.write(block)
+        fh.write(block[:size % MB])
+    finally:
+        fh.close()
+
+
+def serve(listener, app, sendfile, file_path):
+    """
+    Fork worker which serves REQUESTS requests, application is created
+    by parent as in prefork server, so its start is not measured.
+
+    @return: pid of worker
+    """
+    pid = os.fork()
+    if pid:
+        return pid
+    status = 0
+    try:
+        prefork.sendfile = prefork.sendfile if sendfile else None
+        if not file_path:
+            downloads.get_object_file_path = lambda driver, obj: None
+        server = WorkerWSGIServer('127.0.0.1', 0, app,
+                                  listener=listener, max_requests=REQUESTS)
+        server.serve_forever()
+    except Exception:
+        status = 1
+    os._exit(status)
+
+
+def download(port, base_path):
+    connection = httplib.HTTPConnection('127.0.0.1', port)
+    connection.request('GET', URL, headers={'x-provider-key': base_path,
+                                            'x-api-key': 'secret'})
+    response = connection.getresponse()
+    assert response.status == httplib.OK, response.status
+    received = 0
+    while True:
+        data = response.read(MB)
+        if not data:
+            break
+        received += len(data)
+    connection.close()
+    return received
+
+
+def main():
+    size = int(float(sys.argv[1] if len(sys.argv) > 1 else 1) * 1024 * MB)
+    base_path = tempfile.mkdtemp()
+    try:
+        create_object(base_path, size)
+        print 'object size %.1f GB, %d downloads per case, sendfile %s' % (
+            float(size) / (1024 * MB), REQUESTS,
+            'available' if prefork.sendfile else 'is not available')
+        print '%-28s %10s %10s %16s' % ('path', 'MB/s', 'CPU, s',
+                                        'CPU per GB, s')
+        app = LibcloudRestApp()
+        cases = [('sendfile', True, True),
+                 ('file wrapper in Python', False, True),
+                 ('driver stream', False, False)]
+        for name, sendfile, file_path in cases:
+            if sendfile and prefork.sendfile is None:
+                continue
+            listener = socket.socket()
+            listener.bind(('127.0.0.1', 0))
+            listener.listen(5)
+            port = listener.getsockname()[1]
+            pid = serve(listener, app, sendfile, file_path)
+            listener.close()
+            start = time.time()
+            for _ in xrange(REQUESTS):
+                assert download(port, base_path) == size
+            seconds = time.time() - start
+            _, status, usage = os.wait4(pid, 0)
+            cpu = usage.ru_utime + usage.ru_stime
+            gigabytes = float(size) * REQUESTS / (1024 * MB)
+            print '%-28s %10.1f %10.2f %16.3f' % (
+                name, size * REQUESTS / MB / seconds, cpu, cpu / gigabytes)
+    finally:
+        shutil.rmtree(base_path)
+
+
+if __name__ == '__main__':
+    main()
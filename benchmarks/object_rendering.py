@@ -0,0 +1,91 @@
+# -*- coding:utf-8 -*-
+"""
+Compare json rendering of libcloud objects by entries with legacy
+encoder which looks up entry and its render_attrs for every object.
+Objects are rendered one by one and as list result.
+
+Usage: python benchmarks/object_rendering.py [objects]
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from libcloud.compute.base import Node, NodeState
+from libcloud.dns.base import Zone, Record
+from libcloud.dns.types import RecordType
+from libcloud.storage.base import Container, Object
+
+from libcloud_rest.api.entries import Entry, ListEntry,\
+    LibcloudObjectEntryBase
+from libcloud_rest.utils import json, DateTimeJsonEncoder
+
+
+class LegacyEntryJsonEncoder(DateTimeJsonEncoder):
+    def default(self, obj):
+        entry = LibcloudObjectEntryBase.get_entry(obj.__class__)
+        if entry:
+            return dict(((name, getattr(obj, name))
+                        for name in entry.render_attrs))
+        return super(LegacyEntryJsonEncoder, self).default(obj)
+
+
+def get_objects(count):
+    zone = Zone('1', 'example.com', 'master', 3600, None)
+    container = Container('container', {}, None)
+    return [
+        ('Node', [Node(str(i), 'node%d' % (i), NodeState.RUNNING,
+                       ['10.0.%d.%d' % (i / 250, i % 250)], [], None)
+                  for i in range(count)]),
+        ('Record', [Record(str(i), 'www%d' % (i), RecordType.A,
+                           '10.0.0.1', zone, None, {'ttl': 300})
+                    for i in range(count)]),
+        ('Object', [Object('object%d' % (i), i, 'hash', {}, {},
+                           container, None)
+                    for i in range(count)]),
+    ]
+
+
+def measure(function, *args):
+    results = []
+    for _ in range(5):
+        start = time.time()
+        function(*args)
+        results.append(time.time() - start)
+    return min(results) * 1000
+
+
+def legacy_render(obj_list):
+    encoder = LegacyEntryJsonEncoder()
+    for obj in obj_list:
+        encoder.encode(obj)
+
+
+def render(entry, obj_list):
+    for obj in obj_list:
+        entry.to_json(obj)
+
+
+def legacy_render_list(obj_list):
+    json.dumps(obj_list, cls=LegacyEntryJsonEncoder)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    print '%-8s %14s %14s %14s %14s' % (
+        '%d' % (count), 'legacy, ms', 'entry, ms',
+        'legacy list, ms', 'list entry, ms')
+    for name, obj_list in get_objects(count):
+        entry = Entry('', 'L{%s}' % (name), '')
+        list_entry = ListEntry('', 'C{list} of L{%s}' % (name), '', True)
+        print '%-8s %14.1f %14.1f %14.1f %14.1f' % (
+            name, measure(legacy_render, obj_list),
+            measure(render, entry, obj_list),
+            measure(legacy_render_list, obj_list),
+            measure(list_entry.to_json, obj_list))
+
+
+if __name__ == '__main__':
+    main()
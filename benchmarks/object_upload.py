@@ -0,0 +1,159 @@
+# -*- coding:utf-8 -*-
+"""
+Streamed upload of fake request body through application to local fake
+storage driver: throughput and peak memory of process for different
+chunk sizes, for body with Content-Length and with chunked transfer
+encoding, and for driver without chunked encoding (body is spooled
+to temporary file).
+Body is generated while it is read, driver reads uploaded data and
+drops it, so MB/s shows overhead of application (MD5 included) and peak
+memory shows that it does not depend on object size.
+
+Usage: python benchmarks/object_upload.py [object size, GB]
+"""
+import os
+import resource
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import mock
+from werkzeug.test import EnvironBuilder, run_wsgi_app
+import libcloud
+from libcloud.storage.base import Container, Object
+from libcloud.storage.drivers.cloudfiles import CloudFilesUSStorageDriver
+
+from libcloud_rest.api.versions import versions
+from libcloud_rest.application import LibcloudRestApp
+
+URL = versions[libcloud.__version__] + \
+    '/storage/CLOUDFILES_US/containers/bench/objects/object'
+HEADERS = {'x-auth-user': 'user', 'x-api-key': 'key'}
+MB = 1024 * 1024
+
+
+def generate_body(size, chunked=False):
+    """
+    Yield parts of request body, body with chunked transfer encoding
+    is framed by chunks of 1 MB.
+    """
+    block = 'x' * MB
+    frame = '%x\r\n%s\r\n' % (MB, block)
+    for _ in xrange(size // MB):
+        yield frame if chunked else block
+    if size % MB:
+        rest = block[:size % MB]
+        yield '%x\r\n%s\r\n' % (len(rest), rest) if chunked else rest
+    if chunked:
+        yield '0\r\n\r\n'
+
+
+class FakeBody(object):
+    """
+    File-like object which reads generated parts.
+    """
+
+    def __init__(self, parts):
+        self.parts = parts
+        self.buf = ''
+        self.pos = 0
+
+    def _fill(self, size):
+        while len(self.buf) - self.pos < size:
+            part = next(self.parts, None)
+            if part is None:
+                break
+            self.buf = self.buf[self.pos:] + part
+            self.pos = 0
+
+    def read(self, size):
+        self._fill(size)
+        data = self.buf[self.pos:self.pos + size]
+        self.pos += len(data)
+        return data
+
+    def readline(self, size):
+        self._fill(size)
+        index = self.buf.find('\n', self.pos, self.pos + size)
+        end = index + 1 if index >= 0 else self.pos + size
+        data = self.buf[self.pos:end]
+        self.pos += len(data)
+        return data
+
+
+def upload_via_stream(self, iterator, container, object_name, extra=None):
+    size = 0
+    for chunk in iterator:
+        size += len(chunk)
+    return Object(name=object_name, size=size, hash=None, extra={},
+                  container=container, meta_data=None, driver=self)
+
+
+def upload_file(self, file_path, container, object_name, extra=None,
+                verify_hash=True):
+    size = 0
+    fh = open(file_path, 'rb')
+    try:
+        while True:
+            data = fh.read(MB)
+            if not data:
+                break
+            size += len(data)
+    finally:
+        fh.close()
+    return Object(name=object_name, size=size, hash=None, extra={},
+                  container=container, meta_data=None, driver=self)
+
+
+def get_container(self, container_name):
+    return Container(name=container_name, extra={}, driver=self)
+
+
+def upload(app, size, chunked=False, chunked_driver=True):
+    headers = dict(HEADERS)
+    if chunked:
+        headers['Transfer-Encoding'] = 'chunked'
+    environ = EnvironBuilder(URL, method='POST',
+                             headers=headers).get_environ()
+    environ['wsgi.input'] = FakeBody(generate_body(size, chunked))
+    if not chunked:
+        environ['CONTENT_LENGTH'] = str(size)
+    with mock.patch.multiple(CloudFilesUSStorageDriver,
+                             get_container=get_container,
+                             upload_object_via_stream=upload_via_stream,
+                             upload_object=upload_file,
+                             supports_chunked_encoding=chunked_driver):
+        app_iter, status, headers = run_wsgi_app(app, environ)
+        body = ''.join(app_iter)
+    assert status.startswith('200'), (status, body)
+    return body
+
+
+def max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def main():
+    size = int(float(sys.argv[1] if len(sys.argv) > 1 else 1) * 1024 * MB)
+    print 'object size %.1f GB, peak RSS on start %.1f MB' % (
+        float(size) / (1024 * MB), max_rss_mb())
+    print '%-24s %-10s %10s %10s %14s' % ('body', 'chunk size', 'seconds',
+                                          'MB/s', 'peak RSS, MB')
+    cases = [('Content-Length', False, True),
+             ('chunked encoding', True, True),
+             ('spooled to file', False, False)]
+    for name, chunked, chunked_driver in cases:
+        for chunk_size in (8 * 1024, 64 * 1024, MB):
+            app = LibcloudRestApp(upload_chunk_size=chunk_size)
+            start = time.time()
+            upload(app, size, chunked, chunked_driver)
+            seconds = time.time() - start
+            print '%-24s %-10d %10.2f %10.1f %14.1f' % (
+                name, chunk_size, seconds, size / MB / seconds,
+                max_rss_mb())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+# -*- coding:utf-8 -*-
+"""
+Count json parse calls and measure time spent on building driver
+method arguments from request body.
+
+Driver method is replaced with no-op, so only entries pipeline is measured.
+Usage: python benchmarks/request_parsing.py [iterations]
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from libcloud.compute.drivers.cloudstack import CloudStackNodeDriver
+from libcloud.loadbalancer.drivers.rackspace import RackspaceLBDriver
+
+from libcloud_rest.api.providers import DriverMethod
+from libcloud_rest import json_codec
+
+CASES = [
+    (CloudStackNodeDriver, 'create_node',
+     {'name': 'test', 'size_id': '1', 'image_id': '2',
+      'location_id': '3', 'extra': {}}),
+    (RackspaceLBDriver, 'create_balancer',
+     {'name': 'test', 'port': '80', 'protocol': 'http',
+      'algorithm': 0, 'members': [{'member_id': '1'}, {'member_id': '2'},
+                                  {'member_id': '3'}]}),
+]
+
+
+class CountingLoads(object):
+    def __init__(self, loads):
+        self.loads = loads
+        self.calls = 0
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        return self.loads(*args, **kwargs)
+
+
+def run_case(Driver, method_name, body, iterations):
+    driver = Driver.__new__(Driver)
+    driver_method = DriverMethod(driver, method_name)
+    driver_method.method = lambda *args, **kwargs: None
+    data = json_codec.dumps(body)
+    counting_loads = CountingLoads(json_codec.loads)
+    json_codec.loads = counting_loads
+    try:
+        driver_method.invoke(data)
+        calls = counting_loads.calls
+    finally:
+        json_codec.loads = counting_loads.loads
+    start = time.time()
+    for _ in xrange(iterations):
+        driver_method.invoke(data)
+    elapsed = time.time() - start
+    return calls, elapsed / iterations * 1000000
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    print '%-40s %12s %14s' % ('method', 'json.loads', 'invoke, us')
+    for Driver, method_name, body in CASES:
+        calls, elapsed = run_case(Driver, method_name, body, iterations)
+        print '%-40s %12d %14.1f' % ('%s.%s' % (Driver.__name__, method_name),
+                                     calls, elapsed)
+
+
+if __name__ == '__main__':
+    main()
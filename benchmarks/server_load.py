@@ -0,0 +1,103 @@
+# -*- coding:utf-8 -*-
+"""
+Load test of production server with Dummy compute driver:
+throughput of GET /compute/DUMMY/nodes for different number of workers.
+Every client process sends requests one by one for given time.
+
+Usage: python benchmarks/server_load.py [seconds] [clients] [workers...]
+"""
+import httplib
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import libcloud
+
+from libcloud_rest.api.versions import versions
+
+URL = versions[libcloud.__version__] + '/compute/DUMMY/nodes'
+HEADERS = {'x-dummy-creds': '10'}
+
+
+def get_free_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def start_server(port, workers):
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, 'libcloud_rest', 'server.py'),
+         '--host', '127.0.0.1', '--port', str(port), '--log-level', 'error',
+         '--workers', str(workers)])
+    deadline = time.time() + 30
+    while True:
+        try:
+            request(port)
+            return process
+        except socket.error:
+            if time.time() > deadline:
+                process.terminate()
+                raise
+            time.sleep(0.1)
+
+
+def request(port):
+    connection = httplib.HTTPConnection('127.0.0.1', port)
+    try:
+        connection.request('GET', URL, headers=HEADERS)
+        response = connection.getresponse()
+        response.read()
+        return response.status
+    finally:
+        connection.close()
+
+
+def run_client(args):
+    port, seconds = args
+    count = 0
+    errors = 0
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        if request(port) == httplib.OK:
+            count += 1
+        else:
+            errors += 1
+    return count, errors
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    workers_list = [int(w) for w in sys.argv[3:]] or [1, 2, 4]
+    print '%d CPU cores, %d clients, %.0f seconds' % (
+        multiprocessing.cpu_count(), clients, seconds)
+    print '%-8s %12s %8s' % ('workers', 'requests/s', 'errors')
+    pool = multiprocessing.Pool(clients)
+    try:
+        for workers in workers_list:
+            port = get_free_port()
+            server = start_server(port, workers)
+            try:
+                results = pool.map(run_client, [(port, seconds)] * clients)
+            finally:
+                server.terminate()
+                server.wait()
+            count = sum(result[0] for result in results)
+            errors = sum(result[1] for result in results)
+            print '%-8d %12.1f %8d' % (workers, count / seconds, errors)
+    finally:
+        pool.close()
+        pool.join()
+
+
+if __name__ == '__main__':
+    main()
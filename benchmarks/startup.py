@@ -0,0 +1,67 @@
+# -*- coding:utf-8 -*-
+"""
+Compare cold boot of application with eager methods catalogue
+and with catalogue loaded from file against lazy docstrings parsing.
+
+Every run starts new interpreter, so import and parsing costs are real.
+Usage: python benchmarks/startup.py [runs]
+"""
+import os
+import sys
+import shutil
+import subprocess
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BOOT_SCRIPT = '''
+import time
+start = time.time()
+from werkzeug.test import Client
+from werkzeug.wrappers import BaseResponse
+from libcloud_rest.application import LibcloudRestApp
+app = LibcloudRestApp(%(app_kwargs)s)
+boot = time.time() - start
+client = Client(app, BaseResponse)
+start = time.time()
+client.get('/0.1/compute/providers/RACKSPACE')
+first = time.time() - start
+start = time.time()
+client.get('/0.1/compute/providers/RACKSPACE')
+second = time.time() - start
+print boot, first, second
+'''
+
+
+def run(app_kwargs):
+    output = subprocess.check_output(
+        [sys.executable, '-c', BOOT_SCRIPT % {'app_kwargs': app_kwargs}],
+        cwd=ROOT)
+    return [float(value) for value in output.split()]
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    tmp_dir = tempfile.mkdtemp()
+    catalogue_file = os.path.join(tmp_dir, 'catalogue.marshal')
+    modes = [
+        ('lazy', ''),
+        ('eager', 'eager_catalogue=True'),
+        ('file', 'catalogue_file=%r' % (catalogue_file)),
+    ]
+    print '%-8s %10s %16s %16s' % ('mode', 'boot, ms', 'first req, ms',
+                                   'second req, ms')
+    try:
+        # first run writes catalogue file
+        run(modes[-1][1])
+        for mode, app_kwargs in modes:
+            results = [run(app_kwargs) for _ in range(runs)]
+            boot, first, second = [min(r[i] for r in results) * 1000
+                                   for i in range(3)]
+            print '%-8s %10.1f %16.1f %16.1f' % (mode, boot, first, second)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,326 @@
+# -*- coding:utf-8 -*-
+import hashlib
+import json
+import Queue
+import sys
+import threading
+import time
+
+from libcloud_rest.constants import RESPONSE_CACHE_TTLS,\
+    RESPONSE_CACHE_STALE_TTLS, RESPONSE_CACHE_MAX_BYTES,\
+    READ_ONLY_METHODS_PREFIXES, REQUEST_COALESCING
+from libcloud_rest.log import logger
+from libcloud_rest.utils import OrderedDict
+
+#max number of accounts which last invalidation is remembered
+MAX_INVALIDATED_ACCOUNTS = 10000
+
+
+def get_arguments_hash(data):
+    """
+    Return hash of method arguments which does not depend on keys order.
+    """
+    #stdlib json is used instead of json_codec: keys must be sorted and
+    #the encoding must not change with installed backend
+    canonical = json.dumps(data, sort_keys=True, separators=(',', ':'),
+                           default=repr)
+    return hashlib.sha1(canonical).hexdigest()
+
+
+def is_read_only_method(method_name):
+    return method_name.startswith(READ_ONLY_METHODS_PREFIXES)
+
+
+class _Call(object):
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.exc_info = None
+
+
+class SingleFlight(object):
+    """
+    Execute function once for concurrent calls with the same key:
+    the first caller executes it, other callers wait and get the same
+    result or exception.
+    """
+
+    def __init__(self, enabled=True):
+        """
+        @param enabled: If False every call executes function
+        """
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key, function):
+        if not self.enabled:
+            return function()
+        self._lock.acquire()
+        try:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+        finally:
+            self._lock.release()
+        if not leader:
+            call.event.wait()
+            if call.exc_info is not None:
+                raise call.exc_info[0], call.exc_info[1], call.exc_info[2]
+            return call.result
+        try:
+            call.result = function()
+            return call.result
+        except Exception:
+            call.exc_info = sys.exc_info()
+            raise
+        finally:
+            self._lock.acquire()
+            try:
+                del self._calls[key]
+            finally:
+                self._lock.release()
+            call.event.set()
+
+    def get_stats(self):
+        return {'in_flight': len(self._calls),
+                'calls': self.calls,
+                'coalesced': self.coalesced}
+
+
+class ResponseCache(object):
+    """
+    Thread-safe LRU cache of rendered results of driver methods which
+    rarely change, e.g. list_sizes. Entries are keyed by
+    (driver class, credentials hash, method name, arguments hash) and
+    expire after TTL of method. Total size of cached responses is limited
+    by max_bytes, least recently used entries are evicted first.
+    All entries of account are removed by L{invalidate} after
+    successful call of method which changes provider state.
+
+    Expired entry is served during stale TTL of method while it is
+    refreshed by background thread, so only the first request of
+    cold cache waits for provider. Concurrent misses of the same key
+    are loaded by one call, see L{get_or_load}.
+    """
+
+    def __init__(self, ttls=RESPONSE_CACHE_TTLS,
+                 stale_ttls=RESPONSE_CACHE_STALE_TTLS,
+                 max_bytes=RESPONSE_CACHE_MAX_BYTES):
+        """
+        @param ttls: C{dict} method name: seconds for which result is cached
+        @param stale_ttls: C{dict} method name: seconds for which expired
+            result is served while it is refreshed
+        @param max_bytes: Max total length of cached responses,
+            0 to disable cache
+        """
+        self.ttls = dict(ttls)
+        self.stale_ttls = dict(stale_ttls)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        #key: (expiration time, stale expiration time, body)
+        self._entries = OrderedDict()
+        #(driver class, credentials hash): set of keys
+        self._accounts = {}
+        #incremented by invalidation, (driver class, credentials hash):
+        #generation of last invalidation of account, so results loaded
+        #before invalidation of their account are not stored
+        self._generation = 0
+        self._invalidations = {}
+        #generation of invalidations of accounts which are not remembered
+        self._forgotten_generation = 0
+        self._loads = SingleFlight()
+        self._refreshing = set()
+        self._refresh_queue = Queue.Queue()
+        self._refresh_thread = None
+        self.bytes = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    def is_cached_method(self, method_name):
+        return self.max_bytes > 0 and method_name in self.ttls
+
+    def _remove(self, key):
+        body = self._entries.pop(key)[2]
+        self.bytes -= len(body)
+        account_keys = self._accounts.get(key[:2])
+        if account_keys is not None:
+            account_keys.discard(key)
+            if not account_keys:
+                del self._accounts[key[:2]]
+
+    def get(self, key, load=None):
+        """
+        Return cached response body or None.
+
+        @param load: Function which returns fresh response body,
+            if given stale entry is returned and refreshed in background
+        """
+        now = time.time()
+        self._lock.acquire()
+        try:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now and \
+                    (load is None or entry[1] <= now):
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= now:
+                self.stale_hits += 1
+                self._schedule_refresh(key, load)
+            else:
+                self.hits += 1
+            #move to the end of LRU order
+            del self._entries[key]
+            self._entries[key] = entry
+            return entry[2]
+        finally:
+            self._lock.release()
+
+    def get_or_load(self, key, load):
+        """
+        Return cached response body, call load on miss.
+        Concurrent misses of the same key wait for one load call.
+
+        @param load: Function which returns response body
+        """
+        body = self.get(key, load)
+        if body is None:
+            body = self._loads.do(key, lambda: self._load(key, load))
+        return body
+
+    def _load(self, key, load):
+        generation = self._generation
+        body = load()
+        self.set(key, body, generation)
+        return body
+
+    def _schedule_refresh(self, key, load):
+        #called with lock acquired
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+        self._refresh_queue.put((key, load))
+        if self._refresh_thread is None or \
+                not self._refresh_thread.is_alive():
+            self._refresh_thread = threading.Thread(target=self._refresh)
+            self._refresh_thread.daemon = True
+            self._refresh_thread.start()
+
+    def _refresh(self):
+        while True:
+            key, load = self._refresh_queue.get()
+            refreshed = False
+            try:
+                self._loads.do(key, lambda: self._load(key, load))
+                refreshed = True
+            except Exception, e:
+                #stale entry is served until it expires
+                logger.warning('Refresh of %s failed: %s' % (key[2], e))
+            self._lock.acquire()
+            try:
+                self._refreshing.discard(key)
+                if refreshed:
+                    self.refreshes += 1
+                else:
+                    self.refresh_errors += 1
+            finally:
+                self._lock.release()
+
+    def set(self, key, body, generation=None):
+        """
+        @param key: (driver class, credentials hash, method name,
+            arguments hash)
+        @param generation: Value of cache generation before body was
+            loaded, body is not stored if account was invalidated since
+        """
+        ttl = self.ttls.get(key[2])
+        if not ttl or len(body) > self.max_bytes:
+            return
+        self._lock.acquire()
+        try:
+            if generation is not None and generation < \
+                    self._invalidations.get(key[:2],
+                                            self._forgotten_generation):
+                return
+            if key in self._entries:
+                self._remove(key)
+            now = time.time()
+            self._entries[key] = (now + ttl,
+                                  now + ttl + self.stale_ttls.get(key[2], 0),
+                                  body)
+            self._accounts.setdefault(key[:2], set()).add(key)
+            self.bytes += len(body)
+            while self.bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        finally:
+            self._lock.release()
+
+    def invalidate(self, driver_cls, credentials_hash):
+        """
+        Remove all cached responses of account.
+        """
+        self._lock.acquire()
+        try:
+            self._generation += 1
+            if len(self._invalidations) >= MAX_INVALIDATED_ACCOUNTS:
+                self._invalidations.clear()
+                self._forgotten_generation = self._generation
+            self._invalidations[(driver_cls, credentials_hash)] = \
+                self._generation
+            keys = self._accounts.get((driver_cls, credentials_hash), ())
+            for key in list(keys):
+                self._remove(key)
+                self.invalidations += 1
+        finally:
+            self._lock.release()
+
+    def clear(self):
+        self._lock.acquire()
+        try:
+            self._entries.clear()
+            self._accounts.clear()
+            self._generation += 1
+            self._invalidations.clear()
+            self._forgotten_generation = self._generation
+            self.bytes = 0
+            self.hits = self.stale_hits = self.misses = 0
+            self.evictions = self.invalidations = 0
+            self.refreshes = self.refresh_errors = 0
+            self._loads.coalesced = 0
+        finally:
+            self._lock.release()
+
+    def get_stats(self):
+        hits = self.hits + self.stale_hits
+        requests = hits + self.misses
+        return {'size': len(self._entries),
+                'bytes': self.bytes,
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'hit_rate': float(hits) / requests if requests else 0.0,
+                'coalesced': self._loads.coalesced,
+                'refreshes': self.refreshes,
+                'refresh_errors': self.refresh_errors,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations}
+
+
+response_cache = ResponseCache()
+#coalesces identical concurrent calls of read-only methods
+request_flights = SingleFlight(enabled=REQUEST_COALESCING)
@@ -0,0 +1,245 @@
+# -*- coding:utf-8 -*-
+import hashlib
+import marshal
+import os
+import stat
+import sys
+import tempfile
+
+import libcloud
+from libcloud.compute import providers as compute_providers
+from libcloud.dns import providers as dns_providers
+from libcloud.loadbalancer import providers as lb_providers
+from libcloud.storage import providers as storage_providers
+
+import libcloud_rest
+from libcloud_rest.api.providers import get_providers_registry,\
+    driver_methods_cache
+from libcloud_rest.log import logger
+from libcloud_rest.utils import check_private_directory
+
+#map between component name and libcloud providers module
+COMPONENTS = {
+    'compute': compute_providers,
+    'dns': dns_providers,
+    'loadbalancer': lb_providers,
+    'storage': storage_providers,
+}
+
+#change it when format of catalogue file is changed
+CATALOGUE_FORMAT_VERSION = 1
+
+
+class MethodsCatalogue(object):
+    """
+    Catalogue of all supported drivers of all components.
+    Building catalogue parses every public driver method into
+    driver methods cache, so requests do not pay for introspection.
+    """
+
+    def __init__(self, cache=driver_methods_cache):
+        self.cache = cache
+        self.drivers = {}
+        self.failures = {}
+
+    def build(self, components=None):
+        """
+        Import and parse drivers of components.
+
+        @param components: C{dict} component name: providers module,
+            by default all components are used
+
+        @return: C{self}
+        """
+        if components is None:
+            components = COMPONENTS
+        for component, providers in components.items():
+            self._build_component(component, providers)
+        return self
+
+    def _build_component(self, component, providers):
+        drivers = self.drivers.setdefault(component, {})
+        failures = self.failures.setdefault(component, {})
+        registry = get_providers_registry(providers)
+        for provider_name in registry.get_provider_names():
+            try:
+                Driver = registry.get_driver(provider_name)
+            except ImportError, e:
+                failures[provider_name] = {'__import__': str(e)}
+                continue
+            drivers[provider_name] = (Driver.__module__, Driver.__name__)
+            driver_failures = self.cache.warm_up([Driver]).get(Driver, {})
+            if driver_failures:
+                failures[provider_name] = dict(
+                    (method_name, str(error))
+                    for method_name, error in driver_failures.items())
+
+    def get_failures(self, component, provider_name):
+        """
+        Return C{dict} of method name: error message for methods
+        which can not be parsed.
+        """
+        return self.failures.get(component, {}).get(provider_name, {})
+
+    def get_stats(self):
+        return {
+            'drivers': sum(len(d) for d in self.drivers.values()),
+            'failed_methods': sum(len(methods)
+                                  for failures in self.failures.values()
+                                  for methods in failures.values()),
+        }
+
+    def save(self, path, key=None):
+        """
+        Write catalogue and parsed methods specs to file.
+        File is replaced atomically, so concurrent workers never read
+        partially written catalogue.
+        """
+        if key is None:
+            key = get_catalogue_key()
+        specs = {}
+        for spec_key, spec in self.cache.get_specs().items():
+            try:
+                marshal.dumps(spec)
+            except ValueError:
+                # default value of argument is not builtin type
+                continue
+            specs[spec_key] = spec
+        data = marshal.dumps({'key': key,
+                              'drivers': self.drivers,
+                              'failures': self.failures,
+                              'specs': specs})
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            fh = os.fdopen(fd, 'wb')
+            try:
+                fh.write(data)
+            finally:
+                fh.close()
+            os.rename(tmp_path, path)
+        except (IOError, OSError):
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def load(self, path, key=None):
+        """
+        Read catalogue from file. File is read only if it is owned by
+        current user and is not writable by other users, because loaded
+        specs are trusted as parsed driver code.
+
+        @return: True if file exists and was written for current
+            libcloud and drivers source, False otherwise
+        """
+        if key is None:
+            key = get_catalogue_key()
+        try:
+            fh = open(path, 'rb')
+            try:
+                info = os.fstat(fh.fileno())
+                if info.st_uid != os.getuid() or \
+                        stat.S_IMODE(info.st_mode) & 0022:
+                    logger.warning('Methods catalogue %s is not owned by '
+                                   'current user or is writable by other '
+                                   'users, it is not loaded' % (path))
+                    return False
+                data = marshal.load(fh)
+            finally:
+                fh.close()
+        except (IOError, EOFError, ValueError, TypeError):
+            return False
+        if not isinstance(data, dict) or data.get('key') != key:
+            return False
+        self.drivers = data['drivers']
+        self.failures = data['failures']
+        self.cache.load_specs(data['specs'])
+        return True
+
+
+def _get_source_paths(package):
+    package_dir = os.path.dirname(os.path.abspath(package.__file__))
+    for root, dirs, files in os.walk(package_dir):
+        dirs.sort()
+        for file_name in sorted(files):
+            if file_name.endswith('.py'):
+                yield os.path.join(root, file_name)
+
+
+def get_catalogue_key():
+    """
+    Return key of catalogue which changes when libcloud version, libcloud
+    drivers source, libcloud_rest source or python version are changed.
+    """
+    source_hash = hashlib.md5()
+    for package in (libcloud, libcloud_rest):
+        for path in _get_source_paths(package):
+            fh = open(path, 'rb')
+            try:
+                source_hash.update(fh.read())
+            finally:
+                fh.close()
+    return '%s-%s-%s-%s' % (CATALOGUE_FORMAT_VERSION, libcloud.__version__,
+                            '.'.join(map(str, sys.version_info[:3])),
+                            source_hash.hexdigest())
+
+
+def get_default_catalogue_path():
+    """
+    Return path of catalogue in private directory in home of current user.
+    """
+    return os.path.join(os.path.expanduser('~'), '.libcloud_rest',
+                        'catalogue_%s.marshal' % (libcloud.__version__))
+
+
+def build_methods_catalogue(components=None):
+    catalogue = MethodsCatalogue().build(components)
+    stats = catalogue.get_stats()
+    logger.info('Methods catalogue built: %d drivers, %d methods can '
+                'not be parsed' % (stats['drivers'], stats['failed_methods']))
+    return catalogue
+
+
+def load_methods_catalogue(path):
+    """
+    Load catalogue from file. If file does not exist or is outdated
+    build catalogue and write it to file for next workers.
+    Directory of file should be private directory of current user
+    (mode 0700), otherwise file is not used.
+    """
+    try:
+        check_private_directory(os.path.dirname(os.path.abspath(path)))
+    except OSError, e:
+        logger.error('Methods catalogue file %s is not used: %s' %
+                     (path, str(e)))
+        return build_methods_catalogue()
+    key = get_catalogue_key()
+    catalogue = MethodsCatalogue()
+    if catalogue.load(path, key):
+        logger.info('Methods catalogue loaded from %s' % (path))
+        return catalogue
+    catalogue = build_methods_catalogue()
+    try:
+        catalogue.save(path, key)
+    except (IOError, OSError), e:
+        logger.error('Can not write methods catalogue to %s: %s' %
+                     (path, str(e)))
+    return catalogue
+
+
+def main():
+    """
+    Build catalogue file, e.g. on deployment before workers start.
+    """
+    if len(sys.argv) > 1:
+        path = sys.argv[1]
+    else:
+        path = get_default_catalogue_path()
+    check_private_directory(os.path.dirname(os.path.abspath(path)))
+    catalogue = build_methods_catalogue()
+    catalogue.save(path)
+    print 'Methods catalogue written to %s' % (path)
+
+
+if __name__ == '__main__':
+    main()
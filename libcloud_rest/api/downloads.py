@@ -0,0 +1,282 @@
+# -*- coding:utf-8 -*-
+import httplib
+import os
+import threading
+
+from werkzeug.http import parse_date, is_byte_range_valid
+from werkzeug.wsgi import ClosingIterator, wrap_file
+try:
+    from libcloud.storage.drivers.local import LocalStorageDriver
+except ImportError:
+    #local driver needs lockfile package
+    LocalStorageDriver = None
+
+from libcloud_rest.constants import DOWNLOAD_CHUNK_SIZE
+from libcloud_rest.utils import Response
+
+
+def iter_range(chunks, start, stop):
+    """
+    Yield bytes from start to stop (not inclusive) of stream,
+    reading of stream is stopped after the last byte.
+    """
+    position = 0
+    for chunk in chunks:
+        end = position + len(chunk)
+        if end > start:
+            chunk = chunk[max(start - position, 0):stop - position]
+            if chunk:
+                yield chunk
+        position = end
+        if position >= stop:
+            break
+
+
+def iter_file(fh, length, chunk_size):
+    """
+    Yield length bytes of file from its current position and close it.
+    """
+    try:
+        while length > 0:
+            data = fh.read(min(chunk_size, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+    finally:
+        fh.close()
+
+
+def get_object_file_path(driver, obj):
+    """
+    Return path of local file with object content or None,
+    objects of local driver are files in its base path.
+    """
+    if LocalStorageDriver is not None and \
+            isinstance(driver, LocalStorageDriver):
+        return driver.get_object_cdn_url(obj)
+    return None
+
+
+def get_object_etag(obj):
+    return obj.hash or None
+
+
+def get_object_last_modified(obj):
+    last_modified = (obj.extra or {}).get('last_modified')
+    if isinstance(last_modified, basestring):
+        return last_modified
+    return None
+
+
+def is_empty_suffix_range(header):
+    """
+    Return True if Range header requests suffix of zero bytes (bytes=-0).
+    """
+    ranges = (header or '').partition('=')[2].strip()
+    return ranges.startswith('-') and ranges[1:].strip().isdigit() and \
+        int(ranges[1:]) == 0
+
+
+class ObjectDownloads(object):
+    """
+    Build streamed responses of storage objects.
+
+    Object is read by chunks of chunk_size bytes and sent as it is read,
+    so memory used by download does not depend on object size.
+    Content-Length, ETag and Last-Modified headers are taken from object
+    metadata. Single byte range from I{Range} header (if validator from
+    I{If-Range} matches) is downloaded by ranged download of driver,
+    drivers without it stream the object from start and the rest
+    of stream is not read. Objects in local files (e.g. of local driver)
+    are returned by wsgi.file_wrapper of server, which can send file
+    without reading it to process.
+    """
+
+    def __init__(self, chunk_size=DOWNLOAD_CHUNK_SIZE):
+        """
+        @param chunk_size: Number of bytes read from provider at once
+        """
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()
+        self.downloads = 0
+        self.partial = 0
+        self.not_modified = 0
+        self.files = 0
+        self.bytes = 0
+
+    def _count(self, name, length=0):
+        self._lock.acquire()
+        try:
+            setattr(self, name, getattr(self, name) + 1)
+            self.bytes += length
+        finally:
+            self._lock.release()
+
+    def get_range(self, request, obj):
+        """
+        Return (start, stop) of requested bytes or None for whole object.
+        Range of other object version (changed If-Range validator) and
+        multiple ranges are not supported, whole object is returned.
+
+        @return: (start, stop), None or False if range is not satisfiable
+        """
+        if request.range is None or obj.size is None:
+            return None
+        if_range = request.if_range
+        if if_range.etag is not None and \
+                if_range.etag != get_object_etag(obj):
+            return None
+        if if_range.date is not None:
+            last_modified = get_object_last_modified(obj)
+            if last_modified is None or \
+                    parse_date(last_modified) != if_range.date:
+                return None
+        if request.range.units != 'bytes' or \
+                len(request.range.ranges) != 1:
+            return None
+        start, stop = request.range.ranges[0]
+        if stop is None and start == 0 and \
+                is_empty_suffix_range(request.headers.get('Range')):
+            #bytes=-0 is parsed as bytes=0-, but it selects no bytes
+            return False
+        if stop is None:
+            #suffix longer than object selects the whole object
+            if start < 0:
+                start = max(0, obj.size + start)
+            stop = obj.size
+        if not is_byte_range_valid(start, stop, obj.size):
+            return False
+        return start, min(stop, obj.size)
+
+    def open_stream(self, driver, obj, byte_range, call):
+        """
+        @param call: Function which calls driver method in provider slot
+        """
+        if byte_range is None:
+            return call(driver.download_object_as_stream, obj,
+                        chunk_size=self.chunk_size)
+        start, stop = byte_range
+        download_range = getattr(driver, 'download_object_range_as_stream',
+                                 None)
+        if download_range is not None:
+            return call(download_range, obj, start, stop,
+                        chunk_size=self.chunk_size)
+        stream = call(driver.download_object_as_stream, obj,
+                      chunk_size=self.chunk_size)
+        return iter_range(stream, start, stop)
+
+    def open_file(self, environ, fh, byte_range, size=None):
+        """
+        Return response body with bytes of range or size bytes (the whole
+        file if size is None) of open file, file is closed by body.
+        Server wsgi.file_wrapper which accepts length is used for any
+        bytes, other file wrappers are used when bytes reach the end
+        of file, other bytes are read by chunks.
+        """
+        try:
+            file_size = os.fstat(fh.fileno()).st_size
+            if byte_range is not None:
+                start, stop = byte_range
+                fh.seek(start)
+                length = stop - start
+            else:
+                length = file_size if size is None else size
+            file_wrapper = environ.get('wsgi.file_wrapper')
+            if getattr(file_wrapper, 'accepts_length', False):
+                return file_wrapper(fh, self.chunk_size, length)
+            if length == file_size - fh.tell():
+                return wrap_file(environ, fh, self.chunk_size)
+            return iter_file(fh, length, self.chunk_size)
+        except Exception:
+            fh.close()
+            raise
+
+    def get_response(self, request, driver, obj, call, release,
+                     file_obj=None, wrap_stream=None):
+        """
+        Return response with object content.
+
+        @param call: Function which calls driver method in provider slot
+        @param release: Function which is called when driver is not needed
+            by response, if response is not returned caller should call it
+        @param file_obj: Open file with object content which is closed
+            by response, by default file of local driver is used
+        @param wrap_stream: Function which is called with stream of whole
+            object (not range) and returns stream which is sent,
+            e.g. to write it to cache
+        """
+        etag = get_object_etag(obj)
+        headers = [('Accept-Ranges', 'bytes')]
+        last_modified = get_object_last_modified(obj)
+        if last_modified is not None:
+            headers.append(('Last-Modified', last_modified))
+        if etag is not None and request.if_none_match.contains(etag):
+            self._count('not_modified')
+            if file_obj is not None:
+                file_obj.close()
+            #body of 304 response is not iterated and closed by server
+            release()
+            response = Response([], status=httplib.NOT_MODIFIED,
+                                headers=headers)
+            response.set_etag(etag)
+            return response
+        byte_range = self.get_range(request, obj)
+        if byte_range is False:
+            if file_obj is not None:
+                file_obj.close()
+            headers.append(('Content-Range', 'bytes */%d' % (obj.size)))
+            response = Response(
+                ClosingIterator([], release),
+                status=httplib.REQUESTED_RANGE_NOT_SATISFIABLE,
+                headers=headers)
+            return response
+        content_type = (obj.extra or {}).get('content_type') or \
+            'application/octet-stream'
+        if file_obj is None and request.method != 'HEAD':
+            file_path = get_object_file_path(driver, obj)
+            if file_path is not None:
+                file_obj = open(file_path, 'rb')
+        if request.method == 'HEAD':
+            if file_obj is not None:
+                file_obj.close()
+            release()
+            body = []
+        elif file_obj is not None:
+            #file wrapper is passed to server as is, so it is not wrapped
+            body = self.open_file(request.environ, file_obj, byte_range,
+                                  obj.size)
+            release()
+            self._count('files')
+        else:
+            stream = self.open_stream(driver, obj, byte_range, call)
+            if byte_range is None and wrap_stream is not None:
+                stream = wrap_stream(stream)
+            body = ClosingIterator(stream, release)
+        response = Response(body, mimetype=content_type, headers=headers,
+                            direct_passthrough=True)
+        if etag is not None:
+            response.set_etag(etag)
+        if byte_range is not None:
+            start, stop = byte_range
+            response.status_code = httplib.PARTIAL_CONTENT
+            response.headers['Content-Range'] = 'bytes %d-%d/%d' % (
+                start, stop - 1, obj.size)
+            response.headers['Content-Length'] = str(stop - start)
+            self._count('partial', stop - start)
+        elif obj.size is not None:
+            response.headers['Content-Length'] = str(obj.size)
+            self._count('downloads', obj.size)
+        else:
+            self._count('downloads')
+        return response
+
+    def get_stats(self):
+        return {'downloads': self.downloads,
+                'partial': self.partial,
+                'not_modified': self.not_modified,
+                'files': self.files,
+                'bytes': self.bytes}
+
+
+object_downloads = ObjectDownloads()
@@ -1,5 +1,7 @@
 # -*- coding:utf-8 -*-
 from functools import partial
+from itertools import islice, izip
+from operator import attrgetter
 import re
 
 from libcloud.compute import base as compute_base
@@ -20,12 +22,29 @@ from libcloud.loadbalancer import base as lb_base
 from libcloud.loadbalancer.drivers import rackspace as lb_rackspace
 from libcloud.storage import base as storage_base
 
-from libcloud_rest.utils import json, DateTimeJsonEncoder
+from libcloud_rest import json_codec
+from libcloud_rest.constants import LIST_RESPONSE_CHUNK_SIZE
 from libcloud_rest.api import validators as valid
 from libcloud_rest.errors import MalformedJSONError, ValidationError,\
     MissingArguments, TooManyArgumentsError
 
 
+def get_json_data(data):
+    """
+    Decode request body. Entries work with decoded data, so body is
+    parsed once and then passed to all entries of method.
+
+    @param data: json string
+    @type data: C{str}
+    @return: decoded data
+    @raise: MalformedJSONError
+    """
+    try:
+        return json_codec.loads(data)
+    except (ValueError, TypeError), e:
+        raise MalformedJSONError(detail=str(e))
+
+
 class Field(object):
     """
     Base class for all field types.
@@ -116,14 +135,32 @@ class NoneField(Field):
     type_name = 'none'
 
 
+def get_render_function(render_attrs):
+    """
+    Return function which creates C{dict} of object attributes listed
+    in render_attrs or None if there are no attributes to render.
+    """
+    if not render_attrs:
+        return None
+    render_attrs = tuple(render_attrs)
+    get_values = attrgetter(*render_attrs)
+    if len(render_attrs) == 1:
+        name = render_attrs[0]
+        return lambda obj: {name: get_values(obj)}
+    return lambda obj: dict(izip(render_attrs, get_values(obj)))
+
+
 class LibcloudObjectEntryBase(type):
     """
     Metaclass for all entries.
     Store all created entries type names in entries attribute.
+    Render function of entry is created with class and stored
+    in renderers by object class.
     """
 
     entries_types = {}
     class_entries = {}
+    renderers = {}
 
     @classmethod
     def get_entry(mcs, value):
@@ -152,6 +189,11 @@ class LibcloudObjectEntryBase(type):
         LibcloudObjectEntryBase.entries_types[type_name] = new_class
         LibcloudObjectEntryBase.class_entries[new_class.object_class] = \
             new_class
+        render = get_render_function(new_class.render_attrs)
+        new_class.render = staticmethod(render)
+        if render is not None:
+            LibcloudObjectEntryBase.renderers[new_class.object_class] = render
+            json_codec.register_converter(new_class.object_class, render)
         return new_class
 
     def add_to_class(cls, name, value):
@@ -162,15 +204,6 @@ class LibcloudObjectEntryBase(type):
             setattr(cls, name, value)
 
 
-class EntryJsonEncoder(DateTimeJsonEncoder):
-    def default(self, obj):
-        entry = LibcloudObjectEntryBase.get_entry(obj.__class__)
-        if entry:
-            return dict(((name, getattr(obj, name))
-                        for name in entry.render_attrs))
-        return super(EntryJsonEncoder, self).default(obj)
-
-
 class BasicEntry(object):
     """
     Just describe interface.
@@ -187,19 +220,7 @@ class BasicEntry(object):
             self.default = kwargs['default']
 
     def _get_json(self, data):
-        """
-
-        @param data:
-        @type data:
-        @return:
-        @rtype:
-        @raise: MalformedJsonError
-        """
-        try:
-            json_data = json.loads(data)
-        except (ValueError, TypeError), e:
-            raise MalformedJSONError(detail=str(e))
-        return json_data
+        return get_json_data(data)
 
     def _validate(self, json_data):
         """
@@ -231,11 +252,28 @@ class BasicEntry(object):
         """
         pass
 
-    def from_json(self, obj, driver):
+    def iter_json(self, obj):
         """
+        Return json representation of object by chunks.
 
-        @param obj:
-        @type obj:
+        @raise: ValueError
+        """
+        yield self.to_json(obj)
+
+    def to_json_items(self, obj_list):
+        """
+        Return json representation of objects as items
+        of json array without brackets.
+
+        @raise: ValueError
+        """
+        return ', '.join([self.to_json(obj) for obj in obj_list])
+
+    def from_json(self, json_data, driver):
+        """
+
+        @param json_data: decoded request data
+        @type json_data: C{dict}
         @param driver:
         @type driver:
         @raise: MissingArguments
@@ -265,15 +303,34 @@ class LibcloudObjectEntry(BasicEntry):
     object_class = None
     render_attrs = None
     type_name = ''
+    render = None
 
-    entry_json_render = partial(json.dumps, cls=EntryJsonEncoder)
+    entry_json_render = staticmethod(json_codec.dumps)
 
     @classmethod
-    def to_json(cls, obj):
+    def to_json_data(cls, obj):
+        """
+        Return object representation which can be encoded to json.
+
+        @raise: ValueError
+        """
         if not isinstance(obj, cls.object_class):
             raise ValueError('Bad object type, %s is not instance of %s' %
                              (type(obj), type(cls.object_class)))
-        return cls.entry_json_render(obj)
+        if cls.render is not None:
+            return cls.render(obj)
+        return obj
+
+    @classmethod
+    def to_json(cls, obj):
+        return cls.entry_json_render(cls.to_json_data(obj))
+
+    @classmethod
+    def to_json_items(cls, obj_list):
+        # objects are encoded by one call
+        to_json_data = cls.to_json_data
+        return cls.entry_json_render(
+            [to_json_data(obj) for obj in obj_list])[1:-1]
 
     def _get_object(self, json_data, driver):
         raise NotImplementedError('Method not implented in %s' %
@@ -282,8 +339,7 @@ class LibcloudObjectEntry(BasicEntry):
     def contains_arguments(self, json_data):
         return any(True for f in self._fields if f.name in json_data)
 
-    def from_json(self, data, driver):
-        json_data = self._get_json(data)
+    def from_json(self, json_data, driver):
         if not self.contains_arguments(json_data)\
                 and hasattr(self, 'default'):
             return self.default
@@ -327,8 +383,8 @@ class SimpleEntry(BasicEntry):
     def to_json(self, obj):
         try:
             if not self.name:
-                return json.dumps(obj)
-            data = json.dumps({self.name: obj})
+                return json_codec.dumps(obj)
+            data = json_codec.dumps({self.name: obj})
             json_data = self._get_json(data)
             self._validate(json_data)
             return data
@@ -338,8 +394,7 @@ class SimpleEntry(BasicEntry):
     def contains_arguments(self, json_data):
         return self.field.name in json_data
 
-    def from_json(self, data, driver=None):
-        json_data = self._get_json(data)
+    def from_json(self, json_data, driver=None):
         if not self.contains_arguments(json_data)\
                 and hasattr(self, 'default'):
             return self.default
@@ -853,16 +908,15 @@ class OneOfEntry(BasicEntry):
         else:
             raise ValueError('Can not represent object as json')
 
-    def from_json(self, data, driver):
+    def from_json(self, json_data, driver):
         missed_arguments = []
         validation_errors = []
         contain_arguments = []
         results = []
-        json_data = self._get_json(data)
         for entry in self.entries:
             try:
                 contain_arguments.append(entry.contains_arguments(json_data))
-                results.append(entry.from_json(data, driver))
+                results.append(entry.from_json(json_data, driver))
             except MissingArguments, e:
                 missed_arguments.extend(e.arguments)
             except ValidationError, e:
@@ -910,17 +964,34 @@ class ListEntry(BasicEntry):
         return [result]
 
     def to_json(self, obj_list):
-        data = [json.loads(self.object_entry.to_json(obj)) for obj in obj_list]
-        return json.dumps(data)
+        return ''.join(self.iter_json(obj_list))
 
-    def from_json(self, data, driver):
-        json_data = self._get_json(data)
+    def iter_json(self, obj_list, chunk_size=LIST_RESPONSE_CHUNK_SIZE):
+        """
+        Encode objects one by one and yield them by chunks of chunk_size
+        objects, so response is sent before whole list is encoded.
+        """
+        to_json_items = self.object_entry.to_json_items
+        obj_iter = iter(obj_list)
+        objects = list(islice(obj_iter, chunk_size))
+        prefix = '['
+        while True:
+            next_objects = list(islice(obj_iter, chunk_size))
+            chunk = prefix + to_json_items(objects)
+            if not next_objects:
+                yield chunk + ']'
+                return
+            yield chunk
+            prefix = ', '
+            objects = next_objects
+
+    def from_json(self, json_data, driver):
         if not self.name in json_data:
             if hasattr(self, 'default'):
                 return self.default
             raise MissingArguments(arguments=[self.name])
         data_list = json_data[self.name]
-        return [self.object_entry.from_json(json.dumps(data), driver)
+        return [self.object_entry.from_json(data, driver)
                 for data in data_list]
 
 
@@ -1,24 +1,46 @@
 # -*- coding:utf-8 -*-
+from functools import partial
+import hashlib
 import httplib
 import inspect
+from itertools import chain
+import Queue
+import threading
+import time
 
 import libcloud
 from libcloud.common import types as common_types
+from werkzeug.datastructures import Headers
 from werkzeug.routing import Rule, Submount
+from werkzeug.wsgi import ClosingIterator
 
 
 from libcloud_rest.api.versions import versions
 from libcloud_rest.api.parser import parse_request_headers,\
     ARGS_TO_XHEADERS_DICT
 from libcloud_rest.errors import LibcloudError, INTERNAL_LIBCLOUD_ERRORS_MAP,\
-    ProviderNotSupportedError, MethodParsingException, NoSuchOperationError
-from libcloud_rest.constants import TEST_QUERY_STRING
+    MethodParsingException, NoSuchOperationError, LibcloudRestError,\
+    InternalError, ValidationError, ProviderTimeoutError, ProviderBusyError
+from libcloud_rest.constants import TEST_QUERY_STRING,\
+    PROVIDERS_INFO_MAX_AGE, BATCH_MAX_OPERATIONS, BATCH_MAX_PARALLEL,\
+    BATCH_METHODS, FANOUT_MAX_ACCOUNTS, FANOUT_TIMEOUT, FANOUT_MAX_THREADS
 from libcloud_rest.server import DEBUG
 from libcloud_rest.log import logger
 from libcloud_rest.api.providers import get_providers_info,\
-    get_driver_by_provider_name, get_driver_instance, get_providers_dict,\
-    DriverMethod
-from libcloud_rest.utils import json, JsonResponse, Response
+    get_providers_registry, get_driver_instance, DriverMethod,\
+    driver_methods_cache
+from libcloud_rest.api.entries import get_json_data
+from libcloud_rest.api.pool import drivers_pool, get_credentials_hash
+from libcloud_rest.api.cache import response_cache, request_flights,\
+    get_arguments_hash, is_read_only_method
+from libcloud_rest.api.limits import provider_limits
+from libcloud_rest.api.downloads import object_downloads
+from libcloud_rest.api.listing import object_listings
+from libcloud_rest.api.uploads import object_uploads
+from libcloud_rest.api.multipart import multipart_uploads
+from libcloud_rest.api.object_cache import object_cache
+from libcloud_rest.utils import JsonResponse, Response
+from libcloud_rest import json_codec
 from tests.utils import get_test_driver_instance
 
 DEBUG = True
@@ -28,42 +50,232 @@ if DEBUG:
 
 
 def get_driver_instance_by_request(providers, request):
-    provider_name = request.args.get('provider')
-    headers = request.headers
+    """
+    Get driver instance from pool or create new one.
+    Driver should be returned by L{release_driver_instance} after use.
+    """
+    return get_driver_instance_by_headers(
+        providers, request.args.get('provider'), request.headers,
+        TEST_QUERY_STRING in request.query_string)
+
+
+def get_driver_instance_by_headers(providers, provider_name, headers,
+                                   test=False):
+    """
+    Get driver instance with credentials from X-headers.
+
+    @param headers: L{Headers} object
+    @param test: If True and debug mode is enabled return test driver
+    """
     api_data = parse_request_headers(headers)
-    Driver = get_driver_by_provider_name(
-        providers.DRIVERS, providers.Provider, provider_name)
-    if TEST_QUERY_STRING in request.query_string and DEBUG:
+    Driver = get_providers_registry(providers).get_driver(provider_name)
+    if test and DEBUG:
         driver_instance = get_test_driver_instance(Driver, api_data)
     else:
-        driver_instance = get_driver_instance(Driver, api_data)
+        driver_instance = drivers_pool.checkout(Driver, api_data)
     return driver_instance
 
 
-def invoke_method(providers, method_name, request, status_code=httplib.OK,
-                  data=None, file_result=False):
+def release_driver_instance(driver):
+    drivers_pool.checkin(driver)
+
+
+def get_account_key(providers, provider_name, headers):
     """
-    Invoke method and return response with result represented as json.
+    Return key of account of request: (driver class, credentials hash).
+    Cached results are stored and invalidated by this key whether
+    or not drivers are pooled.
+    """
+    Driver = get_providers_registry(providers).get_driver(provider_name)
+    return (Driver, get_credentials_hash(parse_request_headers(headers)))
 
-    @param file_result: If True wraps result
+
+def invalidate_account(account_key):
     """
-    if data is None:
-        data = request.data
-    driver = get_driver_instance_by_request(providers, request)
-    driver_method = DriverMethod(driver, method_name)
+    Remove cached results of account, called after methods which may
+    change provider state.
+    """
+    if account_key is not None:
+        response_cache.invalidate(*account_key)
+
+
+def get_request_json_data(request):
+    """
+    Return decoded request arguments: query string arguments of GET
+    request (decoded by application) or parsed request body.
+
+    @raise: MalformedJSONError
+    """
+    json_data = getattr(request, 'json_data', None)
+    if json_data is None:
+        json_data = get_json_data(request.data)
+    return json_data
+
+
+def get_response_body(chunks):
+    """
+    Return response body which is sent while rest of chunks are encoded.
+    First chunk is encoded here, so errors in small results are returned
+    as error responses. Single chunk body is returned as string.
+    """
+    first_chunk = next(chunks)
     try:
-        result = driver_method.invoke(data)
+        second_chunk = next(chunks)
+    except StopIteration:
+        return first_chunk
+    return chain([first_chunk, second_chunk], chunks)
+
+
+def call_provider(driver_cls, provider_name, function, *args, **kwargs):
+    """
+    Call function in provider call slot and replace libcloud errors
+    with REST errors.
+    """
+    provider_limits.acquire(driver_cls, provider_name)
+    try:
+        return function(*args, **kwargs)
     except Exception, e:
         if e.__class__ in INTERNAL_LIBCLOUD_ERRORS_MAP:
             raise INTERNAL_LIBCLOUD_ERRORS_MAP[e.__class__]()
         if isinstance(e, common_types.LibcloudError):
             raise LibcloudError(detail=str(e))
         raise
-    if file_result:
-        return Response(result, mimetype='text/plain',
-                        direct_passthrough=True)
-    return JsonResponse(driver_method.invoke_result_to_json(result),
-                        status=status_code)
+    finally:
+        provider_limits.release(driver_cls)
+
+
+def call_driver_method(driver_method, provider_name, json_data=None,
+                       data=None, account_key=None):
+    """
+    Call driver method in provider call slot and replace libcloud errors
+    with REST errors.
+
+    @param json_data: C{dict} with method arguments
+    @param data: request body which is parsed if json_data is None
+    @param account_key: Key of account (see L{get_account_key}) which
+        cached results are invalidated if method is not read-only
+    """
+    if json_data is None:
+        result = call_provider(driver_method.driver_cls, provider_name,
+                               driver_method.invoke, data)
+    else:
+        result = call_provider(driver_method.driver_cls, provider_name,
+                               driver_method.invoke_with_json_data,
+                               json_data)
+    if not is_read_only_method(driver_method.method_name):
+        invalidate_account(account_key)
+    return result
+
+
+def get_method_call_key(providers, method_name, request, data):
+    """
+    Return key of method call with request credentials and arguments,
+    calls with the same key return the same result.
+    """
+    return get_account_key(providers, request.args.get('provider'),
+                           request.headers) + \
+        (method_name, get_arguments_hash(data))
+
+
+def call_pooled_driver_method(providers, method_name, provider_name, headers,
+                              data):
+    """
+    Invoke method with pooled driver.
+
+    @return: (L{DriverMethod}, method result)
+    """
+    driver = get_driver_instance_by_headers(providers, provider_name,
+                                            headers)
+    try:
+        driver_method = DriverMethod(driver, method_name)
+        result = call_driver_method(
+            driver_method, provider_name, json_data=data,
+            account_key=get_account_key(providers, provider_name, headers))
+        if inspect.isgenerator(result):
+            #result can be shared by coalesced calls
+            result = list(result)
+        return driver_method, result
+    finally:
+        release_driver_instance(driver)
+
+
+def load_method_result(providers, method_name, provider_name, headers,
+                       data):
+    """
+    Invoke method with pooled driver and return result as json string.
+    """
+    driver_method, result = call_pooled_driver_method(
+        providers, method_name, provider_name, headers, data)
+    return ''.join(driver_method.invoke_result_to_json_chunks(result))
+
+
+def invoke_method(providers, method_name, request, status_code=httplib.OK,
+                  data=None, file_result=False, location_attr=None):
+    """
+    Invoke method and return response with result represented as json.
+
+    @param data: C{dict} with method arguments, by default arguments are
+        taken from request
+    @param file_result: If True wraps result
+    @param location_attr: Name of result attribute which is returned
+        in Location header, e.g. ID of created object
+    """
+    if data is None:
+        data = getattr(request, 'json_data', None)
+    provider_name = request.args.get('provider')
+    shared = not file_result and location_attr is None and \
+        TEST_QUERY_STRING not in request.query_string
+    if shared and response_cache.is_cached_method(method_name):
+        if data is None:
+            data = get_request_json_data(request)
+        cache_key = get_method_call_key(providers, method_name, request,
+                                        data)
+        #request headers are copied for background refresh
+        load = partial(load_method_result, providers, method_name,
+                       provider_name, Headers(request.headers.items()), data)
+        return JsonResponse(response_cache.get_or_load(cache_key, load),
+                            status=status_code)
+    if shared and request_flights.enabled and request.method == 'GET' and \
+            is_read_only_method(method_name):
+        #identical concurrent calls share one provider call
+        if data is None:
+            data = get_request_json_data(request)
+        driver_method, result = request_flights.do(
+            get_method_call_key(providers, method_name, request, data),
+            partial(call_pooled_driver_method, providers, method_name,
+                    provider_name, request.headers, data))
+        return JsonResponse(
+            get_response_body(
+                driver_method.invoke_result_to_json_chunks(result)),
+            status=status_code)
+    driver = get_driver_instance_by_request(providers, request)
+    try:
+        driver_method = DriverMethod(driver, method_name)
+        result = call_driver_method(
+            driver_method, provider_name, json_data=data, data=request.data,
+            account_key=get_account_key(providers, provider_name,
+                                        request.headers))
+        if file_result:
+            # driver connection is used until stream is consumed
+            result = ClosingIterator(
+                result, partial(release_driver_instance, driver))
+            driver = None
+            return Response(result, mimetype='text/plain',
+                            direct_passthrough=True)
+        response = JsonResponse(
+            get_response_body(
+                driver_method.invoke_result_to_json_chunks(result)),
+            status=status_code)
+        if location_attr is not None:
+            location = getattr(result, location_attr)
+            if not isinstance(location, basestring):
+                location = str(location)
+            response.autocorrect_location_header = False
+            response.headers.add_header('Location', location)
+        return response
+    finally:
+        if driver is not None:
+            release_driver_instance(driver)
 
 
 def invoke_extension_method(providers, request, *args, **kwargs):
@@ -73,14 +285,342 @@ def invoke_extension_method(providers, request, *args, **kwargs):
     return invoke_method(providers, method_name, request, *args, **kwargs)
 
 
-def list_providers(providers, _):
-    providers_info = get_providers_info(providers)
-    return JsonResponse(json.dumps(providers_info))
+def get_batch_operations(json_data):
+    """
+    Return list of (method name, arguments) from batch request data.
+
+    @raise: ValidationError
+    """
+    operations = json_data.get('operations') \
+        if isinstance(json_data, dict) else None
+    if not isinstance(operations, list) or not operations:
+        raise ValidationError('operations should be not empty list')
+    if len(operations) > BATCH_MAX_OPERATIONS:
+        raise ValidationError('Batch can contain at most %d operations' %
+                              (BATCH_MAX_OPERATIONS))
+    result = []
+    for operation in operations:
+        if not isinstance(operation, dict) or \
+                not isinstance(operation.get('method'), basestring) or \
+                not isinstance(operation.get('args', {}), dict):
+            raise ValidationError('operation should contain method name '
+                                  'and dict of arguments')
+        result.append((operation['method'], operation.get('args', {})))
+    return result
+
 
+def is_batch_method(method_name):
+    """
+    Return True if method can be invoked by batch request: method of REST
+    endpoint or extension method.
+    """
+    return method_name in BATCH_METHODS or method_name.startswith('ex_')
 
-def provider_info(providers, request):
+
+def invoke_batch_operation(driver, provider_name, method_name, args,
+                           account_key=None):
+    """
+    Invoke one operation of batch.
+
+    @return: json string with result or error of operation
     """
-    Introspect provider class and return response what contain:
+    try:
+        if not is_batch_method(method_name):
+            raise NoSuchOperationError()
+        driver_method = DriverMethod(driver, method_name)
+        result = call_driver_method(driver_method, provider_name,
+                                    json_data=args, account_key=account_key)
+        return '{"status": %d, "result": %s}' % (
+            httplib.OK, driver_method.invoke_result_to_json(result))
+    except LibcloudRestError, e:
+        error = e
+    except Exception, e:
+        logger.error('Exception in batch operation %s' % (method_name),
+                     exc_info=True)
+        error = InternalError(detail=str(e))
+    data = error.to_dict()
+    data['status'] = error.http_status_code
+    return json_codec.dumps(data)
+
+
+def invoke_batch(providers, request):
+    """
+    Invoke list of driver methods with credentials of one request.
+    Request body is C{dict} with keys:
+    operations - list of C{dict} with method name (method) and
+        method arguments (args)
+    max_parallel - number of operations which are executed in parallel,
+        every parallel operation uses own driver instance
+
+    @return: Response with list of operations results in the same order,
+        result is C{dict} with HTTP status code (status) and method result
+        (result) or error description (error)
+    """
+    json_data = get_request_json_data(request)
+    operations = get_batch_operations(json_data)
+    max_parallel = json_data.get('max_parallel', 1)
+    if not isinstance(max_parallel, (int, long)) or max_parallel < 1:
+        raise ValidationError('max_parallel should be positive integer')
+    max_parallel = min(max_parallel, BATCH_MAX_PARALLEL, len(operations))
+    provider_name = request.args.get('provider')
+    account_key = get_account_key(providers, provider_name, request.headers)
+    results = [None] * len(operations)
+    indexes = Queue.Queue()
+    for index in xrange(len(operations)):
+        indexes.put(index)
+
+    def invoke_operations(driver):
+        try:
+            while True:
+                try:
+                    index = indexes.get_nowait()
+                except Queue.Empty:
+                    break
+                method_name, args = operations[index]
+                results[index] = invoke_batch_operation(
+                    driver, provider_name, method_name, args, account_key)
+        finally:
+            release_driver_instance(driver)
+
+    #errors of credentials are returned for whole request
+    drivers = [get_driver_instance_by_request(providers, request)]
+    try:
+        for _ in xrange(max_parallel - 1):
+            drivers.append(get_driver_instance_by_request(providers,
+                                                          request))
+    except Exception:
+        for driver in drivers:
+            release_driver_instance(driver)
+        raise
+    threads = []
+    for driver in drivers[1:]:
+        thread = threading.Thread(target=invoke_operations, args=(driver, ))
+        thread.start()
+        threads.append(thread)
+    invoke_operations(drivers[0])
+    for thread in threads:
+        thread.join()
+    return JsonResponse('[%s]' % (', '.join(results)))
+
+
+def get_fanout_accounts(json_data):
+    """
+    Return list of (account, provider name, L{Headers} with credentials)
+    from request to all providers.
+
+    @raise: ValidationError
+    """
+    accounts = json_data.get('accounts') \
+        if isinstance(json_data, dict) else None
+    if not isinstance(accounts, list) or not accounts:
+        raise ValidationError('accounts should be not empty list')
+    if len(accounts) > FANOUT_MAX_ACCOUNTS:
+        raise ValidationError('Request can contain at most %d accounts' %
+                              (FANOUT_MAX_ACCOUNTS))
+    result = []
+    for index, account in enumerate(accounts):
+        if not isinstance(account, dict) or \
+                not isinstance(account.get('provider'), basestring) or \
+                not isinstance(account.get('headers', {}), dict):
+            raise ValidationError('account should contain provider name '
+                                  'and dict of X-headers')
+        headers = Headers([(str(key), value) for key, value
+                           in account.get('headers', {}).items()])
+        result.append((account.get('account', index), account['provider'],
+                       headers))
+    return result
+
+
+def render_fanout_result(driver_method, result, provider_name, account):
+    """
+    Return list of result objects represented as C{dict} with
+    provider and account tags.
+    """
+    object_entry = driver_method.result_entry.object_entry
+    to_json_data = getattr(object_entry, 'to_json_data', None)
+    items = []
+    for obj in result:
+        if to_json_data is not None:
+            item = dict(to_json_data(obj))
+        else:
+            item = json_codec.loads(object_entry.to_json(obj))
+        item['provider'] = provider_name
+        item['account'] = account
+        items.append(item)
+    return items
+
+
+#provider threads of requests to all providers are shared by process,
+#thread of provider which did not respond holds its slot until it returns
+fanout_threads = threading.BoundedSemaphore(FANOUT_MAX_THREADS)
+
+
+def set_connection_timeout(connection, timeout):
+    """
+    Set timeout of libcloud connection and its open socket, timeout
+    attribute alone is used only when socket is created, so it does not
+    limit pooled driver which is already connected.
+
+    @return: Previous timeout of connection
+    """
+    previous = getattr(connection, 'timeout', None)
+    connection.timeout = timeout
+    http_connection = getattr(connection, 'connection', None)
+    if http_connection is not None:
+        http_connection.timeout = timeout
+        sock = getattr(http_connection, 'sock', None)
+        if sock is not None:
+            sock.settimeout(timeout)
+    return previous
+
+
+def invoke_fanout(providers, method_name, result_name, request):
+    """
+    Invoke list method of all accounts from request body concurrently.
+    Request body is C{dict} with keys:
+    accounts - list of C{dict} with provider name (provider), credentials
+        in X-headers (headers) and optional account name (account)
+    timeout - seconds to wait for every provider, at most FANOUT_TIMEOUT
+
+    @return: Response with C{dict} which contains list of objects of all
+        accounts tagged with provider and account (result_name) and
+        list of errors of accounts (errors). Provider which did not respond
+        in timeout gets ProviderTimeout error, account which did not get
+        free thread gets ProviderBusy error.
+    """
+    json_data = get_request_json_data(request)
+    accounts = get_fanout_accounts(json_data)
+    timeout = json_data.get('timeout', FANOUT_TIMEOUT)
+    if not isinstance(timeout, (int, long, float)) or timeout <= 0:
+        raise ValidationError('timeout should be positive number')
+    timeout = min(timeout, FANOUT_TIMEOUT)
+    test = TEST_QUERY_STRING in request.query_string
+    results = [None] * len(accounts)
+
+    def invoke_account(index, account, provider_name, headers):
+        try:
+            driver = get_driver_instance_by_headers(providers, provider_name,
+                                                    headers, test)
+            connection = getattr(driver, 'connection', None)
+            if connection is not None:
+                connection_timeout = set_connection_timeout(connection,
+                                                            timeout)
+            try:
+                driver_method = DriverMethod(driver, method_name)
+                result = call_driver_method(driver_method, provider_name,
+                                            json_data={})
+                results[index] = render_fanout_result(
+                    driver_method, result, provider_name, account)
+            finally:
+                if connection is not None:
+                    set_connection_timeout(connection, connection_timeout)
+                release_driver_instance(driver)
+        except LibcloudRestError, e:
+            results[index] = e
+        except Exception, e:
+            logger.error('Exception in %s of %s' % (method_name,
+                                                    provider_name),
+                         exc_info=True)
+            results[index] = InternalError(detail=str(e))
+        finally:
+            fanout_threads.release()
+
+    threads = []
+    for index, (account, provider_name, headers) in enumerate(accounts):
+        if not fanout_threads.acquire(False):
+            results[index] = ProviderBusyError(provider=provider_name)
+            continue
+        thread = threading.Thread(
+            target=invoke_account,
+            args=(index, account, provider_name, headers))
+        #thread of provider which did not respond is not waited
+        thread.daemon = True
+        thread.start()
+        threads.append(thread)
+    deadline = time.time() + timeout
+    for thread in threads:
+        thread.join(max(deadline - time.time(), 0))
+    items = []
+    errors = []
+    for (account, provider_name, _), result in zip(accounts, results):
+        if result is None:
+            result = ProviderTimeoutError(provider=provider_name,
+                                          timeout=timeout)
+        if isinstance(result, LibcloudRestError):
+            error = result.to_dict()
+            error['status'] = result.http_status_code
+            error['provider'] = provider_name
+            error['account'] = account
+            errors.append(error)
+        else:
+            items.extend(result)
+    return JsonResponse(json_codec.dumps({result_name: items,
+                                          'errors': errors}))
+
+
+class DocumentsCache(object):
+    """
+    Thread-safe cache of serialized json documents which do not change
+    while application is running, e.g. providers info.
+    Document is stored with its strong ETag.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._documents = {}
+
+    def get(self, key, build):
+        """
+        Return (body, etag) of document, build it on first access.
+
+        @param build: function which returns document data
+        """
+        #body depends on json backend, e.g. float representation
+        key = (json_codec.get_backend(), key)
+        document = self._documents.get(key)
+        if document is None:
+            body = json_codec.dumps(build())
+            document = (body, hashlib.sha1(body).hexdigest())
+            self._lock.acquire()
+            try:
+                document = self._documents.setdefault(key, document)
+            finally:
+                self._lock.release()
+        return document
+
+    def clear(self):
+        self._lock.acquire()
+        try:
+            self._documents.clear()
+        finally:
+            self._lock.release()
+
+
+documents_cache = DocumentsCache()
+
+
+def get_document_response(request, key, build):
+    """
+    Return cached document response, I{304 Not Modified} if ETag
+    from I{If-None-Match} header matches the document.
+    """
+    body, etag = documents_cache.get(key, build)
+    response = JsonResponse(body)
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = PROVIDERS_INFO_MAX_AGE
+    return response.make_conditional(request)
+
+
+def list_providers(providers, request):
+    return get_document_response(
+        request, ('providers', providers.__name__),
+        partial(get_providers_info, providers))
+
+
+def get_provider_info(providers, provider_name):
+    """
+    Introspect provider class and return C{dict} what contain:
     name - provider.name attribute
     website - provider.website attribute
     x-headers - list of provider API credentials which user should provide
@@ -88,12 +628,7 @@ def provider_info(providers, request):
     supported_methods - list of all methods information which supported by
         provider, Method information parsed from method docstings
     """
-    provider_name = request.args.get('provider_name', '')
-    provider_name = provider_name.upper()
-    providers = get_providers_dict(providers.DRIVERS, providers.Provider)
-    if not provider_name in providers:
-        raise ProviderNotSupportedError(provider=provider_name)
-    driver = providers[provider_name]
+    driver = get_providers_registry(providers).get_driver(provider_name)
     supported_methods = {}
     for method_name, method in inspect.getmembers(driver,
                                                   inspect.ismethod):
@@ -109,11 +644,22 @@ def provider_info(providers, request):
     init_arguments = init_description['arguments']
     for arg in init_arguments[:]:
         arg['name'] = ARGS_TO_XHEADERS_DICT[arg['name']]
-    result = {'name': driver.name,
-              'website': driver.website,
-              'X-headers': init_arguments,
-              'supported_methods': supported_methods}
-    return JsonResponse(json.dumps(result))
+    return {'name': driver.name,
+            'website': driver.website,
+            'X-headers': init_arguments,
+            'supported_methods': supported_methods}
+
+
+def provider_info(providers, request):
+    """
+    Return provider information, see L{get_provider_info}.
+    Unknown providers are not cached.
+    """
+    provider_name = request.args.get('provider_name', '')
+    provider_name = provider_name.upper()
+    return get_document_response(
+        request, ('provider', providers.__name__, provider_name),
+        partial(get_provider_info, providers, provider_name))
 
 
 class ServiceHandler(object):
@@ -156,4 +702,24 @@ def index(_):
         'libcloud_version': libcloud.__version__,
         'api_version': versions[libcloud.__version__]
     }
-    return Response(json.dumps(response))
+    return Response(json_codec.dumps(response))
+
+
+@app_handler.handler('/stats')
+def stats(_):
+    """
+    Return counters of caches and pools of server process.
+    """
+    response = {
+        'response_cache': response_cache.get_stats(),
+        'request_coalescing': request_flights.get_stats(),
+        'drivers_pool': drivers_pool.get_stats(),
+        'driver_methods_cache': driver_methods_cache.get_stats(),
+        'provider_limits': provider_limits.get_stats(),
+        'downloads': object_downloads.get_stats(),
+        'listings': object_listings.get_stats(),
+        'uploads': object_uploads.get_stats(),
+        'multipart_uploads': multipart_uploads.get_stats(),
+        'object_cache': object_cache.get_stats(),
+    }
+    return JsonResponse(json_codec.dumps(response))
@@ -5,8 +5,8 @@ import httplib
 from libcloud.compute import providers
 
 from libcloud_rest.api.handlers import ServiceHandler, invoke_method,\
-    invoke_extension_method, list_providers, provider_info
-from libcloud_rest.utils import json
+    invoke_extension_method, list_providers, provider_info, invoke_batch,\
+    invoke_fanout
 
 invoke_method = partial(invoke_method, providers)
 
@@ -14,6 +14,10 @@ compute_handler = ServiceHandler('/compute/')
 
 compute_handler.add_handlers([
     ('/providers', partial(list_providers, providers)),
+    ('/<string:provider>/_batch', partial(invoke_batch, providers),
+     ['POST']),
+    ('/_all/nodes',
+     partial(invoke_fanout, providers, 'list_nodes', 'nodes'), ['POST']),
     ('/providers/<string:provider_name>',
      partial(provider_info, providers)),
     ('/<string:provider>/<string:method_name>',
@@ -32,19 +36,15 @@ def create_node(request):
 
     @return: Response object with newly created node ID in Location.
     """
-    response = invoke_method('create_node', request)
-    node_id = json.loads(response.data)['id']
-    response.autocorrect_location_header = False
-    response.headers.add_header('Location', node_id)
-    response.status_code = httplib.CREATED
-    return response
+    return invoke_method('create_node', request, status_code=httplib.CREATED,
+                         location_attr='id')
 
 
 @compute_handler.handler('/<string:provider>/nodes/<string:node_id>/reboot',
                          methods=['PUT'])
 def reboot_node(request):
     json_data = {'node_id': request.args['node_id']}
-    return invoke_method('reboot_node', request, data=json.dumps(json_data),
+    return invoke_method('reboot_node', request, data=json_data,
                          status_code=httplib.ACCEPTED)
 
 
@@ -52,5 +52,5 @@ def reboot_node(request):
                          methods=['DELETE'])
 def destroy_node(request):
     json_data = {'node_id': request.args['node_id']}
-    return invoke_method('destroy_node', request, data=json.dumps(json_data),
+    return invoke_method('destroy_node', request, data=json_data,
                          status_code=httplib.ACCEPTED)
@@ -6,8 +6,9 @@ import httplib
 from libcloud.loadbalancer import providers
 
 from libcloud_rest.api.handlers import ServiceHandler, invoke_method,\
-    invoke_extension_method, list_providers, provider_info
-from libcloud_rest.utils import json
+    invoke_extension_method, list_providers, provider_info,\
+    get_request_json_data, invoke_batch,\
+    invoke_fanout
 
 invoke_method = partial(invoke_method, providers)
 
@@ -16,6 +17,11 @@ lb_handler = ServiceHandler('/loadbalancer/')
 
 lb_handler.add_handlers([
     ('/providers', partial(list_providers, providers)),
+    ('/<string:provider>/_batch', partial(invoke_batch, providers),
+     ['POST']),
+    ('/_all/balancers',
+     partial(invoke_fanout, providers, 'list_balancers', 'balancers'),
+     ['POST']),
     ('/providers/<string:provider_name>',
         partial(provider_info, providers)),
     ('/<string:provider>/<string:method_name>',
@@ -37,27 +43,22 @@ def create_balancer(request):
 
     @return: Response object with newly created balancer ID in Location.
     """
-    response = invoke_method('create_balancer', request)
-    balancer_id = json.loads(response.data)['id']
-    response.autocorrect_location_header = False
-    response.headers.add_header('Location', balancer_id)
-    response.status_code = httplib.CREATED
-    return response
+    return invoke_method('create_balancer', request,
+                         status_code=httplib.CREATED, location_attr='id')
 
 
 @lb_handler.handler('/<string:provider>/balancers/<string:balancer_id>')
 def get_balancer(request):
-    data = json.dumps({'balancer_id': request.args['balancer_id']})
+    data = {'balancer_id': request.args['balancer_id']}
     return invoke_method('get_balancer', request, data=data)
 
 
 @lb_handler.handler('/<string:provider>/balancers/<string:loadbalancer_id>',
                     methods=['PUT'])
 def update_balancer(request):
-    json_data = json.loads(request.data)
+    json_data = get_request_json_data(request)
     json_data['loadbalancer_id'] = request.args['loadbalancer_id']
-    return invoke_method('update_balancer', request,
-                         data=json.dumps(json_data))
+    return invoke_method('update_balancer', request, data=json_data)
 
 
 @lb_handler.handler('/<string:provider>/balancers/<string:loadbalancer_id>',
@@ -68,26 +69,23 @@ def destroy_balancer(request):
     @return: Empty response body
     """
     json_data = {'loadbalancer_id': request.args['loadbalancer_id']}
-    return invoke_method('destroy_balancer', request,
-                         data=json.dumps(json_data),
+    return invoke_method('destroy_balancer', request, data=json_data,
                          status_code=httplib.ACCEPTED)
 
 
 @lb_handler.handler('/<string:provider>/balancers/<string:lb_id>/members',
                     methods=['POST'])
 def create_member(request):
-    json_data = json.loads(request.data)
+    json_data = get_request_json_data(request)
     json_data['loadbalancer_id'] = request.args['lb_id']
-    return invoke_method('balancer_attach_member', request,
-                         data=json.dumps(json_data))
+    return invoke_method('balancer_attach_member', request, data=json_data)
 
 
 @lb_handler.handler('/<string:provider>/balancers/<string:lb_id>/members')
 def list_members(request):
-    json_data = json.loads(request.data)
+    json_data = get_request_json_data(request)
     json_data['loadbalancer_id'] = request.args['lb_id']
-    return invoke_method('balancer_list_members', request,
-                         data=json.dumps(json_data))
+    return invoke_method('balancer_list_members', request, data=json_data)
 
 
 @lb_handler.handler(
@@ -99,6 +97,5 @@ def delete_member(request):
     """
     json_data = {'loadbalancer_id': request.args['lb_id'],
                  'member_id': request.args['member_id']}
-    return invoke_method('balancer_detach_member', request,
-                         data=json.dumps(json_data),
+    return invoke_method('balancer_detach_member', request, data=json_data,
                          status_code=httplib.ACCEPTED)
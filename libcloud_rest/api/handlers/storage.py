@@ -3,12 +3,26 @@ from functools import partial
 import httplib
 
 from libcloud.storage import providers
-from werkzeug.wsgi import wrap_file
 
 from libcloud_rest.api.handlers import ServiceHandler, invoke_method,\
-    list_providers, get_driver_instance
-from libcloud_rest.utils import json, Response
+    list_providers, invoke_batch, call_provider,\
+    get_driver_instance_by_request, release_driver_instance,\
+    get_account_key, invalidate_account
+from libcloud_rest.api.downloads import object_downloads,\
+    get_object_file_path
+from libcloud_rest.api.listing import object_listings
+from libcloud_rest.api.uploads import object_uploads, iter_request_body,\
+    read_request_body
+from libcloud_rest.api.multipart import multipart_uploads
+from libcloud_rest.api.object_cache import object_cache
+from libcloud_rest.api.parser import parse_request_headers
+from libcloud_rest.api.pool import get_credentials_hash
+from libcloud_rest.api.providers import get_providers_registry
+from libcloud_rest.constants import MULTIPART_COMPLETE_MAX_BODY_LENGTH
+from libcloud_rest.errors import ValidationError
+from libcloud_rest.utils import JsonResponse
 from libcloud_rest.api import entries
+from libcloud_rest import json_codec
 
 
 invoke_method = partial(invoke_method, providers)
@@ -19,6 +33,8 @@ storage_handler = ServiceHandler('/storage/')
 
 storage_handler.add_handlers([
     ('/providers', partial(list_providers, providers)),
+    ('/<string:provider>/_batch', partial(invoke_batch, providers),
+     ['POST']),
     ('/<string:provider>/containers',
      partial(invoke_method, 'list_containers')),
 ])
@@ -31,56 +47,227 @@ def create_container(request):
 
     @return: Response object with newly created container name in Location.
     """
-    response = invoke_method('create_container', request)
-    container_id = json.loads(response.data)['name']
-    response.autocorrect_location_header = False
-    response.headers.add_header('Location', container_id)
-    response.status_code = httplib.CREATED
-    return response
+    return invoke_method('create_container', request,
+                         status_code=httplib.CREATED, location_attr='name')
 
 
 @storage_handler.handler('/<string:provider>/containers/<string:container>')
 def get_container(request):
     data = {'container_name': request.args['container']}
-    return invoke_method('get_container', request, data=json.dumps(data))
+    return invoke_method('get_container', request, data=data)
 
 
 @storage_handler.handler('/<string:provider>/containers/<string:container>',
                          methods=['DELETE'])
 def delete_container(request):
     data = {'container_name': request.args['container']}
-    return invoke_method('delete_container',
-                         request, data=json.dumps(data),
+    return invoke_method('delete_container', request, data=data,
                          status_code=httplib.NO_CONTENT)
 
 
 @storage_handler.handler('/<string:provider>/containers/<string:container>'
                          '/objects/<string:object_name>', methods=['POST'])
-def craete_object(request):
-    driver = get_driver_instance(providers, request)
-    data = {'container_name': request.args['container']}
-    container = entries.ContainerEntry._get_object(data, driver)
-    extra = {'content_type': request.content_type}
-    result = driver.upload_object_via_stream(
-        wrap_file(request.environ, request.stream, 8096),
-        container, request.args['object_name'], extra)
-    return Response(entries.ObjectEntry.to_json(result), status=httplib.OK)
+def upload_object(request):
+    """
+    Stream request body to object, see L{ObjectUploads}.
+
+    @return: Response with uploaded object and its MD5 in ETag header
+    """
+    provider_name = request.args.get('provider')
+    driver = get_driver_instance_by_request(providers, request)
+    try:
+        call = partial(call_provider, driver.__class__, provider_name)
+        container = call(driver.get_container, request.args['container'])
+        obj, md5 = object_uploads.upload(request, driver, container,
+                                         request.args['object_name'], call)
+    finally:
+        release_driver_instance(driver)
+    invalidate_account(get_account_key(providers, provider_name,
+                                       request.headers))
+    response = JsonResponse(entries.ObjectEntry.to_json(obj),
+                            status=httplib.OK)
+    response.set_etag(obj.hash or md5)
+    return response
+
+
+def get_request_credentials_hash(request):
+    return get_credentials_hash(parse_request_headers(request.headers))
+
+
+def get_upload_target(request):
+    """
+    Return provider, credentials hash, container and object of
+    multipart upload request.
+    """
+    return {'provider': request.args['provider'],
+            'credentials': get_request_credentials_hash(request),
+            'container': request.args['container'],
+            'object': request.args['object_name']}
+
+
+def get_multipart_upload(request):
+    return multipart_uploads.get_upload(request.args['upload_id'],
+                                        get_upload_target(request))
+
+
+@storage_handler.handler('/<string:provider>/containers/<string:container>'
+                         '/objects/<string:object_name>/uploads',
+                         methods=['POST'])
+def initiate_multipart_upload(request):
+    """
+    Start multipart upload of object, see L{MultipartUploads}.
+
+    @return: Response with upload id, upload URL in Location
+    """
+    upload_id = multipart_uploads.initiate(get_upload_target(request),
+                                           request.content_type or None)
+    response = JsonResponse(json_codec.dumps({'upload_id': upload_id}),
+                            status=httplib.CREATED)
+    response.headers.add_header(
+        'Location', '%s/%s' % (request.base_url.rstrip('/'), upload_id))
+    return response
+
+
+@storage_handler.handler('/<string:provider>/containers/<string:container>'
+                         '/objects/<string:object_name>/uploads/'
+                         '<string:upload_id>/parts/<int:part_number>',
+                         methods=['PUT'])
+def upload_part(request):
+    """
+    Write request body to part of multipart upload.
+
+    @return: Response with part number, size and MD5 in ETag header
+    """
+    upload = get_multipart_upload(request)
+    part = multipart_uploads.put_part(
+        upload, request.args['part_number'],
+        iter_request_body(request, object_uploads.chunk_size),
+        request.headers.get('Content-MD5'))
+    response = JsonResponse(json_codec.dumps(part), status=httplib.OK)
+    response.set_etag(part['etag'])
+    return response
+
+
+@storage_handler.handler('/<string:provider>/containers/<string:container>'
+                         '/objects/<string:object_name>/uploads/'
+                         '<string:upload_id>')
+def list_upload_parts(request):
+    upload = get_multipart_upload(request)
+    parts = [{'part_number': part['part_number'],
+              'etag': part['etag'],
+              'size': part['size']}
+             for part in multipart_uploads.list_parts(upload)]
+    return JsonResponse(json_codec.dumps(parts))
+
+
+@storage_handler.handler('/<string:provider>/containers/<string:container>'
+                         '/objects/<string:object_name>/uploads/'
+                         '<string:upload_id>', methods=['POST'])
+def complete_multipart_upload(request):
+    """
+    Upload parts to object. Optional request body is C{dict} with
+    list of parts (parts), part is C{dict} with part number (part_number)
+    and ETag returned by part upload (etag).
+
+    @return: Response with uploaded object and its hash in ETag header
+    @raise: RequestTooLargeError if body is longer than
+        MULTIPART_COMPLETE_MAX_BODY_LENGTH
+    """
+    upload = get_multipart_upload(request)
+    requested = None
+    data = read_request_body(request, MULTIPART_COMPLETE_MAX_BODY_LENGTH)
+    if data:
+        json_data = entries.get_json_data(data)
+        if not isinstance(json_data, dict):
+            raise ValidationError('Request body should be dictionary')
+        requested = json_data.get('parts')
+    parts = multipart_uploads.select_parts(upload, requested)
+    provider_name = request.args.get('provider')
+    Driver = get_providers_registry(providers).get_driver(provider_name)
+    obj = multipart_uploads.complete(
+        upload, parts,
+        partial(get_driver_instance_by_request, providers, request),
+        release_driver_instance,
+        partial(call_provider, Driver, provider_name))
+    invalidate_account(get_account_key(providers, provider_name,
+                                       request.headers))
+    response = JsonResponse(entries.ObjectEntry.to_json(obj),
+                            status=httplib.OK)
+    if obj.hash:
+        response.set_etag(obj.hash)
+    return response
+
+
+@storage_handler.handler('/<string:provider>/containers/<string:container>'
+                         '/objects/<string:object_name>/uploads/'
+                         '<string:upload_id>', methods=['DELETE'])
+def abort_multipart_upload(request):
+    multipart_uploads.abort(get_multipart_upload(request))
+    return JsonResponse('', status=httplib.NO_CONTENT)
 
 
 @storage_handler.handler('/<string:provider>/containers/<string:cont>/objects')
 def list_objects(request):
-    data = {'container_name': request.args['cont']}
-    return invoke_method('list_container_objects',
-                         request, data=json.dumps(data))
+    """
+    Invoke list_container_objects or list objects by pages if request
+    has limit, marker or prefix argument or accepts NDJSON stream,
+    see L{ObjectListings}.
+    """
+    if not object_listings.is_listing_request(request):
+        data = {'container_name': request.args['cont']}
+        return invoke_method('list_container_objects', request, data=data)
+    provider_name = request.args.get('provider')
+    driver = get_driver_instance_by_request(providers, request)
+    try:
+        call = partial(call_provider, driver.__class__, provider_name)
+        container = call(driver.get_container, request.args['cont'])
+        response = object_listings.get_response(
+            request, driver, container, call,
+            partial(release_driver_instance, driver))
+        # driver is released when response is closed
+        driver = None
+        return response
+    finally:
+        if driver is not None:
+            release_driver_instance(driver)
 
 
 @storage_handler.handler('/<string:provider>/containers/<string:container>/'
                          'objects/<string:object>')
 def get_object(request):
-    data = {'container_name': request.args['container'],
-            'object_name': request.args['object']}
-    return invoke_method('download_object_as_stream',
-                         request, data=json.dumps(data), file_result=True)
+    """
+    Stream object content, see L{ObjectDownloads}.
+    Content of objects is served from L{ObjectCache} if it is enabled.
+    """
+    provider_name = request.args.get('provider')
+    driver = get_driver_instance_by_request(providers, request)
+    cached_file = None
+    try:
+        call = partial(call_provider, driver.__class__, provider_name)
+        obj = call(driver.get_object, request.args['container'],
+                   request.args['object'])
+        wrap_stream = None
+        if object_cache.directory and request.method == 'GET' and \
+                get_object_file_path(driver, obj) is None:
+            #object metadata revalidates cached content by ETag
+            key = object_cache.get_key(
+                provider_name, get_request_credentials_hash(request), obj)
+            if key is not None:
+                cached_file = object_cache.get(key, obj.size)
+                if cached_file is None:
+                    wrap_stream = partial(object_cache.store, key, obj.size)
+        response = object_downloads.get_response(
+            request, driver, obj, call,
+            partial(release_driver_instance, driver), file_obj=cached_file,
+            wrap_stream=wrap_stream)
+        # driver is released when response is closed
+        driver = None
+        return response
+    finally:
+        if driver is not None:
+            if cached_file is not None:
+                cached_file.close()
+            release_driver_instance(driver)
 
 
 @storage_handler.handler('/<string:provider>/containers/<string:container>/'
@@ -88,8 +275,7 @@ def get_object(request):
 def get_object_metadata(request):
     data = {'container_name': request.args['container'],
             'object_name': request.args['object']}
-    return invoke_method('get_object',
-                         request, data=json.dumps(data))
+    return invoke_method('get_object', request, data=data)
 
 
 @storage_handler.handler('/<string:provider>/containers/<string:container>/'
@@ -97,4 +283,4 @@ def get_object_metadata(request):
 def delete_object(request):
     data = {'container_name': request.args['container'],
             'object_name': request.args['object']}
-    return invoke_method('delete_object', request, data=json.dumps(data))
+    return invoke_method('delete_object', request, data=data)
@@ -0,0 +1,80 @@
+# -*- coding:utf-8 -*-
+import threading
+import time
+
+from libcloud_rest.constants import PROVIDER_CONCURRENCY_LIMIT,\
+    PROVIDER_QUEUE_TIMEOUT
+from libcloud_rest.errors import ProviderBusyError
+
+
+class ProviderLimits(object):
+    """
+    Limit number of concurrent driver calls to every provider, so slow
+    provider does not take all workers (threads or greenlets) of server.
+    Call which exceeds limit waits for free slot at most timeout seconds,
+    then ProviderBusyError is raised.
+    """
+
+    def __init__(self, limit=PROVIDER_CONCURRENCY_LIMIT,
+                 timeout=PROVIDER_QUEUE_TIMEOUT):
+        """
+        @param limit: Max number of concurrent calls to one provider,
+            0 to disable
+        """
+        self.limit = limit
+        self.timeout = timeout
+        self._condition = threading.Condition(threading.Lock())
+        self._in_flight = {}
+        self.waited = 0
+        self.rejected = 0
+
+    def acquire(self, provider, provider_name=None):
+        """
+        Take call slot of provider, wait if all slots are taken.
+
+        @param provider: Key of provider, e.g. driver class
+        @param provider_name: Name of provider used in error message
+
+        @raise: ProviderBusyError
+        """
+        if not self.limit:
+            return
+        deadline = None
+        self._condition.acquire()
+        try:
+            while self._in_flight.get(provider, 0) >= self.limit:
+                now = time.time()
+                if deadline is None:
+                    deadline = now + self.timeout
+                    self.waited += 1
+                if now >= deadline:
+                    self.rejected += 1
+                    raise ProviderBusyError(
+                        provider=provider_name or str(provider))
+                self._condition.wait(deadline - now)
+            self._in_flight[provider] = self._in_flight.get(provider, 0) + 1
+        finally:
+            self._condition.release()
+
+    def release(self, provider):
+        if not self.limit:
+            return
+        self._condition.acquire()
+        try:
+            in_flight = self._in_flight.get(provider, 0) - 1
+            if in_flight > 0:
+                self._in_flight[provider] = in_flight
+            else:
+                self._in_flight.pop(provider, None)
+            #waiters of all providers share condition
+            self._condition.notify_all()
+        finally:
+            self._condition.release()
+
+    def get_stats(self):
+        return {'in_flight': sum(self._in_flight.values()),
+                'waited': self.waited,
+                'rejected': self.rejected}
+
+
+provider_limits = ProviderLimits()
@@ -0,0 +1,297 @@
+# -*- coding:utf-8 -*-
+import heapq
+import httplib
+from itertools import chain, islice
+from operator import attrgetter
+import threading
+
+from libcloud.common.types import LibcloudError
+from libcloud.utils.xml import fixxpath
+from werkzeug.wsgi import ClosingIterator
+
+from libcloud_rest import json_codec
+from libcloud_rest.api.entries import ObjectEntry
+from libcloud_rest.constants import LIST_OBJECTS_PAGE_SIZE,\
+    LIST_OBJECTS_MAX_LIMIT
+from libcloud_rest.errors import LibcloudRestError, InternalError,\
+    ValidationError
+from libcloud_rest.log import logger
+from libcloud_rest.utils import JsonResponse, Response
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+LISTING_ARGUMENTS = ('limit', 'marker', 'prefix')
+
+
+def get_s3_page(driver, container, prefix, marker, limit):
+    """
+    Request page of objects of S3 bucket.
+
+    @return: (list of objects, True if bucket has more objects)
+    """
+    params = {'max-keys': limit}
+    if prefix:
+        params['prefix'] = prefix
+    if marker:
+        params['marker'] = marker
+    response = driver.connection.request(
+        driver._get_container_path(container), params=params)
+    if response.status != httplib.OK:
+        raise LibcloudError('Unexpected status code: %s' % (response.status),
+                            driver=driver)
+    objects = driver._to_objs(obj=response.object, xpath='Contents',
+                              container=container)
+    is_truncated = response.object.findtext(
+        fixxpath(xpath='IsTruncated', namespace=driver.namespace))
+    return objects, (is_truncated or '').lower() == 'true'
+
+
+def get_cloudfiles_page(driver, container, prefix, marker, limit):
+    """
+    Request page of objects of CloudFiles container.
+
+    @return: (list of objects, True if container may have more objects)
+    """
+    params = {'limit': limit}
+    if prefix:
+        params['prefix'] = prefix
+    if marker:
+        params['marker'] = marker
+    response = driver.connection.request('/%s' % (container.name),
+                                         params=params)
+    if response.status == httplib.NO_CONTENT:
+        return [], False
+    if response.status != httplib.OK:
+        raise LibcloudError('Unexpected status code: %s' % (response.status),
+                            driver=driver)
+    objects = driver._to_object_list(json_codec.loads(response.body),
+                                     container)
+    return objects, len(objects) >= limit
+
+
+def get_page_function(driver):
+    """
+    Return function which requests page of objects sorted by name
+    with prefix and marker or None if driver does not support it.
+    """
+    if hasattr(driver, '_get_container_path') and \
+            hasattr(driver, '_to_objs') and hasattr(driver, 'namespace'):
+        return get_s3_page
+    if hasattr(driver, '_get_more') and hasattr(driver, '_to_object_list'):
+        return get_cloudfiles_page
+    return None
+
+
+def iter_container_objects(driver, container):
+    """
+    Return iterator of objects of container, objects of drivers which
+    do not implement iterate_container_objects are listed at once.
+    """
+    try:
+        return iter(driver.iterate_container_objects(container))
+    except NotImplementedError:
+        return iter(driver.list_container_objects(container))
+
+
+class ObjectListings(object):
+    """
+    List objects of container by pages.
+
+    Objects of providers with paged listing (Amazon S3, CloudFiles)
+    are requested by pages of page_size objects with prefix and marker,
+    they are sorted by name. Other drivers are iterated by
+    iterate_container_objects, objects are filtered by prefix and marker
+    here, and the first limit objects by name are kept while iterating,
+    so with limit memory does not depend on number of objects in container.
+    Objects are returned sorted by name for every driver.
+    Every provider request is made by call function (in provider slot).
+    """
+
+    def __init__(self, page_size=LIST_OBJECTS_PAGE_SIZE,
+                 max_limit=LIST_OBJECTS_MAX_LIMIT):
+        """
+        @param page_size: Number of objects requested by one provider call
+        @param max_limit: Max and default number of objects in response
+        """
+        self.page_size = page_size
+        self.max_limit = max_limit
+        self._lock = threading.Lock()
+        self.listings = 0
+        self.streams = 0
+        self.pages = 0
+        self.objects = 0
+
+    def _count(self, name, value=1):
+        self._lock.acquire()
+        try:
+            setattr(self, name, getattr(self, name) + value)
+        finally:
+            self._lock.release()
+
+    @staticmethod
+    def is_listing_request(request):
+        """
+        Return True if request has listing arguments or accepts NDJSON.
+        """
+        json_data = getattr(request, 'json_data', None) or {}
+        return any(name in json_data for name in LISTING_ARGUMENTS) or \
+            ObjectListings.is_stream_request(request)
+
+    @staticmethod
+    def is_stream_request(request):
+        return any(mimetype == NDJSON_MIMETYPE
+                   for mimetype, _ in request.accept_mimetypes)
+
+    def get_arguments(self, request):
+        """
+        Return prefix, marker and limit from request query string.
+
+        @raise: ValidationError
+        """
+        json_data = getattr(request, 'json_data', None) or {}
+        limit = json_data.get('limit')
+        if limit is not None:
+            try:
+                limit = int(limit)
+            except ValueError:
+                limit = 0
+            if not 1 <= limit <= self.max_limit:
+                raise ValidationError('limit should be integer from 1 to %d'
+                                      % (self.max_limit))
+        return json_data.get('prefix'), json_data.get('marker'), limit
+
+    def _iter_sorted_objects(self, driver, container, call, prefix, marker,
+                             limit):
+        """
+        Return objects of driver without paged listing which names start
+        with prefix and follow marker, sorted by name.
+
+        @param limit: Max number of objects, None for all objects
+        """
+        objects = call(iter_container_objects, driver, container)
+
+        def iter_matching():
+            while True:
+                page = call(list, islice(objects, self.page_size))
+                self._count('pages')
+                for obj in page:
+                    if (not prefix or obj.name.startswith(prefix)) and \
+                            (not marker or obj.name > marker):
+                        yield obj
+                if len(page) < self.page_size:
+                    return
+
+        if limit is None:
+            return sorted(iter_matching(), key=attrgetter('name'))
+        return heapq.nsmallest(limit, iter_matching(),
+                               key=attrgetter('name'))
+
+    def iter_pages(self, driver, container, call, prefix=None, marker=None,
+                   limit=None):
+        """
+        Yield lists of objects sorted by name which names start with prefix
+        and follow marker, pages are requested from provider while they
+        are read.
+
+        @param limit: Max number of objects, None for all objects
+        """
+        get_page = get_page_function(driver)
+        if get_page is None:
+            objects = self._iter_sorted_objects(driver, container, call,
+                                                prefix, marker, limit)
+            for start in xrange(0, len(objects), self.page_size):
+                page = objects[start:start + self.page_size]
+                self._count('objects', len(page))
+                yield page
+            return
+        while limit is None or limit > 0:
+            page_size = self.page_size if limit is None else \
+                min(limit, self.page_size)
+            page, truncated = call(get_page, driver, container, prefix,
+                                   marker, page_size)
+            truncated = truncated or len(page) > page_size
+            page = page[:page_size]
+            if page:
+                marker = page[-1].name
+            self._count('pages')
+            self._count('objects', len(page))
+            if page:
+                yield page
+            if not truncated or not page:
+                return
+            if limit is not None:
+                limit -= len(page)
+
+    def list_objects(self, driver, container, call, prefix=None,
+                     marker=None, limit=None):
+        """
+        Return objects which names start with prefix and follow marker.
+
+        @param limit: Max number of objects, by default max_limit
+        @return: (list of at most limit objects sorted by name,
+            name of last object if container has more objects or None)
+        """
+        limit = limit or self.max_limit
+        objects = list(chain.from_iterable(self.iter_pages(
+            driver, container, call, prefix, marker, limit + 1)))
+        self._count('listings')
+        if len(objects) > limit:
+            return objects[:limit], objects[limit - 1].name
+        return objects, None
+
+    def iter_ndjson(self, pages):
+        """
+        Yield page of objects by one chunk of lines, error in the middle
+        of listing is sent as the last line.
+        """
+        try:
+            for page in pages:
+                yield ''.join([ObjectEntry.to_json(obj) + '\n'
+                               for obj in page])
+        except Exception, e:
+            if not isinstance(e, LibcloudRestError):
+                logger.error('Exception in objects listing', exc_info=True)
+                e = InternalError(detail=str(e))
+            yield e.to_json() + '\n'
+
+    def get_response(self, request, driver, container, call, release):
+        """
+        Return response with objects of container selected by limit,
+        marker and prefix arguments of request.
+
+        JSON response contains objects and marker of next page.
+        If request accepts NDJSON objects are sent as pages are received,
+        one object per line.
+
+        @param release: Function which returns driver, it is called by
+            response, if response is not returned caller should call it
+        """
+        prefix, marker, limit = self.get_arguments(request)
+        if not self.is_stream_request(request):
+            objects, next_marker = self.list_objects(
+                driver, container, call, prefix, marker, limit)
+            release()
+            return JsonResponse(
+                '{"objects": [%s], "next_marker": %s}' % (
+                    ObjectEntry.to_json_items(objects),
+                    json_codec.dumps(next_marker)),
+                status=httplib.OK)
+        pages = self.iter_pages(driver, container, call, prefix, marker,
+                                limit)
+        #errors of the first page are returned with error status
+        first_page = next(pages, None)
+        if first_page is not None:
+            pages = chain([first_page], pages)
+        self._count('streams')
+        chunks = self.iter_ndjson(pages)
+        body = ClosingIterator(chunks, release)
+        return Response(body, mimetype=NDJSON_MIMETYPE,
+                        direct_passthrough=True)
+
+    def get_stats(self):
+        return {'listings': self.listings,
+                'streams': self.streams,
+                'pages': self.pages,
+                'objects': self.objects}
+
+
+object_listings = ObjectListings()
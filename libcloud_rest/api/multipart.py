@@ -0,0 +1,463 @@
+# -*- coding:utf-8 -*-
+import base64
+import httplib
+import os
+import Queue
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+from libcloud.common.types import LibcloudError
+from libcloud.storage.base import Object
+from libcloud.utils.py3 import urlencode
+from libcloud.utils.xml import fixxpath
+
+from libcloud_rest import json_codec
+from libcloud_rest.api.tokens import FileLock
+from libcloud_rest.api.uploads import object_uploads, UploadStream,\
+    iter_stream
+from libcloud_rest.constants import MULTIPART_MAX_PARALLEL,\
+    MULTIPART_MAX_PARTS, MULTIPART_EXPIRES
+from libcloud_rest.errors import ValidationError, NoSuchUploadError
+from libcloud_rest.log import logger
+from libcloud_rest.utils import check_private_directory
+
+UPLOAD_ID = re.compile(r'^[0-9a-f]{32}$')
+#part file name: part number and MD5 of part data
+PART_NAME = re.compile(r'^(\d{5})-([0-9a-f]{32})$')
+MANIFEST_NAME = 'manifest.json'
+LOCK_NAME = '.lock'
+
+
+def iter_parts(parts, chunk_size):
+    """
+    Yield data of part files one by one.
+    """
+    for part in parts:
+        fh = open(part['path'], 'rb')
+        try:
+            for chunk in iter_stream(fh, chunk_size):
+                yield chunk
+        finally:
+            fh.close()
+
+
+class S3MultipartUpload(object):
+    """
+    Native multipart upload of S3 driver.
+
+    Driver uploads parts of one stream sequentially only, so upload is
+    initiated, parts are sent and upload is committed by requests of driver
+    connection as in C{S3StorageDriver._upload_multipart}, every part
+    can be sent by other driver instance with the same credentials.
+    """
+
+    def __init__(self, container, object_name, content_type=None):
+        self.container = container
+        self.object_name = object_name
+        self.content_type = content_type
+        self.upload_id = None
+
+    @staticmethod
+    def is_supported(driver):
+        return getattr(driver, 'supports_s3_multipart_upload', False) and \
+            hasattr(driver, '_commit_multipart')
+
+    def _get_object_path(self, driver):
+        return driver._get_object_path(self.container, self.object_name)
+
+    def initiate(self, driver):
+        headers = {}
+        if self.content_type:
+            headers['Content-Type'] = self.content_type
+        response = driver.connection.request(
+            self._get_object_path(driver) + '?uploads', method='POST',
+            headers=headers)
+        if response.status != httplib.OK:
+            raise LibcloudError('Error initiating multipart upload',
+                                driver=driver)
+        self.upload_id = response.object.find(
+            fixxpath(xpath='UploadId', namespace=driver.namespace)).text
+
+    def upload_part(self, driver, part):
+        """
+        Send part file, part is verified by provider with its MD5.
+
+        @return: ETag of part
+        """
+        params = urlencode({'uploadId': self.upload_id,
+                            'partNumber': part['part_number']})
+        headers = {'Content-MD5': base64.b64encode(
+            part['etag'].decode('hex'))}
+        result = driver._upload_object(
+            object_name=self.object_name,
+            content_type='application/octet-stream',
+            upload_func=driver._upload_file,
+            upload_func_kwargs={'file_path': part['path']},
+            request_path='?'.join((self._get_object_path(driver), params)),
+            headers=headers, file_path=part['path'])
+        response = result['response']
+        if response.status != httplib.OK:
+            raise LibcloudError('Error uploading part %d' %
+                                (part['part_number']), driver=driver)
+        return response.headers['etag']
+
+    def commit(self, driver, etags):
+        """
+        @param etags: C{list} of (part number, part ETag)
+        @return: ETag of object
+        """
+        return driver._commit_multipart(self._get_object_path(driver),
+                                        self.upload_id, etags)
+
+    def abort(self, driver):
+        driver._abort_multipart(self._get_object_path(driver),
+                                self.upload_id)
+
+
+class MultipartUploads(object):
+    """
+    Multipart uploads of storage objects.
+
+    Client initiates upload, sends numbered parts of object by separate
+    requests (in any order and in parallel) and completes or aborts upload.
+    Upload is a directory in spool dir of L{ObjectUploads} with manifest
+    and part files, so requests of one upload can be served by different
+    worker processes. On completion parts of drivers with native multipart
+    upload are sent to provider in parallel by max_parallel threads,
+    every thread uses own driver instance. Parts of other drivers are
+    concatenated to one stream (or temporary file) and uploaded by
+    L{ObjectUploads}.
+    """
+
+    def __init__(self, uploads=object_uploads,
+                 max_parallel=MULTIPART_MAX_PARALLEL,
+                 max_parts=MULTIPART_MAX_PARTS, expires=MULTIPART_EXPIRES):
+        """
+        @param uploads: L{ObjectUploads} with spool dir and chunk size
+        @param max_parallel: Max number of parts of one upload sent
+            to provider in parallel
+        @param max_parts: Max part number
+        @param expires: Seconds after which not completed upload is removed
+        """
+        self.uploads = uploads
+        self.max_parallel = max_parallel
+        self.max_parts = max_parts
+        self.expires = expires
+        self._lock = threading.Lock()
+        self.initiated = 0
+        self.parts = 0
+        self.completed = 0
+        self.native = 0
+        self.aborted = 0
+        self.expired = 0
+        self.bytes = 0
+
+    def _count(self, name, number=1, size=0):
+        self._lock.acquire()
+        try:
+            setattr(self, name, getattr(self, name) + number)
+            self.bytes += size
+        finally:
+            self._lock.release()
+
+    def get_root(self):
+        """
+        Return directory of uploads, it is created if it does not exist.
+
+        @raise: OSError if directory is accessible by other users
+        """
+        root = os.path.join(self.uploads.spool_dir or tempfile.gettempdir(),
+                            'libcloud-rest-multipart')
+        check_private_directory(root)
+        return root
+
+    def remove_expired(self):
+        root = self.get_root()
+        try:
+            names = os.listdir(root)
+        except OSError:
+            return
+        deadline = time.time() - self.expires
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                created = os.path.getmtime(os.path.join(path, MANIFEST_NAME))
+            except OSError:
+                continue
+            if created < deadline:
+                shutil.rmtree(path, ignore_errors=True)
+                self._count('expired')
+
+    def initiate(self, target, content_type=None):
+        """
+        @param target: C{dict} with provider name (provider), credentials
+            hash (credentials), container and object names (container,
+            object), only requests with the same target can use upload
+        @return: upload id
+        """
+        self.remove_expired()
+        upload_id = uuid.uuid4().hex
+        path = os.path.join(self.get_root(), upload_id)
+        os.makedirs(path)
+        manifest = dict(target, content_type=content_type)
+        fh = open(os.path.join(path, MANIFEST_NAME), 'wb')
+        try:
+            fh.write(json_codec.dumps(manifest))
+        finally:
+            fh.close()
+        self._count('initiated')
+        return upload_id
+
+    def get_upload(self, upload_id, target):
+        """
+        @return: C{dict} with manifest of upload, its id and path
+
+        @raise: NoSuchUploadError
+        """
+        if not UPLOAD_ID.match(upload_id):
+            raise NoSuchUploadError(upload_id=upload_id)
+        path = os.path.join(self.get_root(), upload_id)
+        try:
+            fh = open(os.path.join(path, MANIFEST_NAME), 'rb')
+            try:
+                upload = json_codec.loads(fh.read())
+            finally:
+                fh.close()
+        except IOError:
+            raise NoSuchUploadError(upload_id=upload_id)
+        for key, value in target.items():
+            if upload.get(key) != value:
+                raise NoSuchUploadError(upload_id=upload_id)
+        upload['id'] = upload_id
+        upload['path'] = path
+        return upload
+
+    def list_parts(self, upload):
+        """
+        @return: C{list} of parts sorted by part number, part is C{dict}
+            with part number (part_number), MD5 hex digest (etag),
+            size and path of file
+        """
+        parts = []
+        for name in os.listdir(upload['path']):
+            match = PART_NAME.match(name)
+            if match is None:
+                continue
+            path = os.path.join(upload['path'], name)
+            parts.append({'part_number': int(match.group(1)),
+                          'etag': match.group(2),
+                          'size': os.path.getsize(path),
+                          'path': path})
+        parts.sort(key=lambda part: part['part_number'])
+        return parts
+
+    def put_part(self, upload, part_number, chunks, content_md5=None):
+        """
+        Write part data to file of upload, part with the same number
+        is replaced.
+
+        @param chunks: Iterator over part data
+        @param content_md5: Base64 encoded MD5 of data or None
+        @return: C{dict} with part number, MD5 hex digest (etag) and size
+
+        @raise: ValidationError
+        """
+        if not 1 <= part_number <= self.max_parts:
+            raise ValidationError('Part number should be from 1 to %d' %
+                                  (self.max_parts))
+        stream = UploadStream(chunks)
+        fd, temp_path = tempfile.mkstemp(prefix='.part-', dir=upload['path'])
+        try:
+            fh = os.fdopen(fd, 'wb')
+            try:
+                for chunk in stream:
+                    fh.write(chunk)
+            finally:
+                fh.close()
+            if content_md5 is not None and \
+                    content_md5 != base64.b64encode(stream.md5.digest()):
+                raise ValidationError('Content-MD5 does not match part data')
+        except Exception:
+            os.unlink(temp_path)
+            raise
+        #concurrent uploads of the same part (e.g. retries) replace it
+        #one by one, so upload keeps one file of part
+        lock = FileLock(os.path.join(upload['path'], LOCK_NAME))
+        lock.acquire()
+        try:
+            for part in self.list_parts(upload):
+                if part['part_number'] == part_number:
+                    try:
+                        os.unlink(part['path'])
+                    except OSError:
+                        pass
+            os.rename(temp_path, os.path.join(
+                upload['path'],
+                '%05d-%s' % (part_number, stream.hexdigest())))
+        finally:
+            lock.release()
+        self._count('parts', size=stream.size)
+        return {'part_number': part_number,
+                'etag': stream.hexdigest(),
+                'size': stream.size}
+
+    def select_parts(self, upload, requested=None):
+        """
+        Return parts of object.
+
+        @param requested: C{list} of C{dict} with part number (part_number)
+            and optional ETag of part (etag) in ascending order, if None
+            all uploaded parts are used
+
+        @raise: ValidationError
+        """
+        parts = self.list_parts(upload)
+        if requested is not None:
+            if not isinstance(requested, list):
+                raise ValidationError('parts should be list')
+            uploaded = dict((part['part_number'], part) for part in parts)
+            parts = []
+            for item in requested:
+                if not isinstance(item, dict) or \
+                        item.get('part_number') not in uploaded:
+                    raise ValidationError('Part %s is not uploaded' % (
+                        item.get('part_number')
+                        if isinstance(item, dict) else item))
+                part = uploaded[item['part_number']]
+                if str(item.get('etag', part['etag'])).strip('"') != \
+                        part['etag']:
+                    raise ValidationError('ETag of part %d does not match' %
+                                          (part['part_number']))
+                if parts and parts[-1]['part_number'] >= part['part_number']:
+                    raise ValidationError('Parts should be in ascending '
+                                          'order of part numbers')
+                parts.append(part)
+        if not parts:
+            raise ValidationError('Upload has no parts')
+        return parts
+
+    def _send_parts(self, native, driver, parts, get_driver, release, call):
+        """
+        Send parts in parallel, every thread uses own driver.
+
+        @return: C{list} of (part number, part ETag)
+        """
+        indexes = Queue.Queue()
+        for index in xrange(len(parts)):
+            indexes.put(index)
+        etags = [None] * len(parts)
+        errors = []
+
+        def send_parts(part_driver):
+            while not errors:
+                try:
+                    index = indexes.get_nowait()
+                except Queue.Empty:
+                    break
+                part = parts[index]
+                try:
+                    etags[index] = (part['part_number'],
+                                    call(native.upload_part, part_driver,
+                                         part))
+                except Exception:
+                    errors.append(sys.exc_info())
+
+        drivers = []
+        threads = []
+        try:
+            for _ in xrange(min(self.max_parallel, len(parts)) - 1):
+                drivers.append(get_driver())
+            for part_driver in drivers:
+                thread = threading.Thread(target=send_parts,
+                                          args=(part_driver, ))
+                thread.start()
+                threads.append(thread)
+            send_parts(driver)
+        finally:
+            for thread in threads:
+                thread.join()
+            for part_driver in drivers:
+                release(part_driver)
+        if errors:
+            exc_type, exc_value, tb = errors[0]
+            raise exc_type, exc_value, tb
+        return etags
+
+    def _complete_native(self, upload, parts, driver, container, get_driver,
+                         release, call):
+        native = S3MultipartUpload(container, upload['object'],
+                                   upload['content_type'])
+        call(native.initiate, driver)
+        try:
+            etags = self._send_parts(native, driver, parts, get_driver,
+                                     release, call)
+            etag = call(native.commit, driver, etags)
+        except Exception:
+            exc_type, exc_value, tb = sys.exc_info()
+            try:
+                call(native.abort, driver)
+            except Exception:
+                logger.error('Error in abort of multipart upload %s' %
+                             (upload['id']), exc_info=True)
+            raise exc_type, exc_value, tb
+        self._count('native')
+        return Object(name=upload['object'],
+                      size=sum(part['size'] for part in parts),
+                      hash=etag.replace('"', ''),
+                      extra={'content_type': upload['content_type']},
+                      meta_data=None, container=container, driver=driver)
+
+    def complete(self, upload, parts, get_driver, release, call):
+        """
+        Upload parts to object and remove upload. If upload of object
+        fails upload is kept, so completion can be repeated.
+
+        @param parts: Parts returned by L{select_parts}
+        @param get_driver: Function which returns driver instance
+            with credentials of upload
+        @param release: Function which returns driver instance
+        @param call: Function which calls driver method in provider slot
+        @return: uploaded L{Object}
+        """
+        driver = get_driver()
+        try:
+            container = call(driver.get_container, upload['container'])
+            if S3MultipartUpload.is_supported(driver):
+                obj = self._complete_native(upload, parts, driver,
+                                            container, get_driver, release,
+                                            call)
+            else:
+                extra = {}
+                if upload['content_type']:
+                    extra['content_type'] = upload['content_type']
+                stream = UploadStream(iter_parts(parts,
+                                                 self.uploads.chunk_size))
+                obj = self.uploads.upload_stream(driver, container,
+                                                 upload['object'], stream,
+                                                 extra, call)
+        finally:
+            release(driver)
+        shutil.rmtree(upload['path'], ignore_errors=True)
+        self._count('completed')
+        return obj
+
+    def abort(self, upload):
+        shutil.rmtree(upload['path'], ignore_errors=True)
+        self._count('aborted')
+
+    def get_stats(self):
+        return {'initiated': self.initiated,
+                'parts': self.parts,
+                'completed': self.completed,
+                'native': self.native,
+                'aborted': self.aborted,
+                'expired': self.expired,
+                'bytes': self.bytes}
+
+
+multipart_uploads = MultipartUploads()
@@ -0,0 +1,254 @@
+# -*- coding:utf-8 -*-
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+from libcloud_rest.constants import OBJECT_CACHE_DIR, OBJECT_CACHE_MAX_BYTES
+from libcloud_rest.log import logger
+from libcloud_rest.utils import check_private_directory
+
+#prefix of files which are being written
+TEMP_PREFIX = '.tmp-'
+#seconds after which temporary file of crashed process is removed
+TEMP_EXPIRES = 3600
+
+
+class StoringStream(object):
+    """
+    Iterator over object stream which writes data to temporary file
+    of cache, file is added to cache when stream ends with expected size.
+    If file can not be written stream is still returned.
+    """
+
+    def __init__(self, cache, key, size, stream):
+        self.cache = cache
+        self.key = key
+        self.size = size
+        self.stream = iter(stream)
+        self.written = 0
+        self.fh = None
+        self.temp_path = None
+        try:
+            fd, self.temp_path = tempfile.mkstemp(prefix=TEMP_PREFIX,
+                                                  dir=cache.directory)
+            self.fh = os.fdopen(fd, 'wb')
+        except (IOError, OSError):
+            logger.error('Can not create file in object cache',
+                         exc_info=True)
+            self._discard()
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        try:
+            chunk = next(self.stream)
+        except StopIteration:
+            self._finish()
+            raise
+        if self.fh is not None:
+            try:
+                self.fh.write(chunk)
+                self.written += len(chunk)
+            except (IOError, OSError):
+                logger.error('Can not write file of object cache',
+                             exc_info=True)
+                self._discard()
+        return chunk
+
+    def _discard(self):
+        if self.fh is not None:
+            self.fh.close()
+            self.fh = None
+        if self.temp_path is not None:
+            try:
+                os.unlink(self.temp_path)
+            except OSError:
+                pass
+            self.temp_path = None
+
+    def _finish(self):
+        if self.fh is None:
+            return
+        if self.written != self.size:
+            self._discard()
+            return
+        try:
+            self.fh.close()
+            self.fh = None
+            self.cache.add(self.key, self.temp_path, self.size)
+            self.temp_path = None
+        except (IOError, OSError):
+            logger.error('Can not add file to object cache', exc_info=True)
+            self._discard()
+
+    def close(self):
+        #stream which is not read to the end is not cached
+        self._discard()
+        if hasattr(self.stream, 'close'):
+            self.stream.close()
+
+
+class ObjectCache(object):
+    """
+    Disk cache of storage objects content.
+
+    Object file is named by hash of provider, credentials, container,
+    object and object ETag, so changed object (new ETag from get_object)
+    is not served from cache. File is written to temporary file while
+    object is downloaded and renamed when download is complete, so other
+    worker processes sharing the directory see complete files only.
+    Last access time of file is its modification time, least recently
+    used files are removed when total size exceeds max_bytes.
+    Directory should be private directory of server user (mode 0700),
+    otherwise objects are not cached.
+    """
+
+    def __init__(self, directory=OBJECT_CACHE_DIR,
+                 max_bytes=OBJECT_CACHE_MAX_BYTES):
+        """
+        @param directory: Directory of cached objects, None to disable cache
+        @param max_bytes: Max total size of cached objects
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        #directory which was checked by check_private_directory
+        self._checked_directory = None
+        #size is counted by scan of directory when it may exceed max_bytes
+        self._scanned = False
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.size = 0
+
+    def _count(self, name):
+        self._lock.acquire()
+        try:
+            setattr(self, name, getattr(self, name) + 1)
+        finally:
+            self._lock.release()
+
+    def get_key(self, provider_name, credentials_hash, obj):
+        """
+        Return key of object content or None if object is not cached:
+        cache is disabled, object has no ETag or size, or it is larger
+        than cache.
+        """
+        if not self.directory or not obj.hash or obj.size is None or \
+                obj.size > self.max_bytes:
+            return None
+        key = repr((provider_name, credentials_hash, obj.container.name,
+                    obj.name, obj.hash))
+        return hashlib.sha1(key).hexdigest()
+
+    def _check_directory(self):
+        """
+        Return True if directory is private directory of current user,
+        directory is created and checked once.
+        """
+        directory = self.directory
+        if directory == self._checked_directory:
+            return True
+        try:
+            check_private_directory(directory)
+        except OSError, e:
+            logger.error('Object cache directory is not used: %s' % (e))
+            return False
+        self._checked_directory = directory
+        return True
+
+    def get(self, key, size):
+        """
+        Return open cached file or None. File is opened here, so it stays
+        readable when it is evicted by other process.
+        """
+        if not self._check_directory():
+            return None
+        path = os.path.join(self.directory, key)
+        try:
+            fh = open(path, 'rb')
+        except IOError:
+            self._count('misses')
+            return None
+        if os.fstat(fh.fileno()).st_size != size:
+            fh.close()
+            self._unlink(path)
+            self._count('misses')
+            return None
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        self._count('hits')
+        return fh
+
+    def store(self, key, size, stream):
+        """
+        Return stream which adds object to cache when it is read.
+        """
+        if not self._check_directory():
+            return stream
+        return StoringStream(self, key, size, stream)
+
+    def add(self, key, temp_path, size):
+        if not self._scanned or self.size + size > self.max_bytes:
+            self.evict(size)
+        else:
+            self.size += size
+        os.rename(temp_path, os.path.join(self.directory, key))
+        self._count('stores')
+
+    def evict(self, size=0):
+        """
+        Remove least recently used files, so size bytes can be added.
+        Files of all processes are listed, so size of cache is updated.
+        """
+        now = time.time()
+        files = []
+        total = 0
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if name.startswith(TEMP_PREFIX):
+                if stat.st_mtime < now - TEMP_EXPIRES:
+                    self._unlink(path)
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        files.sort()
+        for _, file_size, path in files:
+            if total + size <= self.max_bytes:
+                break
+            #file which is being sent stays readable after unlink
+            if self._unlink(path):
+                self._count('evictions')
+            total -= file_size
+        self.size = total + size
+        self._scanned = True
+
+    def _unlink(self, path):
+        try:
+            os.unlink(path)
+            return True
+        except OSError:
+            return False
+
+    def get_stats(self):
+        lookups = self.hits + self.misses
+        return {'enabled': bool(self.directory),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': float(self.hits) / lookups if lookups else 0.0,
+                'stores': self.stores,
+                'evictions': self.evictions,
+                'bytes': self.size}
+
+
+object_cache = ObjectCache()
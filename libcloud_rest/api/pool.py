@@ -0,0 +1,138 @@
+# -*- coding:utf-8 -*-
+import hashlib
+import threading
+import time
+
+from libcloud_rest.api.providers import get_driver_instance
+from libcloud_rest.api.tokens import get_token_store, install_token_store
+from libcloud_rest.constants import DRIVERS_POOL_SIZE,\
+    DRIVERS_POOL_IDLE_TIMEOUT, DRIVERS_POOL_MAX_AGE, AUTH_TOKENS_DIR
+
+
+def get_credentials_hash(api_data):
+    """
+    Return hash of driver constructor arguments,
+    so credentials are not stored as pool keys.
+    """
+    credentials = repr(sorted(api_data.items()))
+    return hashlib.sha1(credentials).hexdigest()
+
+
+class DriversPool(object):
+    """
+    Pool of driver instances keyed by driver class and credentials.
+    Reused driver keeps its connection and auth token, so requests
+    with the same credentials do not authenticate again.
+
+    Driver instance is used by one thread at time: L{checkout} removes
+    idle driver from pool and L{checkin} returns it back.
+    Idle drivers are evicted when pool is full (least recently used first),
+    when they were not used for idle_timeout seconds
+    or when they are older than max_age seconds.
+
+    New drivers take auth tokens from token_store (if provided), so
+    drivers with the same credentials authenticate once.
+    """
+
+    def __init__(self, max_size=DRIVERS_POOL_SIZE,
+                 idle_timeout=DRIVERS_POOL_IDLE_TIMEOUT,
+                 max_age=DRIVERS_POOL_MAX_AGE, token_store=None):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.max_age = max_age
+        self.token_store = token_store
+        self._lock = threading.Lock()
+        # list of (last used time, key, driver) sorted by last used time
+        self._idle = []
+        self.created = 0
+        self.reused = 0
+        self.evicted = 0
+
+    def _is_expired(self, entry, now):
+        last_used, key, driver = entry
+        return now - last_used >= self.idle_timeout or \
+            now - driver._pool_info[1] >= self.max_age
+
+    def _evict(self, now):
+        """
+        Remove least recently used drivers while they are expired or pool
+        is full, must be called with acquired lock. Drivers are sorted by
+        last used time only, older drivers behind head are removed by
+        L{checkout}.
+        """
+        while self._idle:
+            if len(self._idle) <= self.max_size and \
+                    not self._is_expired(self._idle[0], now):
+                break
+            self._idle.pop(0)
+            self.evicted += 1
+
+    def checkout(self, Driver, api_data):
+        """
+        Return idle driver created with the same credentials
+        or create new one.
+        """
+        if not self.max_size:
+            return self._create_driver(Driver, api_data)
+        key = (Driver, get_credentials_hash(api_data))
+        now = time.time()
+        self._lock.acquire()
+        try:
+            self._evict(now)
+            for index in xrange(len(self._idle) - 1, -1, -1):
+                if self._idle[index][1] == key:
+                    entry = self._idle.pop(index)
+                    if self._is_expired(entry, now):
+                        self.evicted += 1
+                        continue
+                    self.reused += 1
+                    return entry[2]
+        finally:
+            self._lock.release()
+        driver = self._create_driver(Driver, api_data)
+        # pool key and creation time
+        driver._pool_info = (key, now)
+        self._lock.acquire()
+        try:
+            self.created += 1
+        finally:
+            self._lock.release()
+        return driver
+
+    def _create_driver(self, Driver, api_data):
+        driver = get_driver_instance(Driver, api_data)
+        if self.token_store is not None:
+            install_token_store(driver, self.token_store)
+        return driver
+
+    def checkin(self, driver):
+        """
+        Return driver to pool. Drivers which were not created by pool
+        are ignored.
+        """
+        pool_info = getattr(driver, '_pool_info', None)
+        if pool_info is None:
+            return
+        now = time.time()
+        self._lock.acquire()
+        try:
+            self._idle.append((now, pool_info[0], driver))
+            self._evict(now)
+        finally:
+            self._lock.release()
+
+    def clear(self):
+        self._lock.acquire()
+        try:
+            self._idle = []
+        finally:
+            self._lock.release()
+
+    def get_stats(self):
+        return {'idle': len(self._idle),
+                'created': self.created,
+                'reused': self.reused,
+                'evicted': self.evicted}
+
+
+drivers_pool = DriversPool(token_store=get_token_store(AUTH_TOKENS_DIR))
@@ -1,6 +1,7 @@
 # -*- coding:utf-8 -*-
 import inspect
 import re
+import threading
 
 from libcloud.utils.misc import get_driver
 
@@ -9,8 +10,232 @@ from libcloud_rest.api.parser import ARGS_TO_XHEADERS_DICT,\
 from libcloud_rest.errors import ProviderNotSupportedError,\
     MissingArguments, MissingHeadersError, MethodParsingException,\
     NoSuchOperationError
-from libcloud_rest.api.entries import Entry
-from libcloud_rest.utils import json
+from libcloud_rest.api.entries import Entry, get_json_data
+from libcloud_rest.log import logger
+
+
+def _get_entry(*args, **kwargs):
+    """
+    Create entry, types which can not be represented are parsing errors.
+    """
+    try:
+        return Entry(*args, **kwargs)
+    except ValueError, e:
+        raise MethodParsingException(str(e))
+
+
+def parse_method_spec(driver_cls, method_name):
+    """
+    Parse driver method docstring and arguments.
+
+    @return: C{dict} which contain only builtin types:
+        description - method description
+        vargs - list of entries arguments for method arguments
+        kwargs - list of entries arguments for keyword arguments
+        return - entry arguments for method result
+
+    @raise: MethodParsingException
+    """
+    method = getattr(driver_cls, method_name, None)
+    method_doc = get_method_docstring(driver_cls, method_name)
+    if not method_doc:
+        raise MethodParsingException('Empty docstring')
+    argspec_arg = parse_args(method)
+    docstring_parse_result = parse_docstring(method_doc, driver_cls)
+    docstring_args = docstring_parse_result['arguments']
+    #check vargs
+    vargs = []
+    for name, arg_info in argspec_arg.iteritems():
+        if name in docstring_args:
+            docstring_arg = docstring_args[name]
+            entry_kwargs = {
+                'name': name,
+                'description': docstring_arg['description'],
+                'type_name': docstring_arg['type_name'],
+                'required': (docstring_arg['required'] or
+                             arg_info['required']),
+            }
+            if not entry_kwargs['required'] and 'default' in arg_info:
+                entry_kwargs['default'] = arg_info['default']
+            vargs.append(entry_kwargs)
+        else:
+            raise MethodParsingException(
+                '%s %s not described in docstring' % (method_name, name))
+        #update kwargs
+    kwargs = []
+    for arg_name in set(docstring_args).difference(argspec_arg):
+        entry_kwargs = dict(docstring_args[arg_name])
+        entry_kwargs['name'] = arg_name
+        kwargs.append(entry_kwargs)
+    method_return = docstring_parse_result['return']
+    return {'description': docstring_parse_result['description'],
+            'vargs': vargs,
+            'kwargs': kwargs,
+            'return': {'name': '',
+                       'type_name': method_return['type_name'],
+                       'description': method_return['description'],
+                       'required': True}}
+
+
+class DriverMethodInfo(object):
+    """
+    Parsed description of driver method: entries for method arguments
+    and return value. It does not depend on driver instance, so one object
+    can be shared by all requests to the same driver class and method.
+    """
+
+    def __init__(self, driver_cls, method_name, spec=None):
+        """
+        @param spec: result of L{parse_method_spec}, parsed if not provided
+        """
+        self.driver_cls = driver_cls
+        self.method_name = method_name
+        if spec is None:
+            spec = parse_method_spec(driver_cls, method_name)
+        self.spec = spec
+        self.description = spec['description']
+        self.vargs_entries = [_get_entry(**entry_kwargs)
+                              for entry_kwargs in spec['vargs']]
+        self.kwargs_entries = [_get_entry(**entry_kwargs)
+                               for entry_kwargs in spec['kwargs']]
+        self.result_entry = _get_entry(**spec['return'])
+
+
+def get_spec_key(driver_cls, method_name):
+    """
+    Return key of method spec which does not require driver import.
+    """
+    return (driver_cls.__module__, driver_cls.__name__, method_name)
+
+
+class DriverMethodsCache(object):
+    """
+    Thread-safe registry of parsed driver methods
+    keyed by (driver class, method name).
+    Methods which can not be parsed are cached too, so the same
+    MethodParsingException is raised without parsing docstring again.
+    Specs loaded by L{load_specs} are used instead of docstrings parsing.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._methods = {}
+        self._specs = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _create_method_info(self, driver_cls, method_name):
+        spec = self._specs.get(get_spec_key(driver_cls, method_name))
+        if spec is None:
+            return DriverMethodInfo(driver_cls, method_name)
+        if 'error' in spec:
+            raise MethodParsingException(spec['error'])
+        return DriverMethodInfo(driver_cls, method_name, spec)
+
+    def get(self, driver_cls, method_name):
+        """
+        Return L{DriverMethodInfo} for method, parse it on first access.
+
+        @raise: MethodParsingException
+        """
+        key = (driver_cls, method_name)
+        self._lock.acquire()
+        try:
+            method_info = self._methods.get(key)
+            if method_info is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        finally:
+            self._lock.release()
+        if method_info is None:
+            #docstring is parsed without lock, so other methods are not
+            #blocked, result of the first parsing thread is kept
+            try:
+                method_info = self._create_method_info(driver_cls,
+                                                       method_name)
+            except MethodParsingException, e:
+                method_info = e
+            self._lock.acquire()
+            try:
+                method_info = self._methods.setdefault(key, method_info)
+            finally:
+                self._lock.release()
+        if isinstance(method_info, MethodParsingException):
+            raise method_info
+        return method_info
+
+    def warm_up(self, drivers):
+        """
+        Parse all public methods and constructors of drivers.
+
+        @param drivers: iterable of driver classes
+
+        @return: C{dict} driver class: C{dict} of method name and
+            exception for methods which can not be parsed
+        """
+        failures = {}
+        for driver_cls in drivers:
+            for method_name in get_driver_method_names(driver_cls):
+                try:
+                    self.get(driver_cls, method_name)
+                except Exception, e:
+                    failures.setdefault(driver_cls, {})[method_name] = e
+        return failures
+
+    def load_specs(self, specs):
+        """
+        @param specs: C{dict} returned by L{get_specs}
+        """
+        self._lock.acquire()
+        try:
+            self._specs.update(specs)
+        finally:
+            self._lock.release()
+
+    def get_specs(self):
+        """
+        Return specs of all parsed methods keyed by L{get_spec_key}.
+        Methods which can not be parsed have spec with error message.
+        """
+        specs = dict(self._specs)
+        for (driver_cls, method_name), method_info in self._methods.items():
+            spec_key = get_spec_key(driver_cls, method_name)
+            if isinstance(method_info, MethodParsingException):
+                specs[spec_key] = {'error': str(method_info)}
+            else:
+                specs[spec_key] = method_info.spec
+        return specs
+
+    def clear(self):
+        self._lock.acquire()
+        try:
+            self._methods.clear()
+            self._specs.clear()
+            self.hits = 0
+            self.misses = 0
+        finally:
+            self._lock.release()
+
+    def get_stats(self):
+        return {'size': len(self._methods),
+                'hits': self.hits,
+                'misses': self.misses}
+
+
+driver_methods_cache = DriverMethodsCache()
+
+
+def get_driver_method_names(driver_cls):
+    """
+    Return names of driver public methods and constructor.
+    """
+    methods = [method_name for method_name, _ in
+               inspect.getmembers(driver_cls, inspect.ismethod)
+               if not method_name.startswith('_')]
+    if inspect.ismethod(driver_cls.__init__):
+        methods.append('__init__')
+    return methods
 
 
 class DriverMethod(object):
@@ -26,38 +251,11 @@ class DriverMethod(object):
         self.method = getattr(self.driver_obj, method_name, None)
         if not inspect.ismethod(self.method):
             raise NoSuchOperationError()
-        method_doc = get_method_docstring(self.driver_cls, method_name)
-        if not method_doc:
-            raise MethodParsingException('Empty docstring')
-        argspec_arg = parse_args(self.method)
-        docstring_parse_result = parse_docstring(method_doc, self.driver_cls)
-        self.description = docstring_parse_result['description']
-        docstring_args = docstring_parse_result['arguments']
-        #check vargs
-        self.vargs_entries = []
-        for name, arg_info in argspec_arg.iteritems():
-            if name in docstring_args:
-                docstring_arg = docstring_args[name]
-                entry_kwargs = {
-                    'name': name,
-                    'description': docstring_arg['description'],
-                    'type_name': docstring_arg['type_name'],
-                    'required': (docstring_arg['required'] or
-                                 arg_info['required']),
-                }
-                if not entry_kwargs['required'] and 'default' in arg_info:
-                    entry_kwargs['default'] = arg_info['default']
-                self.vargs_entries.append(Entry(**entry_kwargs))
-            else:
-                raise MethodParsingException(
-                    '%s %s not described in docstring' % (method_name, name))
-            #update kwargs
-        kwargs = set(docstring_args).difference(argspec_arg)
-        self.kwargs_entries = [Entry(arg_name, **docstring_args[arg_name])
-                               for arg_name in kwargs]
-        method_return = docstring_parse_result['return']
-        self.result_entry = Entry('', method_return['type_name'],
-                                  method_return['description'], True)
+        method_info = driver_methods_cache.get(self.driver_cls, method_name)
+        self.description = method_info.description
+        self.vargs_entries = method_info.vargs_entries
+        self.kwargs_entries = method_info.kwargs_entries
+        self.result_entry = method_info.result_entry
 
     @classmethod
     def _remove_type_name_brackets(cls, type_name):
@@ -82,13 +280,34 @@ class DriverMethod(object):
     def invoke_result_to_json(self, value):
         return self.result_entry.to_json(value)
 
+    def invoke_result_to_json_chunks(self, value):
+        return self.result_entry.iter_json(value)
+
     def invoke(self, data):
-        vargs = [e.from_json(data, self.driver_obj)
+        """
+        @param data: request body json string
+        @raise: MalformedJSONError
+        """
+        if self.vargs_entries or self.kwargs_entries:
+            json_data = get_json_data(data)
+        else:
+            #method without arguments accepts any body, e.g. empty
+            json_data = {}
+        return self.invoke_with_json_data(json_data)
+
+    def invoke_with_json_data(self, json_data):
+        """
+        Create arguments from decoded request data and call method.
+
+        @param json_data: decoded request data
+        @type json_data: C{dict}
+        """
+        vargs = [e.from_json(json_data, self.driver_obj)
                  for e in self.vargs_entries]
         kwargs = {}
         for kw_entry in self.kwargs_entries:
             try:
-                kwargs[kw_entry.name] = kw_entry.from_json(data,
+                kwargs[kw_entry.name] = kw_entry.from_json(json_data,
                                                            self.driver_obj)
             except MissingArguments:
                 if kw_entry.required:
@@ -98,6 +317,126 @@ class DriverMethod(object):
         return self.method(*vargs, **kwargs)
 
 
+class ProvidersRegistry(object):
+    """
+    Map between provider name and driver class of one component.
+    Names are collected once from providers module, so lookup does not
+    scan L{libcloud.types.Provider} attributes.
+    Driver module is imported on first lookup of provider
+    (or when registry is created if lazy is False) and class is kept
+    for next lookups.
+    """
+
+    def __init__(self, providers, lazy=True):
+        """
+        @param providers: object that contain supported providers.
+        @type  providers: L{libcloud.types.Provider}
+        """
+        self.providers = providers
+        self._lock = threading.Lock()
+        #provider name: (module name, driver class name)
+        self._drivers_paths = {}
+        for provider_name, provider in providers.Provider.__dict__.items():
+            if provider_name.startswith('_'):
+                continue
+            try:
+                if provider in providers.DRIVERS:
+                    self._drivers_paths[provider_name.upper()] = \
+                        providers.DRIVERS[provider]
+            except TypeError:
+                #unhashable attribute is not provider constant
+                continue
+        self._drivers = {}
+        self._providers_info = None
+        if not lazy:
+            self.get_drivers()
+
+    def __contains__(self, provider_name):
+        return provider_name.upper() in self._drivers_paths
+
+    def get_provider_names(self):
+        return sorted(self._drivers_paths)
+
+    def get_driver(self, provider_name):
+        """
+        Return driver class of provider.
+
+        @raise: ProviderNotSupportedError
+        """
+        provider_name = provider_name.upper()
+        Driver = self._drivers.get(provider_name)
+        if Driver is not None:
+            return Driver
+        try:
+            mod_name, driver_name = self._drivers_paths[provider_name]
+        except KeyError:
+            raise ProviderNotSupportedError(provider=provider_name)
+        _mod = __import__(mod_name, globals(), locals(), [driver_name])
+        Driver = getattr(_mod, driver_name)
+        self._lock.acquire()
+        try:
+            self._drivers[provider_name] = Driver
+        finally:
+            self._lock.release()
+        return Driver
+
+    def get_drivers(self):
+        """
+        Import all drivers.
+
+        @return: C{dict} provider name: driver class, drivers which
+            can not be imported are skipped
+        """
+        drivers = {}
+        for provider_name in self.get_provider_names():
+            try:
+                drivers[provider_name] = self.get_driver(provider_name)
+            except ImportError, e:
+                logger.info('Can not import driver %s: %s' % (provider_name,
+                                                              str(e)))
+        return drivers
+
+    def get_providers_info(self):
+        """
+        Return list of all supported providers, see L{get_providers_info}.
+        """
+        if self._providers_info is None:
+            providers_info = []
+            for provider, Driver in sorted(self.get_drivers().items()):
+                providers_info.append({
+                    'id': provider,
+                    'friendly_name': getattr(Driver, 'name', ''),
+                    'website': getattr(Driver, 'website', ''),
+                })
+            self._providers_info = providers_info
+        return self._providers_info
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_providers_registry(providers, lazy=True):
+    """
+    Return registry of providers module, it is created on first call.
+
+    @param lazy: If False import all drivers when registry is created
+    """
+    registry = _registries.get(providers.__name__)
+    if registry is None:
+        _registries_lock.acquire()
+        try:
+            registry = _registries.get(providers.__name__)
+            if registry is None:
+                registry = ProvidersRegistry(providers, lazy=lazy)
+                _registries[providers.__name__] = registry
+        finally:
+            _registries_lock.release()
+    elif not lazy:
+        registry.get_drivers()
+    return registry
+
+
 def get_providers_info(providers):
     """
     List of all supported providers.
@@ -107,15 +446,7 @@ def get_providers_info(providers):
 
     @return C{list} of C{dict} objects
     """
-    result = []
-    for provider, Driver in get_providers_dict(providers.DRIVERS,
-                                               providers.Provider).items():
-        result.append({
-            'id': provider,
-            'friendly_name': getattr(Driver, 'name', ''),
-            'website': getattr(Driver, 'website', ''),
-        })
-    return result
+    return get_providers_registry(providers).get_providers_info()
 
 
 def get_providers_dict(drivers, providers):
@@ -168,9 +499,8 @@ def get_driver_instance(Driver, kwargs):
     @return:
     """
     try:
-        json_data = json.dumps(kwargs)
         driver_method = DriverMethod(Driver, '__init__')
-        return driver_method.invoke(json_data)
+        return driver_method.invoke_with_json_data(kwargs)
     except MissingArguments, error:
         str_repr = ', '.join([ARGS_TO_XHEADERS_DICT.get(arg, arg)
                               for arg in error.arguments])
@@ -0,0 +1,324 @@
+# -*- coding:utf-8 -*-
+import calendar
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from libcloud.common.openstack import OpenStackBaseConnection,\
+    OpenStackServiceCatalog
+
+from libcloud_rest import json_codec
+from libcloud_rest.utils import check_private_directory
+
+#seconds before token expiration when token is not used anymore
+TOKEN_EXPIRATION_MARGIN = 60
+
+_expires_regex = re.compile(
+    r'(\d{4})-(\d\d)-(\d\d)T(\d\d):(\d\d):(\d\d)(?:\.\d+)?'
+    r'(Z|[+-]\d\d:?\d\d)?$')
+
+
+def parse_expires(value):
+    """
+    Convert ISO 8601 auth token expiration time to timestamp.
+
+    @return: C{float} or None if value can not be parsed
+    """
+    if not isinstance(value, basestring):
+        return None
+    m = _expires_regex.match(value.strip())
+    if m is None:
+        return None
+    groups = m.groups()
+    timestamp = calendar.timegm([int(v) for v in groups[:6]])
+    tz = groups[6]
+    if tz and tz != 'Z':
+        tz = tz.replace(':', '')
+        offset = int(tz[1:3]) * 3600 + int(tz[3:5]) * 60
+        if tz[0] == '+':
+            timestamp -= offset
+        else:
+            timestamp += offset
+    return timestamp
+
+
+class BaseTokenStore(object):
+    """
+    Storage of auth data shared by driver instances.
+    To implement other backend (e.g. Redis SETEX and SET NX based lock)
+    inherit from it and define get, set, delete and lock methods.
+    """
+
+    def get(self, key):
+        """
+        @return: C{dict} stored by L{set} or None if key is unknown
+            or expired
+        """
+        raise NotImplementedError
+
+    def set(self, key, value, ttl):
+        """
+        @param value: C{dict} which can be represented as json
+        @param ttl: seconds while value is valid
+        """
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def lock(self, key):
+        """
+        Return lock object with acquire and release methods.
+        Lock is held while driver authenticates, so only one driver
+        of all which use store authenticates with the same credentials.
+        """
+        raise NotImplementedError
+
+
+class MemoryTokenStore(BaseTokenStore):
+    """
+    Store shared by driver instances of one process.
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        value = self._data.get(key)
+        if value is None or value[0] < time.time():
+            return None
+        return value[1]
+
+    def set(self, key, value, ttl):
+        self._data[key] = (time.time() + ttl, value)
+
+    def delete(self, key):
+        self._data.pop(key, None)
+
+    def lock(self, key):
+        self._lock.acquire()
+        try:
+            return self._locks.setdefault(key, threading.Lock())
+        finally:
+            self._lock.release()
+
+
+class FileLock(object):
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.Lock()
+        self._fh = None
+
+    def acquire(self):
+        self._thread_lock.acquire()
+        if fcntl is not None:
+            self._fh = open(self.path, 'a')
+            fcntl.flock(self._fh.fileno(), fcntl.LOCK_EX)
+
+    def release(self):
+        if self._fh is not None:
+            fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+            self._fh.close()
+            self._fh = None
+        self._thread_lock.release()
+
+
+class FileTokenStore(MemoryTokenStore):
+    """
+    Store shared by all processes on host. Every key is kept in separate
+    file which is replaced atomically. Use directory on tmpfs
+    (e.g. /dev/shm) to keep tokens in shared memory.
+    """
+
+    def __init__(self, directory):
+        """
+        @param directory: Private directory of current user,
+            it is created if it does not exist
+
+        @raise: OSError if directory is accessible by other users
+        """
+        super(FileTokenStore, self).__init__()
+        self.directory = directory
+        check_private_directory(directory)
+
+    def _get_path(self, key, suffix='.json'):
+        return os.path.join(self.directory, key + suffix)
+
+    def get(self, key):
+        try:
+            fh = open(self._get_path(key))
+            try:
+                expires, value = json_codec.loads(fh.read())
+            finally:
+                fh.close()
+        except (IOError, ValueError, TypeError):
+            return None
+        if expires < time.time():
+            return None
+        return value
+
+    def set(self, key, value, ttl):
+        data = json_codec.dumps([time.time() + ttl, value])
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            fh = os.fdopen(fd, 'w')
+            try:
+                fh.write(data)
+            finally:
+                fh.close()
+            os.rename(tmp_path, self._get_path(key))
+        except (IOError, OSError):
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def delete(self, key):
+        try:
+            os.unlink(self._get_path(key))
+        except OSError:
+            pass
+
+    def lock(self, key):
+        self._lock.acquire()
+        try:
+            if key not in self._locks:
+                self._locks[key] = FileLock(self._get_path(key, '.lock'))
+            return self._locks[key]
+        finally:
+            self._lock.release()
+
+
+def get_auth_key(connection):
+    """
+    Return hash of connection credentials and auth endpoint.
+    """
+    auth_url = connection._ex_force_auth_url or connection.auth_url
+    credentials = repr((connection.__class__.__module__,
+                        connection.__class__.__name__,
+                        auth_url, connection._auth_version,
+                        connection._ex_tenant_name,
+                        connection.user_id, connection.key))
+    return hashlib.sha1(credentials).hexdigest()
+
+
+def _flatten_catalog(catalog, path=()):
+    """
+    Represent nested service catalog dict as list of rows
+    [key1, key2, ..., endpoints], keys can be None, so json objects
+    can not be used.
+    """
+    rows = []
+    for key, value in catalog.items():
+        if isinstance(value, dict):
+            rows.extend(_flatten_catalog(value, path + (key,)))
+        else:
+            rows.append(list(path + (key, value)))
+    return rows
+
+
+def _unflatten_catalog(rows):
+    catalog = {}
+    for row in rows:
+        node = catalog
+        for key in row[:-2]:
+            node = node.setdefault(key, {})
+        node[row[-2]] = row[-1]
+    return catalog
+
+
+def dump_auth(connection):
+    catalog = connection.service_catalog
+    return {'auth_token': connection.auth_token,
+            'auth_token_expires': connection.auth_token_expires,
+            'auth_user_info': connection.auth_user_info,
+            'auth_version': catalog._auth_version,
+            'service_catalog': _flatten_catalog(catalog._service_catalog)}
+
+
+def restore_auth(connection, auth_data):
+    """
+    Set auth token and service catalog of connection from store data.
+
+    @return: True if connection was restored
+    """
+    if not auth_data:
+        return False
+    catalog = OpenStackServiceCatalog.__new__(OpenStackServiceCatalog)
+    catalog._auth_version = auth_data['auth_version']
+    catalog._service_catalog = _unflatten_catalog(
+        auth_data['service_catalog'])
+    connection.service_catalog = catalog
+    connection.auth_token = auth_data['auth_token']
+    connection.auth_token_expires = auth_data['auth_token_expires']
+    connection.auth_user_info = auth_data['auth_user_info']
+    return True
+
+
+def _is_expired(connection):
+    expires = parse_expires(connection.auth_token_expires)
+    return expires is not None and\
+        expires - TOKEN_EXPIRATION_MARGIN < time.time()
+
+
+def install_token_store(driver, store, default_ttl=3600):
+    """
+    Make driver take auth token from store before authentication
+    and put token to store after authentication.
+    Only OpenStack based connections are supported.
+
+    @param default_ttl: seconds while token is stored if provider
+        did not return token expiration time
+
+    @return: True if store was installed
+    """
+    connection = getattr(driver, 'connection', None)
+    if not isinstance(connection, OpenStackBaseConnection):
+        return False
+    populate = connection._populate_hosts_and_request_paths
+
+    def populate_from_store():
+        if connection.auth_token and _is_expired(connection):
+            connection.auth_token = None
+        if not connection.auth_token:
+            key = get_auth_key(connection)
+            lock = store.lock(key)
+            lock.acquire()
+            try:
+                if not restore_auth(connection, store.get(key)) or\
+                        _is_expired(connection):
+                    connection.auth_token = None
+                    populate()
+                    expires = parse_expires(connection.auth_token_expires)
+                    if expires is None:
+                        ttl = default_ttl
+                    else:
+                        ttl = expires - TOKEN_EXPIRATION_MARGIN - time.time()
+                    if ttl > 0:
+                        store.set(key, dump_auth(connection), ttl)
+                    return
+            finally:
+                lock.release()
+        populate()
+
+    connection._populate_hosts_and_request_paths = populate_from_store
+    return True
+
+
+def get_token_store(directory=None):
+    """
+    Return store shared by processes if directory is provided,
+    otherwise store shared by drivers of current process.
+    """
+    if directory:
+        return FileTokenStore(directory)
+    return MemoryTokenStore()
@@ -0,0 +1,228 @@
+# -*- coding:utf-8 -*-
+import base64
+import hashlib
+import os
+import tempfile
+import threading
+
+from werkzeug.wsgi import LimitedStream
+
+from libcloud_rest.constants import UPLOAD_CHUNK_SIZE, UPLOAD_SPOOL_DIR
+from libcloud_rest.errors import ValidationError, RequestTooLargeError
+
+
+def iter_stream(stream, chunk_size):
+    while True:
+        data = stream.read(chunk_size)
+        if not data:
+            break
+        yield data
+
+
+def iter_chunked_stream(stream, chunk_size):
+    """
+    Decode body with chunked transfer encoding,
+    yield data by chunks of at least chunk_size bytes (except the last).
+
+    @raise: ValidationError
+    """
+    buf = []
+    buf_size = 0
+    while True:
+        line = stream.readline(1024)
+        try:
+            size = int(line.split(';', 1)[0].strip(), 16)
+        except ValueError:
+            raise ValidationError('Malformed chunked request body')
+        if size == 0:
+            #skip trailer headers
+            while stream.readline(1024) not in ('\r\n', '\n', ''):
+                pass
+            break
+        while size:
+            data = stream.read(min(size, chunk_size))
+            if not data:
+                raise ValidationError('Incomplete chunked request body')
+            size -= len(data)
+            buf.append(data)
+            buf_size += len(data)
+            if buf_size >= chunk_size:
+                yield ''.join(buf)
+                buf = []
+                buf_size = 0
+        stream.readline(1024)
+    if buf:
+        yield ''.join(buf)
+
+
+def iter_request_body(request, chunk_size):
+    """
+    Return iterator over request body. Body with chunked transfer encoding
+    is read from wsgi.input, it is decoded here unless server sets
+    wsgi.input_terminated flag (decoded input ends with body).
+    """
+    environ = request.environ
+    if 'chunked' in request.headers.get('Transfer-Encoding', '').lower():
+        if environ.get('wsgi.input_terminated'):
+            return iter_stream(environ['wsgi.input'], chunk_size)
+        return iter_chunked_stream(environ['wsgi.input'], chunk_size)
+    #request.stream parses form data of some content types into memory
+    content_length = request.headers.get('Content-Length', type=int) or 0
+    return iter_stream(LimitedStream(environ['wsgi.input'], content_length),
+                       chunk_size)
+
+
+def read_request_body(request, max_length):
+    """
+    Return request body which is not longer than max_length bytes,
+    longer body is not read.
+
+    @raise: RequestTooLargeError
+    """
+    content_length = request.headers.get('Content-Length', type=int)
+    if content_length is not None and content_length > max_length:
+        raise RequestTooLargeError(max_length=max_length)
+    data = []
+    length = 0
+    for chunk in iter_request_body(request, max_length + 1):
+        length += len(chunk)
+        if length > max_length:
+            raise RequestTooLargeError(max_length=max_length)
+        data.append(chunk)
+    return ''.join(data)
+
+
+class UploadStream(object):
+    """
+    Iterator over uploaded data which computes MD5 and size of data.
+    Chunk is read from client when driver asks for it, so client is not
+    read faster than data is sent to provider.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.md5 = hashlib.md5()
+        self.size = 0
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        chunk = next(self.chunks)
+        self.md5.update(chunk)
+        self.size += len(chunk)
+        return chunk
+
+    def hexdigest(self):
+        return self.md5.hexdigest()
+
+
+class ObjectUploads(object):
+    """
+    Upload request body to storage object by chunks of chunk_size bytes.
+
+    Drivers with chunked transfer encoding get body as stream.
+    Other drivers need size of data before upload, libcloud reads such
+    stream to memory, so body is written to temporary file in spool_dir
+    and uploaded from it.
+    """
+
+    def __init__(self, chunk_size=UPLOAD_CHUNK_SIZE,
+                 spool_dir=UPLOAD_SPOOL_DIR):
+        """
+        @param chunk_size: Number of bytes read from client at once
+        @param spool_dir: Directory of temporary files,
+            if None system default is used
+        """
+        self.chunk_size = chunk_size
+        self.spool_dir = spool_dir
+        self._lock = threading.Lock()
+        self.uploads = 0
+        self.spooled = 0
+        self.bytes = 0
+
+    def _count(self, size, spooled):
+        self._lock.acquire()
+        try:
+            self.uploads += 1
+            self.spooled += int(spooled)
+            self.bytes += size
+        finally:
+            self._lock.release()
+
+    def spool(self, stream):
+        """
+        Write stream to temporary file and return its path.
+        """
+        fd, path = tempfile.mkstemp(prefix='libcloud-rest-upload-',
+                                    dir=self.spool_dir)
+        try:
+            fh = os.fdopen(fd, 'wb')
+            try:
+                for chunk in stream:
+                    fh.write(chunk)
+            finally:
+                fh.close()
+        except Exception:
+            os.unlink(path)
+            raise
+        return path
+
+    def upload_stream(self, driver, container, object_name, stream, extra,
+                      call, content_md5=None):
+        """
+        Upload L{UploadStream} to object, stream is spooled to temporary
+        file if driver does not support chunked transfer encoding.
+        Stream with expected MD5 is always spooled and verified before
+        upload, so existing object is not replaced by corrupted data.
+
+        @param call: Function which calls driver method in provider slot
+        @param content_md5: Base64 encoded MD5 of data or None
+        @return: uploaded L{Object}
+
+        @raise: ValidationError
+        """
+        spooled = content_md5 is not None or \
+            not getattr(driver, 'supports_chunked_encoding', False)
+        if spooled:
+            path = self.spool(stream)
+            try:
+                if content_md5 is not None and \
+                        content_md5 != base64.b64encode(stream.md5.digest()):
+                    raise ValidationError(
+                        'Content-MD5 does not match uploaded data')
+                obj = call(driver.upload_object, path, container,
+                           object_name, extra=extra, verify_hash=False)
+            finally:
+                os.unlink(path)
+        else:
+            obj = call(driver.upload_object_via_stream, stream, container,
+                       object_name, extra=extra)
+        self._count(stream.size, spooled)
+        return obj
+
+    def upload(self, request, driver, container, object_name, call):
+        """
+        Upload request body, verify it by I{Content-MD5} header if given.
+
+        @param call: Function which calls driver method in provider slot
+        @return: (uploaded L{Object}, MD5 hex digest of data)
+
+        @raise: ValidationError
+        """
+        extra = {}
+        if request.content_type:
+            extra['content_type'] = request.content_type
+        stream = UploadStream(iter_request_body(request, self.chunk_size))
+        obj = self.upload_stream(driver, container, object_name, stream,
+                                 extra, call,
+                                 request.headers.get('Content-MD5'))
+        return obj, stream.hexdigest()
+
+    def get_stats(self):
+        return {'uploads': self.uploads,
+                'spooled': self.spooled,
+                'bytes': self.bytes}
+
+
+object_uploads = ObjectUploads()
@@ -28,18 +28,19 @@ class BaseValidator(object):
         Validate data
         @return True if data correct
         """
-        self.raw_data = data
-        self._validate()
+        self._validate(data)
         return True
 
-    def _validate(self):
-        if not self.required and not self.raw_data:
+    def _validate(self, data):
+        if not self.required and not data:
             return True
-        self._check_data()
+        self._check_data(data)
 
-    def _check_data(self):
+    def _check_data(self, data):
         """
         Validation function that does not check required flag.
+        Validators are shared between threads, so data is passed as argument
+        instead of being stored on instance.
         """
         raise NotImplemented('To use this class inherit from it '
                              'and define _check_data method')
@@ -53,9 +54,9 @@ class NumericValidator(BaseValidator):
         self.min = kwargs.pop('min', None)
         super(NumericValidator, self).configure(args, kwargs)
 
-    def _check_data(self):
+    def _check_data(self, data):
         try:
-            i = self.numeric_type(self.raw_data)
+            i = self.numeric_type(data)
         except (ValueError, TypeError):
             raise ValidationError('%s must be integer' % (self.name))
         if self.max is not None and i > self.max:
@@ -75,19 +76,19 @@ class FloatValidator(NumericValidator):
 
 
 class StringValidator(BaseValidator):
-    def _check_data(self):
-        if not isinstance(self.raw_data, basestring):
+    def _check_data(self, data):
+        if not isinstance(data, basestring):
             raise ValidationError('%s must be string' % (self.name))
 
 
 class BooleanValidator(BaseValidator):
-    def _check_data(self):
-        return bool(self.raw_data)
+    def _check_data(self, data):
+        return bool(data)
 
 
 class NoneValidator(BaseValidator):
-    def _check_data(self):
-        return self.raw_data is None
+    def _check_data(self, data):
+        return data is None
 
 
 class ConstValidator(BaseValidator):
@@ -95,8 +96,8 @@ class ConstValidator(BaseValidator):
         self.const = args[0]
         super(ConstValidator, self).configure(args, kwargs)
 
-    def _check_data(self):
-        if self.const != self.raw_data:
+    def _check_data(self, data):
+        if self.const != data:
             raise ValidationError('%s must be equal to %s' % (self.name,
                                                               str(self.const)))
 
@@ -111,11 +112,11 @@ class DictValidator(BaseValidator):
                 validator.name = key
         super(DictValidator, self).configure(args, kwargs)
 
-    def _check_data(self):
-        if not isinstance(self.raw_data, dict):
+    def _check_data(self, data):
+        if not isinstance(data, dict):
             raise ValidationError('%s must be dict' % (self.name))
         for key, validator in self.items_validators.iteritems():
-            validator(self.raw_data.get(key, None))
+            validator(data.get(key, None))
 
 
 class ChoicesValidator(BaseValidator):
@@ -123,8 +124,8 @@ class ChoicesValidator(BaseValidator):
         self.choices = set(args[0])
         super(ChoicesValidator, self).configure(args, kwargs)
 
-    def _check_data(self):
-        if not self.raw_data in self.choices:
+    def _check_data(self, data):
+        if not data in self.choices:
             raise ValidationError(
                 '%s must be one of %s' % (self.name, str(self.choices)))
 
@@ -134,8 +135,8 @@ class TypeValidator(BaseValidator):
         self.type = args[0]
         super(TypeValidator, self).configure(args, kwargs)
 
-    def _check_data(self):
-        if not isinstance(self.raw_data, self.type):
+    def _check_data(self, data):
+        if not isinstance(data, self.type):
             raise ValidationError(
                 '%s must be instance of type %s' % (self.name,
                                                     self.type.__name__))
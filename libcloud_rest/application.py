@@ -5,29 +5,139 @@ import re
 from werkzeug.urls import url_decode
 
 from libcloud_rest.api.urls import urls
+from libcloud_rest.api.catalogue import build_methods_catalogue,\
+    load_methods_catalogue, COMPONENTS
+from libcloud_rest.api.providers import get_providers_registry
+from libcloud_rest.api.pool import drivers_pool
+from libcloud_rest.api.limits import provider_limits
+from libcloud_rest.api.cache import response_cache, request_flights
+from libcloud_rest.api.downloads import object_downloads
+from libcloud_rest.api.uploads import object_uploads
+from libcloud_rest.api.multipart import multipart_uploads
+from libcloud_rest.api.object_cache import object_cache
+from libcloud_rest.api.tokens import get_token_store
 from libcloud_rest.api import validators as valid
+from libcloud_rest import json_codec
 from libcloud_rest.log import logger
 from .errors import LibcloudRestError, InternalError
-from libcloud_rest.constants import MAX_BODY_LENGTH
-from libcloud_rest.utils import json, Response, Request
+from libcloud_rest.constants import MAX_BODY_LENGTH, BATCH_MAX_BODY_LENGTH,\
+    EAGER_METHODS_CATALOGUE, METHODS_CATALOGUE_FILE, AUTH_TOKENS_DIR,\
+    JSON_BACKEND, LAZY_DRIVERS_IMPORT, PROVIDER_CONCURRENCY_LIMIT,\
+    PROVIDER_QUEUE_TIMEOUT, RESPONSE_CACHE_TTLS, RESPONSE_CACHE_MAX_BYTES,\
+    RESPONSE_CACHE_STALE_TTLS, REQUEST_COALESCING, DOWNLOAD_CHUNK_SIZE,\
+    UPLOAD_CHUNK_SIZE, UPLOAD_SPOOL_DIR, MULTIPART_MAX_PARALLEL,\
+    MULTIPART_EXPIRES, OBJECT_CACHE_DIR, OBJECT_CACHE_MAX_BYTES,\
+    DRIVERS_POOL_SIZE
+from libcloud_rest.utils import Response, Request
 
 
 class LibcloudRestApp(object):
     url_map = urls
     storage_url = re.compile('/[v0-9.]+/storage/.*')
+    batch_url = re.compile('/[v0-9.]+/[a-z]+/([^/]+/_batch|_all/[a-z]+)$')
+
+    def __init__(self, eager_catalogue=EAGER_METHODS_CATALOGUE,
+                 catalogue_file=METHODS_CATALOGUE_FILE,
+                 tokens_dir=AUTH_TOKENS_DIR, json_backend=JSON_BACKEND,
+                 lazy_drivers_import=LAZY_DRIVERS_IMPORT,
+                 provider_concurrency_limit=PROVIDER_CONCURRENCY_LIMIT,
+                 provider_queue_timeout=PROVIDER_QUEUE_TIMEOUT,
+                 response_cache_ttls=RESPONSE_CACHE_TTLS,
+                 response_cache_stale_ttls=RESPONSE_CACHE_STALE_TTLS,
+                 response_cache_max_bytes=RESPONSE_CACHE_MAX_BYTES,
+                 request_coalescing=REQUEST_COALESCING,
+                 download_chunk_size=DOWNLOAD_CHUNK_SIZE,
+                 upload_chunk_size=UPLOAD_CHUNK_SIZE,
+                 upload_spool_dir=UPLOAD_SPOOL_DIR,
+                 multipart_max_parallel=MULTIPART_MAX_PARALLEL,
+                 multipart_expires=MULTIPART_EXPIRES,
+                 object_cache_dir=OBJECT_CACHE_DIR,
+                 object_cache_max_bytes=OBJECT_CACHE_MAX_BYTES,
+                 drivers_pool_size=DRIVERS_POOL_SIZE):
+        """
+        @param eager_catalogue: If True parse all drivers methods on start
+        @param catalogue_file: Path of serialized methods catalogue,
+            catalogue is built and written to this path if file is missing
+        @param tokens_dir: Directory where auth tokens are shared
+            by worker processes
+        @param json_backend: Name of json library or "decoder/encoder",
+            if None the fastest installed decoder is used with json encoder
+        @param lazy_drivers_import: If False import all drivers on start
+        @param provider_concurrency_limit: Max number of concurrent driver
+            calls to one provider, 0 to disable
+        @param provider_queue_timeout: Seconds request waits for
+            provider call slot
+        @param response_cache_ttls: C{dict} method name: seconds for which
+            method result is cached
+        @param response_cache_stale_ttls: C{dict} method name: seconds for
+            which expired result is served while it is refreshed
+        @param response_cache_max_bytes: Max total length of cached
+            results, 0 to disable cache
+        @param request_coalescing: If True identical concurrent GET
+            requests of read-only methods share one provider call
+        @param download_chunk_size: Number of bytes of storage object read
+            from provider at once
+        @param upload_chunk_size: Number of bytes of uploaded object read
+            from client at once
+        @param upload_spool_dir: Directory of temporary files of uploads
+            to drivers without chunked transfer encoding
+        @param multipart_max_parallel: Max number of parts of one multipart
+            upload sent to provider in parallel
+        @param multipart_expires: Seconds after which not completed
+            multipart upload is removed
+        @param object_cache_dir: Directory of disk cache of downloaded
+            objects, None to disable cache
+        @param object_cache_max_bytes: Max total size of cached objects
+        @param drivers_pool_size: Max number of idle driver instances
+            kept for reuse, 0 to disable pool
+        """
+        provider_limits.limit = provider_concurrency_limit
+        provider_limits.timeout = provider_queue_timeout
+        response_cache.clear()
+        response_cache.ttls = dict(response_cache_ttls)
+        response_cache.stale_ttls = dict(response_cache_stale_ttls)
+        response_cache.max_bytes = response_cache_max_bytes
+        request_flights.enabled = request_coalescing
+        object_downloads.chunk_size = download_chunk_size
+        object_uploads.chunk_size = upload_chunk_size
+        object_uploads.spool_dir = upload_spool_dir
+        multipart_uploads.max_parallel = multipart_max_parallel
+        multipart_uploads.expires = multipart_expires
+        object_cache.directory = object_cache_dir
+        object_cache.max_bytes = object_cache_max_bytes
+        drivers_pool.max_size = drivers_pool_size
+        if json_backend:
+            json_codec.set_backend(json_backend)
+        for providers in COMPONENTS.values():
+            get_providers_registry(providers, lazy=lazy_drivers_import)
+        #store of previous application is not kept,
+        #idle drivers use it, so they are removed
+        drivers_pool.token_store = get_token_store(tokens_dir)
+        drivers_pool.clear()
+        self.catalogue = None
+        if catalogue_file:
+            self.catalogue = load_methods_catalogue(catalogue_file)
+        elif eager_catalogue:
+            self.catalogue = build_methods_catalogue()
 
     def preprocess_request(self, request):
+        #batch requests of storage are validated as json requests,
+        #other storage requests stream object content
+        is_batch = re.match(self.batch_url, request.path)
+        if is_batch:
+            max_body_length = BATCH_MAX_BODY_LENGTH
+        else:
+            max_body_length = MAX_BODY_LENGTH
         request_header_validator = valid.DictValidator({
-            'Content-Length': valid.IntegerValidator(max=MAX_BODY_LENGTH),
+            'Content-Length': valid.IntegerValidator(max=max_body_length),
             'Content-Type': valid.ConstValidator('application/json'),
         })
-        if request.method in ['POST', 'PUT'] and\
-                not re.match(self.storage_url, request.path):
+        if request.method in ['POST', 'PUT'] and \
+                (is_batch or not re.match(self.storage_url, request.path)):
             request_header_validator(dict(request.headers))
             #TODO: FIXME GK
         if request.method == 'GET':
-            data = url_decode(request.query_string, cls=dict)
-            request.data = json.dumps(data)
+            request.json_data = url_decode(request.query_string, cls=dict)
 
     def dispatch_request(self, handler, request):
         self.preprocess_request(request)
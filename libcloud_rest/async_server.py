@@ -0,0 +1,73 @@
+# -*- coding:utf-8 -*-
+"""
+Event loop server based on gevent.
+
+Every connection is handled by greenlet. Standard library is patched,
+so socket calls of libcloud drivers switch to other greenlets instead of
+blocking the thread: thousands of slow provider calls in progress are
+served by one OS thread. Number of concurrent calls to one provider is
+limited by L{libcloud_rest.api.limits.ProviderLimits}.
+"""
+import signal
+
+try:
+    import gevent
+    from gevent import monkey
+    from gevent.pool import Pool
+    from gevent.pywsgi import WSGIServer
+except ImportError:
+    gevent = None
+
+from libcloud_rest.log import logger
+from libcloud_rest.constants import ASYNC_MAX_CONNECTIONS,\
+    SERVER_GRACEFUL_TIMEOUT
+
+
+def patch():
+    """
+    Make blocking calls of standard library cooperative.
+    Must be called before application modules are imported,
+    so their locks and sockets are created by patched modules.
+    Server entry point (L{libcloud_rest.server}) patches standard
+    library before its first import, then this call does nothing.
+    """
+    if gevent is None:
+        raise ImportError('gevent is required for async server')
+    if not monkey.is_module_patched('threading'):
+        monkey.patch_all()
+
+
+class AsyncServer(object):
+    def __init__(self, app, host, port,
+                 max_connections=ASYNC_MAX_CONNECTIONS,
+                 graceful_timeout=SERVER_GRACEFUL_TIMEOUT):
+        """
+        @param app: WSGI application
+        @param max_connections: Max number of connections served
+            concurrently, other connections wait in listen queue
+        @param graceful_timeout: Seconds to wait for requests in progress
+            on SIGTERM or SIGINT
+        """
+        if gevent is None:
+            raise ImportError('gevent is required for async server')
+        self.app = app
+        self.host = host
+        self.port = port
+        self.max_connections = max_connections
+        self.graceful_timeout = graceful_timeout
+        self.server = None
+
+    def stop(self):
+        if self.server is not None:
+            self.server.stop(timeout=self.graceful_timeout)
+
+    def run(self):
+        self.server = WSGIServer((self.host, self.port), self.app,
+                                 spawn=Pool(self.max_connections), log=None)
+        signal_handler = getattr(gevent, 'signal_handler', None) or \
+            gevent.signal
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal_handler(signum, gevent.spawn, self.stop)
+        logger.info('Async server listening on %s:%s' %
+                    (self.host, self.port))
+        self.server.serve_forever()
@@ -2,6 +2,142 @@
 
 MAX_BODY_LENGTH = 512
 
+#max body length of batch request
+BATCH_MAX_BODY_LENGTH = 64 * 1024
+#max number of operations in batch request
+BATCH_MAX_OPERATIONS = 100
+#max number of batch operations which are executed in parallel
+BATCH_MAX_PARALLEL = 8
+#driver methods which can be invoked by batch request: methods of REST
+#endpoints and extension methods (ex_*), methods which read or write
+#local files of server (upload_object, download_object...) are not allowed
+BATCH_METHODS = frozenset([
+    'list_nodes', 'list_images', 'list_sizes', 'list_locations',
+    'create_node', 'reboot_node', 'destroy_node',
+    'list_zones', 'create_zone', 'update_zone', 'delete_zone',
+    'list_records', 'get_record', 'create_record', 'update_record',
+    'delete_record',
+    'list_protocols', 'list_supported_algorithms', 'list_balancers',
+    'create_balancer', 'get_balancer', 'update_balancer',
+    'destroy_balancer', 'balancer_list_members', 'balancer_attach_member',
+    'balancer_detach_member',
+    'list_containers', 'get_container', 'create_container',
+    'delete_container', 'list_container_objects', 'get_object',
+    'delete_object',
+])
+
+#max number of accounts in request to all providers
+FANOUT_MAX_ACCOUNTS = 20
+#default seconds to wait for every provider in request to all providers
+FANOUT_TIMEOUT = 30
+#max number of provider threads of requests to all providers in process
+FANOUT_MAX_THREADS = 100
+
 TEST_QUERY_STRING = 'test=1'
 
+#parse all drivers methods on application start instead of first request
+EAGER_METHODS_CATALOGUE = False
+
+#path of file with serialized methods catalogue, None to disable
+METHODS_CATALOGUE_FILE = None
+
+#import driver module on first request to provider instead of
+#application start, so only used drivers are loaded into memory
+LAZY_DRIVERS_IMPORT = True
+
+#max number of idle driver instances kept for reuse, 0 to disable pool
+DRIVERS_POOL_SIZE = 100
+#seconds after which idle driver instance is evicted from pool
+DRIVERS_POOL_IDLE_TIMEOUT = 300
+#seconds after which driver instance is not reused,
+#should be less than lifetime of provider auth token
+DRIVERS_POOL_MAX_AGE = 3600
+
+#directory where auth tokens are shared by worker processes,
+#if None tokens are shared by drivers of one process only
+AUTH_TOKENS_DIR = None
+
+#json library: ujson, simplejson or json, "decoder/encoder" for different
+#libraries, if None the fastest installed decoder is used with json encoder
+JSON_BACKEND = None
+
+#max number of concurrent driver calls to one provider, 0 to disable
+PROVIDER_CONCURRENCY_LIMIT = 0
+#seconds request waits for provider call slot before error is returned
+PROVIDER_QUEUE_TIMEOUT = 30
+
+#number of objects encoded to json before list response chunk is sent
+LIST_RESPONSE_CHUNK_SIZE = 100
+
+#seconds for which clients may cache providers list and provider info,
+#documents depend on libcloud version only
+PROVIDERS_INFO_MAX_AGE = 3600
+
+#seconds for which results of driver methods are cached by server,
+#results are cached per provider and credentials
+RESPONSE_CACHE_TTLS = {
+    'list_sizes': 3600,
+    'list_images': 3600,
+    'list_locations': 3600,
+    'list_supported_algorithms': 86400,
+    'list_protocols': 86400,
+}
+#seconds for which expired result is served while it is refreshed
+#in background, e.g. add list_nodes to both tables to serve hot list
+#endpoint from cache
+RESPONSE_CACHE_STALE_TTLS = {
+    'list_sizes': 3600,
+    'list_images': 3600,
+    'list_locations': 3600,
+    'list_supported_algorithms': 86400,
+    'list_protocols': 86400,
+}
+#max total length of cached results, 0 to disable cache
+RESPONSE_CACHE_MAX_BYTES = 16 * 1024 * 1024
+#methods which do not change provider state, other successful calls
+#invalidate cached results of account
+READ_ONLY_METHODS_PREFIXES = ('list_', 'get_', 'iterate_', 'download_',
+                              'ex_list_', 'ex_get_', 'ex_describe_')
+
+#if True identical concurrent GET requests of read-only methods
+#share one provider call
+REQUEST_COALESCING = True
+
+#number of bytes of storage object read from provider at once
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+#number of bytes of uploaded object read from client at once
+UPLOAD_CHUNK_SIZE = 64 * 1024
+#directory of temporary files of uploads to drivers which do not support
+#chunked transfer encoding, if None system default is used
+UPLOAD_SPOOL_DIR = None
+#max number of parts of one multipart upload sent to provider in parallel
+MULTIPART_MAX_PARALLEL = 4
+#max part number of multipart upload
+MULTIPART_MAX_PARTS = 10000
+#max length of list of parts in request which completes multipart upload
+MULTIPART_COMPLETE_MAX_BODY_LENGTH = 1024 * 1024
+#seconds after which not completed multipart upload is removed
+MULTIPART_EXPIRES = 24 * 60 * 60
+#directory of disk cache of downloaded objects content, None to disable
+OBJECT_CACHE_DIR = None
+#max total size of cached objects content
+OBJECT_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+#number of objects requested from provider by one call of paged listing
+LIST_OBJECTS_PAGE_SIZE = 1000
+#max number of objects returned by one paged listing request
+LIST_OBJECTS_MAX_LIMIT = 10000
+
+#number of worker processes of production server, 0 for number of CPU cores,
+#None to run debug server
+SERVER_WORKERS = None
+#number of threads in worker process
+SERVER_THREADS = 1
+#number of requests after which worker process is replaced, 0 to disable
+SERVER_MAX_REQUESTS = 0
+#seconds to wait for requests in progress when worker is stopped
+SERVER_GRACEFUL_TIMEOUT = 30
+
+#max number of connections served concurrently by async server
+ASYNC_MAX_CONNECTIONS = 1000
+
 VALID_LOG_LEVELS = ['DEBUG', 'ERROR', 'FATAL', 'CRITICAL', 'INFO', 'WARNING']
@@ -1,14 +1,11 @@
 # -*- coding:utf-8 -*-
 import httplib
 
-try:
-    import simplejson as json
-except ImportError:
-    import json
-
 from libcloud.dns import types as dns_types
 from libcloud.storage import types as storage_types
 
+from libcloud_rest import json_codec
+
 
 class MissingArguments(Exception):
 
@@ -50,18 +47,20 @@ class LibcloudRestError(Exception):
         self.detail = kwargs.pop('detail', '')
         super(LibcloudRestError, self).__init__()
 
-    def to_json(self):
-        """
-
-        @return:
-        """
-        data = {
+    def to_dict(self):
+        return {
             'error': {'code': self.code,
                       'name': self.name,
                       'message': self.message,
                       'detail': self.detail}
         }
-        return json.dumps(data)
+
+    def to_json(self):
+        """
+
+        @return:
+        """
+        return json_codec.dumps(self.to_dict())
 
     def __str__(self):
         return '%d (%s) - %s "%s"' % \
@@ -200,6 +199,34 @@ class NoSuchOperationError(LibcloudRestError):
     http_status_code = httplib.BAD_REQUEST
 
 
+class ProviderBusyError(LibcloudRestError):
+    code = 1020
+    name = 'ProviderBusy'
+    message = 'Too many requests to provider %(provider)s are in progress.'
+    http_status_code = httplib.SERVICE_UNAVAILABLE
+
+
+class ProviderTimeoutError(LibcloudRestError):
+    code = 1021
+    name = 'ProviderTimeout'
+    message = 'Provider %(provider)s did not respond in %(timeout)s seconds.'
+    http_status_code = httplib.GATEWAY_TIMEOUT
+
+
+class NoSuchUploadError(LibcloudRestError):
+    code = 1022
+    name = 'NoSuchUpload'
+    message = 'The specified multipart upload %(upload_id)s does not exist.'
+    http_status_code = httplib.NOT_FOUND
+
+
+class RequestTooLargeError(LibcloudRestError):
+    code = 1023
+    name = 'RequestTooLarge'
+    message = 'Request body is longer than %(max_length)s bytes.'
+    http_status_code = httplib.REQUEST_ENTITY_TOO_LARGE
+
+
 INTERNAL_LIBCLOUD_ERRORS_MAP = {
     dns_types.ZoneAlreadyExistsError: ZoneAlreadyExistsError,
     dns_types.ZoneDoesNotExistError: NoSuchZoneError,
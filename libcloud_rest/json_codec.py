@@ -0,0 +1,220 @@
+# -*- coding:utf-8 -*-
+"""
+JSON encoding and decoding used by application.
+Backend is selected once: ujson, simplejson or json from standard library,
+by default the fastest installed decoder is used with json encoder.
+Values which are not supported by json (libcloud objects, date/time)
+are converted by functions registered with L{register_converter}.
+"""
+import datetime
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+from libcloud_rest.constants import JSON_BACKEND
+
+#backends in order of preference
+BACKENDS = ['ujson', 'simplejson', 'json']
+
+#map between class and function which converts its instances to
+#value which can be represented as json
+_converters = {}
+
+
+def datetime_to_json(obj):
+    r = obj.isoformat()
+    if obj.microsecond:
+        r = r[:23] + r[26:]
+    if r.endswith('+00:00'):
+        r = r[:-6] + 'Z'
+    return r
+
+
+def date_to_json(obj):
+    return obj.isoformat()
+
+
+def time_to_json(obj):
+    #determines if a given datetime.datetime is aware.
+    if obj.tzinfo is not None and obj.tzinfo.utcoffset(obj) is not None:
+        raise ValueError("JSON can't represent timezone-aware times.")
+    r = obj.isoformat()
+    if obj.microsecond:
+        r = r[:12]
+    return r
+
+
+def register_converter(cls, function):
+    """
+    @param function: function which takes instance of cls and returns
+        value which can be represented as json
+    """
+    _converters[cls] = function
+
+
+register_converter(datetime.datetime, datetime_to_json)
+register_converter(datetime.date, date_to_json)
+register_converter(datetime.time, time_to_json)
+
+
+def default(obj):
+    """
+    Convert object which can not be represented as json.
+
+    @raise: TypeError if object type is unknown
+    """
+    convert = _converters.get(obj.__class__)
+    if convert is not None:
+        return convert(obj)
+    #instances of date/time subclasses
+    if isinstance(obj, datetime.datetime):
+        return datetime_to_json(obj)
+    elif isinstance(obj, datetime.date):
+        return date_to_json(obj)
+    elif isinstance(obj, datetime.time):
+        return time_to_json(obj)
+    raise TypeError('%r is not JSON serializable' % (obj))
+
+
+class JsonCodec(object):
+    """
+    Pair of json decoding and encoding functions.
+    """
+
+    def __init__(self, name, loads, dumps):
+        self.name = name
+        self.loads = loads
+        self.dumps = dumps
+
+
+def get_stdlib_codec(module=json):
+    """
+    Return codec based on json or simplejson module.
+    """
+    encoder = module.JSONEncoder(default=default, allow_nan=True)
+    return JsonCodec(module.__name__, module.loads, encoder.encode)
+
+
+_json_types = frozenset([str, unicode, int, long, bool, type(None)])
+
+
+class _FloatValue(Exception):
+    """
+    Raised by L{_prepare} for float, ujson does not format floats
+    as repr like json module does.
+    """
+
+
+def _prepare(obj):
+    """
+    Replace values which are not supported by json with converted values.
+
+    @raise: _FloatValue if object contains float
+    """
+    obj_type = obj.__class__
+    if obj_type in _json_types:
+        return obj
+    if obj_type is float:
+        raise _FloatValue()
+    if obj_type is dict or isinstance(obj, dict):
+        return dict([(key, _prepare(value))
+                     for key, value in obj.iteritems()])
+    if obj_type is list or isinstance(obj, (list, tuple)):
+        return [_prepare(value) for value in obj]
+    if isinstance(obj, float):
+        raise _FloatValue()
+    if isinstance(obj, (basestring, int, long)):
+        return obj
+    return _prepare(default(obj))
+
+
+def get_ujson_codec():
+    """
+    Return codec based on ujson. It does not support default hook
+    (objects are represented by their __dict__ and date/time as timestamps),
+    so values are converted before encoding.
+    Objects with floats are encoded by stdlib, so floats are formatted
+    by repr as by other backends (ujson rounds them to 15 digits),
+    and they are decoded by precise parser of ujson.
+    """
+    fallback_dumps = get_stdlib_codec().dumps
+
+    def dumps(obj):
+        try:
+            return ujson.dumps(_prepare(obj), escape_forward_slashes=False)
+        except _FloatValue:
+            return fallback_dumps(obj)
+
+    def loads(data):
+        #default float parser of ujson rounds last digits
+        return ujson.loads(data, precise_float=True)
+
+    return JsonCodec('ujson', loads, dumps)
+
+
+def get_codec(name=None):
+    """
+    Return codec of backend. Name "decoder/encoder" selects different
+    backends for decoding and encoding. If name is not provided, return
+    codec which decodes by the first installed backend from L{BACKENDS} and
+    encodes by json module: C encoder of json calls default hook faster
+    than conversion of values before ujson encoding.
+
+    @raise: ValueError if backend is unknown or not installed
+    """
+    if name is None:
+        for backend in BACKENDS:
+            try:
+                decoder = get_codec(backend)
+                break
+            except ValueError:
+                continue
+        name = '%s/json' % (decoder.name)
+    if '/' in name:
+        decoder_name, encoder_name = name.split('/', 1)
+        decoder = get_codec(decoder_name)
+        encoder = get_codec(encoder_name)
+        return JsonCodec(name, decoder.loads, encoder.dumps)
+    if name == 'ujson' and ujson is not None:
+        return get_ujson_codec()
+    if name == 'json':
+        import json as stdlib_json
+        return get_stdlib_codec(stdlib_json)
+    if name == 'simplejson' and json.__name__ == 'simplejson':
+        return get_stdlib_codec(json)
+    raise ValueError('JSON backend %s is not available' % (name))
+
+
+_codec = get_codec(JSON_BACKEND)
+
+
+def set_backend(name=None):
+    """
+    Use backend for all encoding and decoding.
+
+    @raise: ValueError if backend is unknown or not installed
+    """
+    global _codec
+    _codec = get_codec(name)
+
+
+def get_backend():
+    return _codec.name
+
+
+def dumps(obj):
+    return _codec.dumps(obj)
+
+
+def loads(data):
+    """
+    @raise: ValueError if data is not valid json
+    """
+    return _codec.loads(data)
@@ -0,0 +1,395 @@
+# -*- coding:utf-8 -*-
+"""
+Pre-fork WSGI server for production use.
+
+Master process creates application and listening socket, then forks
+worker processes which accept connections. Master restarts workers which
+exit, on SIGHUP it creates new application and replaces workers
+gracefully, on SIGTERM or SIGINT it stops workers gracefully.
+Files returned through wsgi.file_wrapper are sent by sendfile system call.
+"""
+import ctypes
+import ctypes.util
+import errno
+import multiprocessing
+import os
+import select
+import signal
+import socket
+import sys
+import threading
+import time
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+from werkzeug.wsgi import FileWrapper
+
+from libcloud_rest.log import logger
+from libcloud_rest.constants import SERVER_THREADS, SERVER_MAX_REQUESTS,\
+    SERVER_GRACEFUL_TIMEOUT
+
+#seconds between checks of worker and master state
+POLL_INTERVAL = 0.5
+
+
+def get_default_workers():
+    try:
+        return multiprocessing.cpu_count()
+    except NotImplementedError:
+        return 1
+
+
+def get_sendfile():
+    """
+    Return function sendfile(out_fd, in_fd, offset, count) which returns
+    number of sent bytes, or None if sendfile is not available.
+    Python 2 has no os.sendfile, so pysendfile package or sendfile64
+    of Linux libc is used.
+    """
+    sendfile = getattr(os, 'sendfile', None)
+    if sendfile is not None:
+        return sendfile
+    try:
+        from sendfile import sendfile
+        return sendfile
+    except ImportError:
+        pass
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        libc_sendfile = libc.sendfile64
+    except (OSError, AttributeError):
+        return None
+    libc_sendfile.argtypes = [ctypes.c_int, ctypes.c_int,
+                              ctypes.POINTER(ctypes.c_int64), ctypes.c_size_t]
+    libc_sendfile.restype = ctypes.c_ssize_t
+
+    def sendfile(out_fd, in_fd, offset, count):
+        sent = libc_sendfile(out_fd, in_fd,
+                             ctypes.byref(ctypes.c_int64(offset)), count)
+        if sent < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        return sent
+    return sendfile
+
+
+sendfile = get_sendfile()
+#max number of bytes sent by one sendfile call
+SENDFILE_BLOCK_SIZE = 1024 * 1024
+
+
+class SendfileWrapper(object):
+    """
+    wsgi.file_wrapper of L{WorkerRequestHandler}: length bytes of file
+    from its current position (or all bytes to the end if length is None)
+    are sent by sendfile, so data is copied by kernel and does not pass
+    through process. Length should be Content-Length of response, so
+    bytes appended to file after response was built are not sent.
+    """
+
+    def __init__(self, handler, fh, block_size=8192, length=None):
+        self.handler = handler
+        self.fh = fh
+        self.block_size = block_size
+        self.length = length
+
+    def close(self):
+        self.fh.close()
+
+    def __iter__(self):
+        #empty chunk makes handler send status and headers
+        yield ''
+        out_fd = self.handler.connection.fileno()
+        in_fd = self.fh.fileno()
+        offset = self.fh.tell()
+        length = self.length
+        while length is None or length > 0:
+            count = SENDFILE_BLOCK_SIZE if length is None else \
+                min(length, SENDFILE_BLOCK_SIZE)
+            try:
+                sent = sendfile(out_fd, in_fd, offset, count)
+            except OSError, e:
+                if e.errno == errno.EAGAIN:
+                    select.select([], [out_fd], [])
+                    continue
+                raise socket.error(e.errno, e.strerror)
+            if not sent:
+                break
+            offset += sent
+            if length is not None:
+                length -= sent
+
+
+class WorkerRequestHandler(WSGIRequestHandler):
+    def make_environ(self):
+        environ = WSGIRequestHandler.make_environ(self)
+        if sendfile is not None:
+            environ['wsgi.file_wrapper'] = self.wrap_file
+        return environ
+
+    def wrap_file(self, fh, block_size=8192, length=None):
+        if not hasattr(fh, 'fileno'):
+            return FileWrapper(fh, block_size)
+        return SendfileWrapper(self, fh, block_size, length)
+    #application can pass number of bytes to send (see L{SendfileWrapper})
+    wrap_file.accepts_length = True
+
+
+class WorkerWSGIServer(BaseWSGIServer):
+    """
+    WSGI server of one worker process. It accepts connections
+    from listening socket of master (or from own socket bound with
+    SO_REUSEPORT) by one or more threads and stops after
+    max_requests requests.
+    """
+
+    def __init__(self, host, port, app, listener=None, reuse_port=False,
+                 threads=SERVER_THREADS, max_requests=SERVER_MAX_REQUESTS):
+        """
+        @param listener: Listening socket inherited from master,
+            if None new socket is bound
+        @param reuse_port: If True set SO_REUSEPORT on new socket
+        @param max_requests: Number of requests after which worker exits,
+            0 to disable
+        """
+        self.listener = listener
+        self.reuse_port = reuse_port
+        self.threads = threads
+        self.max_requests = max_requests
+        self.requests = 0
+        self.running = True
+        self._lock = threading.Lock()
+        BaseWSGIServer.__init__(self, host, port, app,
+                                handler=WorkerRequestHandler)
+        self.socket.setblocking(0)
+
+    def server_bind(self):
+        if self.listener is None:
+            if self.reuse_port:
+                self.socket.setsockopt(socket.SOL_SOCKET,
+                                       socket.SO_REUSEPORT, 1)
+            return BaseWSGIServer.server_bind(self)
+        self.socket.close()
+        self.socket = self.listener
+        self.server_address = self.socket.getsockname()
+        host, port = self.server_address[:2]
+        self.server_name = socket.getfqdn(host)
+        self.server_port = port
+
+    def server_activate(self):
+        if self.listener is None:
+            BaseWSGIServer.server_activate(self)
+
+    def stop(self, *args):
+        self.running = False
+
+    def process_request(self, request, client_address):
+        self._lock.acquire()
+        try:
+            self.requests += 1
+            if self.max_requests and self.requests >= self.max_requests:
+                self.running = False
+        finally:
+            self._lock.release()
+        BaseWSGIServer.process_request(self, request, client_address)
+
+    def _accept_loop(self):
+        while self.running:
+            try:
+                readable = select.select([self.socket], [], [],
+                                         POLL_INTERVAL)[0]
+            except (select.error, socket.error), e:
+                if e.args[0] == errno.EINTR:
+                    continue
+                raise
+            if readable and self.running:
+                #connection can be accepted by other thread or worker,
+                #error of non-blocking accept is ignored
+                self._handle_request_noblock()
+
+    def serve_forever(self):
+        """
+        Serve requests until L{stop} is called or max_requests requests
+        are handled, then wait for requests in progress.
+        """
+        threads = []
+        for _ in xrange(self.threads - 1):
+            thread = threading.Thread(target=self._accept_loop)
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+        self._accept_loop()
+        for thread in threads:
+            thread.join()
+
+
+class PreforkServer(object):
+    """
+    Master process which keeps workers running.
+    """
+
+    def __init__(self, app_factory, host, port, workers=None,
+                 threads=SERVER_THREADS, max_requests=SERVER_MAX_REQUESTS,
+                 reuse_port=False, graceful_timeout=SERVER_GRACEFUL_TIMEOUT):
+        """
+        @param app_factory: Function which returns WSGI application,
+            it is called on start and on reload
+        @param workers: Number of worker processes,
+            by default number of CPU cores
+        @param threads: Number of threads in worker process
+        @param max_requests: Number of requests after which worker is
+            replaced, 0 to disable
+        @param reuse_port: If True every worker binds own socket with
+            SO_REUSEPORT, so kernel balances connections between workers
+        @param graceful_timeout: Seconds to wait for workers which
+            finish requests in progress before they are killed
+        """
+        if reuse_port and not hasattr(socket, 'SO_REUSEPORT'):
+            raise ValueError('SO_REUSEPORT is not supported')
+        self.app_factory = app_factory
+        self.host = host
+        self.port = port
+        self.workers = workers or get_default_workers()
+        self.threads = max(threads, 1)
+        self.max_requests = max_requests
+        self.reuse_port = reuse_port
+        self.graceful_timeout = graceful_timeout
+        self.app = None
+        self.listener = None
+        self._workers = set()
+        #pid: time when worker was asked to stop
+        self._retiring = {}
+        self._reload = False
+        self._stopping = False
+
+    def bind(self):
+        """
+        Create listening socket shared by workers.
+        If port is 0 random free port is used and stored in self.port.
+        """
+        if self.reuse_port:
+            return
+        server = BaseWSGIServer(self.host, self.port, None)
+        self.listener = server.socket
+        self.port = self.listener.getsockname()[1]
+
+    def _handle_reload(self, *args):
+        self._reload = True
+
+    def _handle_stop(self, *args):
+        self._stopping = True
+
+    def _spawn_worker(self):
+        pid = os.fork()
+        if pid:
+            self._workers.add(pid)
+            return pid
+        #worker process
+        status = 0
+        try:
+            signal.signal(signal.SIGHUP, signal.SIG_IGN)
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            server = WorkerWSGIServer(self.host, self.port, self.app,
+                                      listener=self.listener,
+                                      reuse_port=self.reuse_port,
+                                      threads=self.threads,
+                                      max_requests=self.max_requests)
+            signal.signal(signal.SIGTERM, server.stop)
+            #system calls of requests in progress are restarted after
+            #signal, Python 2 does not retry calls interrupted by EINTR
+            signal.siginterrupt(signal.SIGTERM, False)
+            server.serve_forever()
+        except Exception:
+            logger.exception('Worker %d failed' % (os.getpid()))
+            status = 1
+        os._exit(status)
+
+    def _stop_workers(self, workers):
+        for pid in workers:
+            self._retiring[pid] = time.time()
+            self._kill(pid, signal.SIGTERM)
+
+    def _kill(self, pid, sig):
+        try:
+            os.kill(pid, sig)
+        except OSError, e:
+            if e.errno != errno.ESRCH:
+                raise
+
+    def _reap_workers(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except OSError, e:
+                if e.errno == errno.EINTR:
+                    continue
+                if e.errno == errno.ECHILD:
+                    self._workers.clear()
+                    self._retiring.clear()
+                    break
+                raise
+            if not pid:
+                break
+            self._workers.discard(pid)
+            self._retiring.pop(pid, None)
+        now = time.time()
+        for pid, stop_time in self._retiring.items():
+            if now - stop_time > self.graceful_timeout:
+                self._kill(pid, signal.SIGKILL)
+
+    def reload(self):
+        """
+        Create new application and replace all workers, old workers
+        finish requests in progress.
+        """
+        logger.info('Reloading workers')
+        self.app = self.app_factory()
+        old_workers = self._workers
+        self._workers = set()
+        for _ in xrange(self.workers):
+            self._spawn_worker()
+        self._stop_workers(old_workers)
+
+    def run(self):
+        """
+        Start workers and keep them running until SIGTERM or SIGINT.
+        """
+        if self.listener is None:
+            self.bind()
+        self.app = self.app_factory()
+        signal.signal(signal.SIGHUP, self._handle_reload)
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        #interrupt sleep when worker exits
+        signal.signal(signal.SIGCHLD, lambda *args: None)
+        logger.info('Prefork server listening on %s:%s, %d workers' %
+                    (self.host, self.port, self.workers))
+        try:
+            while not self._stopping:
+                if self._reload:
+                    self._reload = False
+                    self.reload()
+                self._reap_workers()
+                while len(self._workers) < self.workers and \
+                        not self._stopping:
+                    self._spawn_worker()
+                time.sleep(POLL_INTERVAL)
+        finally:
+            self.stop()
+
+    def stop(self):
+        """
+        Stop workers gracefully, kill workers which do not exit
+        in graceful_timeout seconds.
+        """
+        self._stop_workers(self._workers)
+        self._workers = set()
+        while self._retiring:
+            self._reap_workers()
+            if self._retiring:
+                time.sleep(0.05)
+        if self.listener is not None:
+            self.listener.close()
@@ -1,7 +1,20 @@
 # -*- coding:utf-8 -*-
-import os
 import sys
+
+#gevent server needs standard library patched before any other module is
+#imported, so locks of logging and threading are created by patched modules
+if '--async' in sys.argv[1:] and \
+        (__name__ == '__main__' or sys.argv[0].endswith('libcloud_rest')):
+    try:
+        from gevent import monkey
+        monkey.patch_all()
+    except ImportError:
+        #start_server reports that gevent is required
+        pass
+
+import os
 import logging
+from functools import partial
 from optparse import OptionParser
 
 sys.path.append(os.sep.join(
@@ -9,17 +22,87 @@ sys.path.append(os.sep.join(
 
 import libcloud_rest.log
 from libcloud_rest.log import get_logger
-from libcloud_rest.constants import VALID_LOG_LEVELS
+from libcloud_rest.constants import VALID_LOG_LEVELS,\
+    EAGER_METHODS_CATALOGUE, METHODS_CATALOGUE_FILE, AUTH_TOKENS_DIR,\
+    JSON_BACKEND, LAZY_DRIVERS_IMPORT, SERVER_WORKERS, SERVER_THREADS,\
+    SERVER_MAX_REQUESTS, SERVER_GRACEFUL_TIMEOUT, ASYNC_MAX_CONNECTIONS,\
+    PROVIDER_CONCURRENCY_LIMIT, PROVIDER_QUEUE_TIMEOUT, RESPONSE_CACHE_TTLS,\
+    RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_STALE_TTLS, REQUEST_COALESCING,\
+    DOWNLOAD_CHUNK_SIZE, UPLOAD_CHUNK_SIZE, UPLOAD_SPOOL_DIR,\
+    MULTIPART_MAX_PARALLEL, MULTIPART_EXPIRES, OBJECT_CACHE_DIR,\
+    OBJECT_CACHE_MAX_BYTES, DRIVERS_POOL_SIZE
 
 DEBUG = False
 
 
-def start_server(host, port, logger, debug):
+def start_server(host, port, logger, debug, eager_catalogue=False,
+                 catalogue_file=None, tokens_dir=None, json_backend=None,
+                 lazy_drivers_import=True, workers=None,
+                 threads=SERVER_THREADS, max_requests=SERVER_MAX_REQUESTS,
+                 reuse_port=False, graceful_timeout=SERVER_GRACEFUL_TIMEOUT,
+                 async_mode=False, max_connections=ASYNC_MAX_CONNECTIONS,
+                 provider_concurrency_limit=PROVIDER_CONCURRENCY_LIMIT,
+                 provider_queue_timeout=PROVIDER_QUEUE_TIMEOUT,
+                 response_cache_ttls=RESPONSE_CACHE_TTLS,
+                 response_cache_stale_ttls=RESPONSE_CACHE_STALE_TTLS,
+                 response_cache_max_bytes=RESPONSE_CACHE_MAX_BYTES,
+                 request_coalescing=REQUEST_COALESCING,
+                 download_chunk_size=DOWNLOAD_CHUNK_SIZE,
+                 upload_chunk_size=UPLOAD_CHUNK_SIZE,
+                 upload_spool_dir=UPLOAD_SPOOL_DIR,
+                 multipart_max_parallel=MULTIPART_MAX_PARALLEL,
+                 multipart_expires=MULTIPART_EXPIRES,
+                 object_cache_dir=OBJECT_CACHE_DIR,
+                 object_cache_max_bytes=OBJECT_CACHE_MAX_BYTES,
+                 drivers_pool_size=DRIVERS_POOL_SIZE):
+    """
+    @param workers: Number of worker processes of production server,
+        0 for number of CPU cores, if None debug server is started
+    @param async_mode: If True start gevent server in one process
+    """
+    if async_mode:
+        #patch before application modules are imported
+        from libcloud_rest import async_server
+        async_server.patch()
     from werkzeug.serving import run_simple
     from libcloud_rest.application import LibcloudRestApp
 
-    app = LibcloudRestApp()
+    app_factory = partial(
+        LibcloudRestApp, eager_catalogue=eager_catalogue,
+        catalogue_file=catalogue_file, tokens_dir=tokens_dir,
+        json_backend=json_backend, lazy_drivers_import=lazy_drivers_import,
+        provider_concurrency_limit=provider_concurrency_limit,
+        provider_queue_timeout=provider_queue_timeout,
+        response_cache_ttls=response_cache_ttls,
+        response_cache_stale_ttls=response_cache_stale_ttls,
+        response_cache_max_bytes=response_cache_max_bytes,
+        request_coalescing=request_coalescing,
+        download_chunk_size=download_chunk_size,
+        upload_chunk_size=upload_chunk_size,
+        upload_spool_dir=upload_spool_dir,
+        multipart_max_parallel=multipart_max_parallel,
+        multipart_expires=multipart_expires,
+        object_cache_dir=object_cache_dir,
+        object_cache_max_bytes=object_cache_max_bytes,
+        drivers_pool_size=drivers_pool_size)
 
+    if async_mode:
+        server = async_server.AsyncServer(app_factory(), host, port,
+                                          max_connections=max_connections,
+                                          graceful_timeout=graceful_timeout)
+        server.run()
+        return
+
+    if workers is not None and not debug:
+        from libcloud_rest.prefork import PreforkServer
+        server = PreforkServer(app_factory, host, port, workers=workers,
+                               threads=threads, max_requests=max_requests,
+                               reuse_port=reuse_port,
+                               graceful_timeout=graceful_timeout)
+        server.run()
+        return
+
+    app = app_factory()
     logger.info('Debug HTTP server listening on %s:%s' % (host, port))
     run_simple(host, port, app,
                use_debugger=True, use_reloader=True)
@@ -41,6 +124,20 @@ def setup_logger(log_level, log_file):
     return new_logger
 
 
+def parse_methods_seconds(values, defaults):
+    """
+    Return copy of defaults updated by list of METHOD=SECONDS strings.
+    """
+    result = dict(defaults)
+    for value in values:
+        method_name, _, seconds = value.partition('=')
+        if not method_name or not seconds.isdigit():
+            raise ValueError('Invalid value: %s, should be METHOD=SECONDS' %
+                             (value))
+        result[method_name] = int(seconds)
+    return result
+
+
 def main():
     usage = 'usage: %prog'
     parser = OptionParser(usage=usage)
@@ -56,6 +153,127 @@ def main():
                       metavar='PATH')
     parser.add_option('--debug', dest='debug', default=False,
                       action='store_true', help='Enable debug mode')
+    parser.add_option('--eager-catalogue', dest='eager_catalogue',
+                      default=EAGER_METHODS_CATALOGUE, action='store_true',
+                      help='Parse all drivers methods on start')
+    parser.add_option('--no-eager-catalogue', dest='eager_catalogue',
+                      action='store_false',
+                      help='Parse drivers methods on first use')
+    parser.add_option('--catalogue-file', dest='catalogue_file',
+                      default=METHODS_CATALOGUE_FILE,
+                      help='Load parsed drivers methods from file, file '
+                           'is created if it does not exist, its '
+                           'directory should be private directory of '
+                           'server user (mode 0700)',
+                      metavar='PATH')
+    parser.add_option('--tokens-dir', dest='tokens_dir',
+                      default=AUTH_TOKENS_DIR,
+                      help='Directory where auth tokens are shared by '
+                           'worker processes, it should be private '
+                           'directory of server user (mode 0700)',
+                      metavar='PATH')
+    parser.add_option('--json-backend', dest='json_backend',
+                      default=JSON_BACKEND,
+                      help='JSON library: ujson, simplejson, json or '
+                           'DECODER/ENCODER, by default the fastest '
+                           'installed decoder with json encoder',
+                      metavar='NAME')
+    parser.add_option('--eager-drivers-import', dest='lazy_drivers_import',
+                      default=LAZY_DRIVERS_IMPORT, action='store_false',
+                      help='Import all drivers on start')
+    parser.add_option('--workers', dest='workers', default=SERVER_WORKERS,
+                      type='int',
+                      help='Run production server with NUM worker '
+                           'processes, 0 for number of CPU cores. If not '
+                           'provided debug server is used', metavar='NUM')
+    parser.add_option('--threads', dest='threads', default=SERVER_THREADS,
+                      type='int', help='Number of threads in worker process',
+                      metavar='NUM')
+    parser.add_option('--max-requests', dest='max_requests',
+                      default=SERVER_MAX_REQUESTS, type='int',
+                      help='Replace worker process after NUM requests, '
+                           '0 to disable', metavar='NUM')
+    parser.add_option('--reuse-port', dest='reuse_port', default=False,
+                      action='store_true',
+                      help='Bind socket of every worker with SO_REUSEPORT')
+    parser.add_option('--async', dest='async_mode', default=False,
+                      action='store_true',
+                      help='Run gevent server which handles requests '
+                           'by greenlets in one process')
+    parser.add_option('--max-connections', dest='max_connections',
+                      default=ASYNC_MAX_CONNECTIONS, type='int',
+                      help='Max number of connections served concurrently '
+                           'by async server', metavar='NUM')
+    parser.add_option('--provider-concurrency', dest='provider_concurrency',
+                      default=PROVIDER_CONCURRENCY_LIMIT, type='int',
+                      help='Max number of concurrent calls to one '
+                           'provider, 0 to disable', metavar='NUM')
+    parser.add_option('--provider-queue-timeout',
+                      dest='provider_queue_timeout',
+                      default=PROVIDER_QUEUE_TIMEOUT, type='float',
+                      help='Seconds request waits for provider call slot',
+                      metavar='SECONDS')
+    parser.add_option('--response-cache-max-bytes',
+                      dest='response_cache_max_bytes',
+                      default=RESPONSE_CACHE_MAX_BYTES, type='int',
+                      help='Max total length of cached results of driver '
+                           'methods, 0 to disable cache', metavar='BYTES')
+    parser.add_option('--response-cache-ttl', dest='response_cache_ttls',
+                      action='append', default=[],
+                      help='Seconds for which method result is cached, '
+                           '0 to disable caching of method, can be given '
+                           'several times', metavar='METHOD=SECONDS')
+    parser.add_option('--response-cache-stale-ttl',
+                      dest='response_cache_stale_ttls',
+                      action='append', default=[],
+                      help='Seconds for which expired method result is '
+                           'served while it is refreshed, can be given '
+                           'several times', metavar='METHOD=SECONDS')
+    parser.add_option('--no-request-coalescing', dest='request_coalescing',
+                      default=REQUEST_COALESCING, action='store_false',
+                      help='Do not share provider call between identical '
+                           'concurrent GET requests')
+    parser.add_option('--download-chunk-size', dest='download_chunk_size',
+                      default=DOWNLOAD_CHUNK_SIZE, type='int',
+                      help='Number of bytes of storage object read from '
+                           'provider at once', metavar='BYTES')
+    parser.add_option('--upload-chunk-size', dest='upload_chunk_size',
+                      default=UPLOAD_CHUNK_SIZE, type='int',
+                      help='Number of bytes of uploaded object read from '
+                           'client at once', metavar='BYTES')
+    parser.add_option('--upload-spool-dir', dest='upload_spool_dir',
+                      default=UPLOAD_SPOOL_DIR,
+                      help='Directory of temporary files of uploads to '
+                           'providers without chunked transfer encoding',
+                      metavar='PATH')
+    parser.add_option('--multipart-max-parallel',
+                      dest='multipart_max_parallel',
+                      default=MULTIPART_MAX_PARALLEL, type='int',
+                      help='Max number of parts of one multipart upload '
+                           'sent to provider in parallel', metavar='NUMBER')
+    parser.add_option('--multipart-expires', dest='multipart_expires',
+                      default=MULTIPART_EXPIRES, type='int',
+                      help='Seconds after which not completed multipart '
+                           'upload is removed', metavar='SECONDS')
+    parser.add_option('--object-cache-dir', dest='object_cache_dir',
+                      default=OBJECT_CACHE_DIR,
+                      help='Private directory (mode 0700) of disk cache '
+                           'of downloaded storage objects, cache is '
+                           'disabled by default',
+                      metavar='PATH')
+    parser.add_option('--object-cache-max-bytes',
+                      dest='object_cache_max_bytes',
+                      default=OBJECT_CACHE_MAX_BYTES, type='int',
+                      help='Max total size of cached storage objects',
+                      metavar='BYTES')
+    parser.add_option('--drivers-pool-size', dest='drivers_pool_size',
+                      default=DRIVERS_POOL_SIZE, type='int',
+                      help='Max number of idle driver instances kept for '
+                           'reuse, 0 to disable pool', metavar='NUM')
+    parser.add_option('--graceful-timeout', dest='graceful_timeout',
+                      default=SERVER_GRACEFUL_TIMEOUT, type='int',
+                      help='Seconds to wait for requests in progress when '
+                           'worker is stopped', metavar='SECONDS')
 
     (options, args) = parser.parse_args()
 
@@ -72,11 +290,41 @@ def main():
         global DEBUG
         DEBUG = True
 
+    response_cache_ttls = parse_methods_seconds(
+        options.response_cache_ttls, RESPONSE_CACHE_TTLS)
+    response_cache_stale_ttls = parse_methods_seconds(
+        options.response_cache_stale_ttls, RESPONSE_CACHE_STALE_TTLS)
+
     level = getattr(logging, log_level, logging.INFO)
 
     logger = setup_logger(log_level=level, log_file=log_file)
     start_server(host=options.host, port=int(options.port),
-                 logger=logger, debug=options.debug)
+                 logger=logger, debug=options.debug,
+                 eager_catalogue=options.eager_catalogue,
+                 catalogue_file=options.catalogue_file,
+                 tokens_dir=options.tokens_dir,
+                 json_backend=options.json_backend,
+                 lazy_drivers_import=options.lazy_drivers_import,
+                 workers=options.workers, threads=options.threads,
+                 max_requests=options.max_requests,
+                 reuse_port=options.reuse_port,
+                 graceful_timeout=options.graceful_timeout,
+                 async_mode=options.async_mode,
+                 max_connections=options.max_connections,
+                 provider_concurrency_limit=options.provider_concurrency,
+                 provider_queue_timeout=options.provider_queue_timeout,
+                 response_cache_ttls=response_cache_ttls,
+                 response_cache_stale_ttls=response_cache_stale_ttls,
+                 response_cache_max_bytes=options.response_cache_max_bytes,
+                 request_coalescing=options.request_coalescing,
+                 download_chunk_size=options.download_chunk_size,
+                 upload_chunk_size=options.upload_chunk_size,
+                 upload_spool_dir=options.upload_spool_dir,
+                 multipart_max_parallel=options.multipart_max_parallel,
+                 multipart_expires=options.multipart_expires,
+                 object_cache_dir=options.object_cache_dir,
+                 object_cache_max_bytes=options.object_cache_max_bytes,
+                 drivers_pool_size=options.drivers_pool_size)
 
 
 if __name__ == '__main__':
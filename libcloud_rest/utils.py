@@ -1,41 +1,50 @@
 # -*- coding:utf-8 -*-
 import datetime
-
-try:
-    import simplejson as json
-except ImportError:
-    import json
+import errno
+import os
+import stat
 
 from werkzeug.wrappers import Response, Request
 
+from libcloud_rest.json_codec import json, datetime_to_json, date_to_json,\
+    time_to_json
+
 
 class JsonResponse(Response):
     default_mimetype = 'application/json'
 
 
+def check_private_directory(directory):
+    """
+    Create directory with mode 0700 if it does not exist and check that
+    it is owned by current user and is not accessible by other users,
+    so files in it can not be read or planted by them.
+
+    @raise: OSError
+    """
+    try:
+        os.makedirs(directory, 0700)
+    except OSError:
+        if not os.path.isdir(directory):
+            raise
+    info = os.lstat(directory)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or \
+            stat.S_IMODE(info.st_mode) & 0077:
+        raise OSError(errno.EPERM, 'Directory should be owned by current '
+                      'user and have mode 0700', directory)
+
+
 class DateTimeJsonEncoder(json.JSONEncoder):
     """
     JSONEncoder subclass that knows how to encode date/time.
     """
     def default(self, obj):
         if isinstance(obj, datetime.datetime):
-            r = obj.isoformat()
-            if obj.microsecond:
-                r = r[:23] + r[26:]
-            if r.endswith('+00:00'):
-                r = r[:-6] + 'Z'
-            return r
+            return datetime_to_json(obj)
         elif isinstance(obj, datetime.date):
-            return obj.isoformat()
+            return date_to_json(obj)
         elif isinstance(obj, datetime.time):
-            #determines if a given datetime.datetime is aware.
-            if obj.tzinfo is not None and\
-                    obj.tzinfo.utcoffset(obj) is not None:
-                raise ValueError("JSON can't represent timezone-aware times.")
-            r = obj.isoformat()
-            if obj.microsecond:
-                r = r[:12]
-            return r
+            return time_to_json(obj)
         return super(DateTimeJsonEncoder, self).default(obj)
 
 
@@ -1,5 +1,7 @@
 # -*- coding:utf-8 -*-
 import sys
+import threading
+import time
 import unittest2
 import httplib
 
@@ -8,10 +10,13 @@ try:
 except ImportError:
     import json
 
+import mock
+from libcloud.compute.drivers.dummy import DummyNodeDriver
 from werkzeug.test import Client
 from werkzeug.wrappers import BaseResponse
 import libcloud
 
+from libcloud_rest.api import handlers
 from libcloud_rest.api.versions import versions as rest_versions
 from libcloud_rest.application import LibcloudRestApp
 from tests.file_fixtures import ComputeFixtures
@@ -32,6 +37,236 @@ class ComputeTest(unittest2.TestCase):
         self.assertEqual(resp.status_code, httplib.OK)
         self.assertIn(provider, resp_data)
 
+    def test_provider_info_skips_unknown_types(self):
+        url = rest_versions[libcloud.__version__] + \
+            '/compute/providers/rackspace'
+        resp = self.client.get(url)
+        resp_data = json.loads(resp.data)
+        self.assertEqual(resp.status_code, httplib.OK)
+        self.assertIn('list_nodes', resp_data['supported_methods'])
+
+    def test_provider_info_not_modified(self):
+        url = rest_versions[libcloud.__version__] + \
+            '/compute/providers/rackspace'
+        resp = self.client.get(url)
+        etag = resp.headers.get('ETag')
+        self.assertEqual(resp.status_code, httplib.OK)
+        self.assertTrue(etag.startswith('"'))
+        self.assertIn('max-age=', resp.headers.get('Cache-Control'))
+        self.assertIn('public', resp.headers.get('Cache-Control'))
+        resp = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(resp.status_code, httplib.NOT_MODIFIED)
+        self.assertEqual(resp.data, '')
+        self.assertEqual(resp.headers.get('ETag'), etag)
+        resp = self.client.get(url, headers={'If-None-Match': '"other"'})
+        self.assertEqual(resp.status_code, httplib.OK)
+        self.assertIn('list_nodes', json.loads(resp.data)['supported_methods'])
+
+    def test_list_providers_not_modified(self):
+        url = rest_versions[libcloud.__version__] + '/compute/providers'
+        etag = self.client.get(url).headers.get('ETag')
+        resp = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(resp.status_code, httplib.NOT_MODIFIED)
+        url = rest_versions[libcloud.__version__] + '/dns/providers'
+        resp = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(resp.status_code, httplib.OK)
+
+    def test_provider_info_unknown_provider(self):
+        url = rest_versions[libcloud.__version__] + \
+            '/compute/providers/unknown'
+        for _ in xrange(2):
+            resp = self.client.get(url)
+            self.assertEqual(resp.status_code, httplib.BAD_REQUEST)
+
+    def test_batch(self):
+        url = rest_versions[libcloud.__version__] + '/compute/DUMMY/_batch'
+        operations = [{'method': 'list_nodes'},
+                      {'method': 'reboot_node', 'args': {'node_id': '1'}},
+                      {'method': 'ex_unknown'},
+                      {'method': '__init__'},
+                      {'method': 'create_node', 'args': {'name': 'test'}}]
+        for max_parallel in (1, 3):
+            resp = self.client.post(
+                url, headers={'x-dummy-creds': '2'},
+                data=json.dumps({'operations': operations * 2,
+                                 'max_parallel': max_parallel}),
+                content_type='application/json')
+            self.assertEqual(resp.status_code, httplib.OK)
+            results = json.loads(resp.data)
+            self.assertEqual(len(results), 10)
+            self.assertEqual(results[:5], results[5:])
+            self.assertEqual(results[0]['status'], httplib.OK)
+            self.assertEqual(len(results[0]['result']), 2)
+            self.assertEqual(results[1], {'status': httplib.OK,
+                                          'result': True})
+            self.assertEqual(results[2]['status'], httplib.BAD_REQUEST)
+            self.assertEqual(results[2]['error']['name'], 'NoSuchOperation')
+            self.assertEqual(results[3]['error']['name'], 'NoSuchOperation')
+            self.assertEqual(results[4]['status'],
+                             httplib.INTERNAL_SERVER_ERROR)
+            self.assertIn('image_id', results[4]['error']['detail'])
+
+    def test_batch_invalid_request(self):
+        url = rest_versions[libcloud.__version__] + '/compute/DUMMY/_batch'
+        for data in ({'operations': []}, {'operations': [{'args': {}}]},
+                     {'operations': [{'method': 'list_nodes'}],
+                      'max_parallel': 0}, [1]):
+            resp = self.client.post(url, headers={'x-dummy-creds': '2'},
+                                    data=json.dumps(data),
+                                    content_type='application/json')
+            self.assertEqual(resp.status_code, httplib.BAD_REQUEST)
+        resp = self.client.post(
+            url, data=json.dumps({'operations': [{'method': 'list_nodes'}]}),
+            content_type='application/json')
+        self.assertEqual(resp.status_code, httplib.BAD_REQUEST)
+        self.assertEqual(json.loads(resp.data)['error']['name'],
+                         'MissingHeaders')
+
+    def test_all_nodes(self):
+        url = rest_versions[libcloud.__version__] + '/compute/_all/nodes'
+        accounts = [
+            {'provider': 'dummy', 'account': 'first',
+             'headers': {'x-dummy-creds': '2'}},
+            {'provider': 'DUMMY', 'headers': {'x-dummy-creds': '3'}},
+            {'provider': 'unknown', 'account': 'unknown', 'headers': {}},
+            {'provider': 'DUMMY', 'account': 'no_creds'},
+        ]
+        resp = self.client.post(url, data=json.dumps({'accounts': accounts}),
+                                content_type='application/json')
+        self.assertEqual(resp.status_code, httplib.OK)
+        resp_data = json.loads(resp.data)
+        self.assertEqual(
+            [(n['account'], n['provider'], n['name'])
+             for n in resp_data['nodes']],
+            [('first', 'dummy', 'dummy-0'), ('first', 'dummy', 'dummy-1'),
+             (1, 'DUMMY', 'dummy-0'), (1, 'DUMMY', 'dummy-1'),
+             (1, 'DUMMY', 'dummy-2')])
+        self.assertEqual(
+            [(e['account'], e['status'], e['error']['name'])
+             for e in resp_data['errors']],
+            [('unknown', httplib.BAD_REQUEST, 'ProviderNotSupported'),
+             ('no_creds', httplib.BAD_REQUEST, 'MissingHeaders')])
+
+    def test_all_nodes_timeout(self):
+        url = rest_versions[libcloud.__version__] + '/compute/_all/nodes'
+        list_nodes = DummyNodeDriver.list_nodes.im_func
+
+        def slow_list_nodes(self):
+            if self.creds == '3':
+                time.sleep(0.5)
+            return list_nodes(self)
+
+        slow_list_nodes.__doc__ = list_nodes.__doc__
+        accounts = [{'provider': 'DUMMY', 'headers': {'x-dummy-creds': '3'}},
+                    {'provider': 'DUMMY', 'headers': {'x-dummy-creds': '2'}}]
+        with mock.patch.object(DummyNodeDriver, 'list_nodes',
+                               slow_list_nodes):
+            resp = self.client.post(
+                url, data=json.dumps({'accounts': accounts, 'timeout': 0.1}),
+                content_type='application/json')
+        self.assertEqual(resp.status_code, httplib.OK)
+        resp_data = json.loads(resp.data)
+        self.assertEqual(len(resp_data['nodes']), 2)
+        self.assertEqual(resp_data['errors'][0]['account'], 0)
+        self.assertEqual(resp_data['errors'][0]['status'],
+                         httplib.GATEWAY_TIMEOUT)
+        self.assertEqual(resp_data['errors'][0]['error']['name'],
+                         'ProviderTimeout')
+
+    def test_all_nodes_timeout_limit(self):
+        url = rest_versions[libcloud.__version__] + '/compute/_all/nodes'
+        list_nodes = DummyNodeDriver.list_nodes.im_func
+
+        def slow_list_nodes(self):
+            time.sleep(0.5)
+            return list_nodes(self)
+
+        slow_list_nodes.__doc__ = list_nodes.__doc__
+        accounts = [{'provider': 'DUMMY', 'headers': {'x-dummy-creds': '3'}}]
+        with mock.patch.object(DummyNodeDriver, 'list_nodes',
+                               slow_list_nodes):
+            with mock.patch.object(handlers, 'FANOUT_TIMEOUT', 0.1):
+                resp = self.client.post(
+                    url, data=json.dumps({'accounts': accounts,
+                                          'timeout': 1000}),
+                    content_type='application/json')
+        self.assertEqual(resp.status_code, httplib.OK)
+        error = json.loads(resp.data)['errors'][0]
+        self.assertEqual(error['error']['name'], 'ProviderTimeout')
+        self.assertIn('0.1 seconds', error['error']['message'])
+
+    def test_all_nodes_threads_limit(self):
+        url = rest_versions[libcloud.__version__] + '/compute/_all/nodes'
+        accounts = [{'provider': 'DUMMY', 'headers': {'x-dummy-creds': '3'}},
+                    {'provider': 'DUMMY', 'headers': {'x-dummy-creds': '2'}}]
+        fanout_threads = threading.BoundedSemaphore(1)
+        busy = threading.Event()
+        acquire = fanout_threads.acquire
+        list_nodes = DummyNodeDriver.list_nodes.im_func
+
+        def acquire_slot(blocking=True):
+            acquired = acquire(blocking)
+            if not acquired:
+                busy.set()
+            return acquired
+
+        def busy_list_nodes(self):
+            #slot is held until the second account is rejected
+            busy.wait(5)
+            return list_nodes(self)
+
+        busy_list_nodes.__doc__ = list_nodes.__doc__
+        with mock.patch.object(DummyNodeDriver, 'list_nodes',
+                               busy_list_nodes):
+            with mock.patch.object(fanout_threads, 'acquire', acquire_slot):
+                with mock.patch.object(handlers, 'fanout_threads',
+                                       fanout_threads):
+                    resp = self.client.post(
+                        url, data=json.dumps({'accounts': accounts}),
+                        content_type='application/json')
+        self.assertEqual(resp.status_code, httplib.OK)
+        resp_data = json.loads(resp.data)
+        self.assertEqual(len(resp_data['nodes']), 3)
+        self.assertEqual(
+            [(e['account'], e['status'], e['error']['name'])
+             for e in resp_data['errors']],
+            [(1, httplib.SERVICE_UNAVAILABLE, 'ProviderBusy')])
+        #slot is returned by finished thread
+        self.assertTrue(fanout_threads.acquire(False))
+
+    def test_set_connection_timeout(self):
+        connection = mock.Mock(timeout=None)
+        self.assertEqual(None, handlers.set_connection_timeout(connection, 5))
+        self.assertEqual(5, connection.timeout)
+        self.assertEqual(5, connection.connection.timeout)
+        connection.connection.sock.settimeout.assert_called_once_with(5)
+
+    def test_all_nodes_invalid_request(self):
+        url = rest_versions[libcloud.__version__] + '/compute/_all/nodes'
+        for data in ({'accounts': []}, {'accounts': [{}]},
+                     {'accounts': [{'provider': 'DUMMY'}], 'timeout': 0}):
+            resp = self.client.post(url, data=json.dumps(data),
+                                    content_type='application/json')
+            self.assertEqual(resp.status_code, httplib.BAD_REQUEST)
+
+    def test_list_nodes_streamed(self):
+        url = rest_versions[libcloud.__version__] + '/compute/DUMMY/nodes'
+        resp = self.client.get(url, headers={'x-dummy-creds': '250'})
+        resp_data = json.loads(resp.data)
+        self.assertEqual(resp.status_code, httplib.OK)
+        self.assertEqual(resp.headers.get('Content-Type'), 'application/json')
+        self.assertEqual(resp.headers.get('Content-Length'), None)
+        self.assertEqual(len(resp_data), 250)
+        self.assertEqual(resp_data[249]['name'], 'dummy-249')
+
+    def test_list_nodes_not_streamed(self):
+        url = rest_versions[libcloud.__version__] + '/compute/DUMMY/nodes'
+        resp = self.client.get(url, headers={'x-dummy-creds': '2'})
+        self.assertEqual(resp.status_code, httplib.OK)
+        self.assertEqual(int(resp.headers.get('Content-Length')),
+                         len(resp.data))
+        self.assertEqual(len(json.loads(resp.data)), 2)
+
     # def test_provider_info(self):
     #     url = rest_versions[libcloud.__version__] + \
     #           '/compute/providers/digital_ocean'
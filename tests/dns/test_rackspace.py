@@ -21,7 +21,8 @@ from mock import patch
 from libcloud_rest.api.versions import versions as rest_versions
 from libcloud_rest.application import LibcloudRestApp
 from libcloud_rest.errors import NoSuchZoneError, LibcloudError, \
-    NoSuchRecordError, ValidationError, NoSuchRecordError
+    NoSuchRecordError, ValidationError, NoSuchRecordError, \
+    MalformedJSONError
 from tests.file_fixtures import DNSFixtures
 
 
@@ -93,6 +94,15 @@ class RackspaceUSTests(unittest2.TestCase):
         self.assertEqual(resp.status_code, httplib.INTERNAL_SERVER_ERROR)
         self.assertEqual(resp_data['error']['code'], LibcloudError.code)
 
+    def test_update_zone_malformed_json(self):
+        url = self.url_tmpl % ('/'.join(['zones', '12345678']))
+        resp = self.client.put(url, headers=self.headers,
+                               data='{"domain": ',
+                               content_type='application/json')
+        resp_data = json.loads(resp.data)
+        self.assertEqual(resp.status_code, httplib.BAD_REQUEST)
+        self.assertEqual(resp_data['error']['code'], MalformedJSONError.code)
+
     def test_delete_zone_success(self):
         url = self.url_tmpl % ('zones')
         zones_resp = self.client.get(url, headers=self.headers)
@@ -1,5 +1,11 @@
 # -*- coding:utf-8 -*-
 from __future__ import with_statement
+import base64
+import hashlib
+import os
+import shutil
+import tempfile
+from StringIO import StringIO
 import unittest2
 import httplib
 
@@ -11,17 +17,24 @@ except ImportError:
 from werkzeug.test import Client
 from werkzeug.wrappers import BaseResponse
 import libcloud
+import libcloud.common.types
 from libcloud.test.storage.test_cloudfiles import CloudFilesMockHttp,\
     CloudFilesMockRawResponse
 from libcloud.storage.drivers.cloudfiles import CloudFilesUSStorageDriver
 from libcloud.storage.base import Container, Object
-from mock import patch
+from mock import patch, DEFAULT
 
+from libcloud_rest.api.cache import response_cache
+from libcloud_rest.api.handlers import storage as storage_handlers
+from libcloud_rest.api.listing import object_listings
+from libcloud_rest.api.object_cache import object_cache
+from libcloud_rest.api.uploads import object_uploads
 from libcloud_rest.api.versions import versions as rest_versions
 from libcloud_rest.application import LibcloudRestApp
 from libcloud_rest.errors import NoSuchContainerError, \
     ContainerAlreadyExistsError, InvalidContainerNameError,\
-    ContainerIsNotEmptyError, NoSuchObjectError
+    ContainerIsNotEmptyError, NoSuchObjectError, NoSuchUploadError,\
+    LibcloudError
 
 
 class RackspaceUSTests(unittest2.TestCase):
@@ -157,6 +170,59 @@ class RackspaceUSTests(unittest2.TestCase):
         self.assertEqual(obj['size'], 1160520)
         self.assertEqual(obj['container']['name'], 'test_container')
 
+    def test_list_container_objects_pages(self):
+        CloudFilesMockHttp.type = 'ITERATOR'
+        url = self.url_tmpl % (
+            '/'.join(['containers', 'test_container', 'objects']))
+        with patch.object(CloudFilesUSStorageDriver, 'get_container') as get:
+            get.return_value = Container(name='test_container', extra={},
+                                         driver=None)
+            resp = self.client.get(url + '&limit=2', headers=self.headers)
+            self.assertEqual(resp.status_code, httplib.OK)
+            result = json.loads(resp.data)
+            self.assertEqual(['foo-test-1', 'foo-test-2'],
+                             [obj['name'] for obj in result['objects']])
+            self.assertEqual('foo-test-2', result['next_marker'])
+            resp = self.client.get(url + '&marker=foo-test-3&prefix=foo',
+                                   headers=self.headers)
+            result = json.loads(resp.data)
+            self.assertEqual(['foo-test-4', 'foo-test-5'],
+                             [obj['name'] for obj in result['objects']])
+            self.assertEqual(None, result['next_marker'])
+            resp = self.client.get(url + '&limit=0', headers=self.headers)
+            self.assertEqual(resp.status_code, httplib.BAD_REQUEST)
+
+    def test_list_container_objects_stream(self):
+        CloudFilesMockHttp.type = 'ITERATOR'
+        url = self.url_tmpl % (
+            '/'.join(['containers', 'test_container', 'objects']))
+        headers = dict(self.headers, Accept='application/x-ndjson')
+        #pages of mock provider have 3 objects
+        self.addCleanup(setattr, object_listings, 'page_size',
+                        object_listings.page_size)
+        object_listings.page_size = 3
+        with patch.object(CloudFilesUSStorageDriver, 'get_container') as get:
+            get.return_value = Container(name='test_container', extra={},
+                                         driver=None)
+            resp = self.client.get(url, headers=headers)
+            self.assertEqual(resp.status_code, httplib.OK)
+            self.assertEqual('application/x-ndjson',
+                             resp.headers['Content-Type'])
+            lines = resp.data.splitlines()
+            self.assertEqual(['foo-test-%d' % (number)
+                              for number in xrange(1, 6)],
+                             [json.loads(line)['name'] for line in lines])
+            with patch('libcloud_rest.api.listing.get_cloudfiles_page') as \
+                    get_page:
+                get_page.side_effect = [
+                    ([Object('a', 1, None, {}, None, None, None)], True),
+                    libcloud.common.types.LibcloudError('error')]
+                resp = self.client.get(url, headers=headers)
+            lines = [json.loads(line) for line in resp.data.splitlines()]
+            self.assertEqual('a', lines[0]['name'])
+            #error after the first page is the last line
+            self.assertEqual(LibcloudError.code, lines[1]['error']['code'])
+
     def test_get_object_success(self):
         url = self.url_tmpl % (
             '/'.join(['containers', 'test_container',
@@ -198,6 +264,331 @@ class RackspaceUSTests(unittest2.TestCase):
             resp = self.client.get(url, headers=self.headers)
         self.assertEqual(resp.status_code, httplib.OK)
 
+    def get_object_response(self, headers=None, size=26, object_hash='h1',
+                            extra=None):
+        url = self.url_tmpl % (
+            '/'.join(['containers', 'foo_bar_container',
+                      'objects', 'foo_bar_object']))
+        container = Container(name='foo_bar_container', extra={}, driver=None)
+        obj = Object(name='foo_bar_object', size=size, hash=object_hash,
+                     extra=extra or {}, container=container, meta_data=None,
+                     driver=None)
+        data = 'abcdefghijklmnopqrstuvwxyz'
+        chunks = [data[i:i + 4] for i in xrange(0, len(data), 4)]
+        self.read_chunks = []
+
+        def download_object_as_stream(obj, chunk_size=None):
+            for chunk in chunks:
+                self.read_chunks.append(chunk)
+                yield chunk
+
+        all_headers = dict(self.headers)
+        all_headers.update(headers or {})
+        with patch.object(CloudFilesUSStorageDriver, 'get_object',
+                          mocksignature=True) as get_object_mock:
+            get_object_mock.return_value = obj
+            with patch.object(CloudFilesUSStorageDriver,
+                              'download_object_as_stream',
+                              side_effect=download_object_as_stream):
+                resp = self.client.get(url, headers=all_headers)
+                #read response while driver is patched
+                resp.data
+        return resp
+
+    def test_download_object_headers(self):
+        resp = self.get_object_response(
+            extra={'content_type': 'text/csv',
+                   'last_modified': 'Tue, 25 Jan 2011 22:01:49 GMT'})
+        self.assertEqual(resp.status_code, httplib.OK)
+        self.assertEqual(resp.data, 'abcdefghijklmnopqrstuvwxyz')
+        self.assertEqual(resp.headers['Content-Length'], '26')
+        self.assertEqual(resp.headers['ETag'], '"h1"')
+        self.assertEqual(resp.headers['Accept-Ranges'], 'bytes')
+        self.assertEqual(resp.headers['Last-Modified'],
+                         'Tue, 25 Jan 2011 22:01:49 GMT')
+        self.assertTrue(resp.headers['Content-Type'].startswith('text/csv'))
+
+    def test_download_object_range(self):
+        resp = self.get_object_response({'Range': 'bytes=5-9'})
+        self.assertEqual(resp.status_code, httplib.PARTIAL_CONTENT)
+        self.assertEqual(resp.data, 'fghij')
+        self.assertEqual(resp.headers['Content-Range'], 'bytes 5-9/26')
+        self.assertEqual(resp.headers['Content-Length'], '5')
+        #rest of object is not read
+        self.assertEqual(self.read_chunks, ['abcd', 'efgh', 'ijkl'])
+        resp = self.get_object_response({'Range': 'bytes=-3'})
+        self.assertEqual(resp.data, 'xyz')
+        self.assertEqual(resp.headers['Content-Range'], 'bytes 23-25/26')
+        #suffix longer than object is the whole object
+        resp = self.get_object_response({'Range': 'bytes=-30'})
+        self.assertEqual(resp.status_code, httplib.PARTIAL_CONTENT)
+        self.assertEqual(resp.data, 'abcdefghijklmnopqrstuvwxyz')
+        self.assertEqual(resp.headers['Content-Range'], 'bytes 0-25/26')
+        self.assertEqual(resp.headers['Content-Length'], '26')
+
+    def test_download_object_driver_range(self):
+        with patch.object(CloudFilesUSStorageDriver,
+                          'download_object_range_as_stream', create=True,
+                          return_value=iter(['fghij'])) as download_range:
+            resp = self.get_object_response({'Range': 'bytes=5-9'})
+        self.assertEqual(resp.status_code, httplib.PARTIAL_CONTENT)
+        self.assertEqual(resp.data, 'fghij')
+        self.assertEqual(download_range.call_args[0][1:], (5, 10))
+        self.assertEqual(self.read_chunks, [])
+
+    def test_download_object_if_range(self):
+        resp = self.get_object_response({'Range': 'bytes=5-9',
+                                         'If-Range': '"h1"'})
+        self.assertEqual(resp.status_code, httplib.PARTIAL_CONTENT)
+        resp = self.get_object_response({'Range': 'bytes=5-9',
+                                         'If-Range': '"h0"'})
+        self.assertEqual(resp.status_code, httplib.OK)
+        self.assertEqual(resp.data, 'abcdefghijklmnopqrstuvwxyz')
+
+    def test_download_object_range_not_satisfiable(self):
+        resp = self.get_object_response({'Range': 'bytes=30-40'})
+        self.assertEqual(resp.status_code,
+                         httplib.REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(resp.headers['Content-Range'], 'bytes */26')
+        self.assertEqual(self.read_chunks, [])
+        #suffix of zero bytes is not the whole object
+        resp = self.get_object_response({'Range': 'bytes=-0'})
+        self.assertEqual(resp.status_code,
+                         httplib.REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(resp.headers['Content-Range'], 'bytes */26')
+        resp = self.get_object_response({'Range': 'bytes=0-'})
+        self.assertEqual(resp.status_code, httplib.PARTIAL_CONTENT)
+
+    def test_download_object_not_modified(self):
+        resp = self.get_object_response({'If-None-Match': '"h1"'})
+        self.assertEqual(resp.status_code, httplib.NOT_MODIFIED)
+        self.assertEqual(resp.data, '')
+        self.assertEqual(self.read_chunks, [])
+
+    def test_download_object_cache(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        self.client = Client(LibcloudRestApp(object_cache_dir=cache_dir),
+                             BaseResponse)
+        self.addCleanup(setattr, object_cache, 'directory', None)
+        resp = self.get_object_response()
+        self.assertEqual(resp.data, 'abcdefghijklmnopqrstuvwxyz')
+        self.assertEqual(len(self.read_chunks), 7)
+        #the same ETag is served from cache
+        resp = self.get_object_response({'Range': 'bytes=-3'})
+        self.assertEqual(resp.status_code, httplib.PARTIAL_CONTENT)
+        self.assertEqual(resp.data, 'xyz')
+        self.assertEqual(self.read_chunks, [])
+        resp = self.get_object_response()
+        self.assertEqual(resp.data, 'abcdefghijklmnopqrstuvwxyz')
+        self.assertEqual(self.read_chunks, [])
+        #changed object is downloaded
+        resp = self.get_object_response(object_hash='h2')
+        self.assertEqual(resp.data, 'abcdefghijklmnopqrstuvwxyz')
+        self.assertEqual(len(self.read_chunks), 7)
+        stats = object_cache.get_stats()
+        self.assertEqual((2, 2, 2), (stats['hits'], stats['misses'],
+                                     stats['stores']))
+
+    def upload_object(self, data, headers=None, input_stream=None,
+                      chunked_encoding=True, content_type='text/plain'):
+        url = self.url_tmpl % (
+            '/'.join(['containers', 'foo_bar_container',
+                      'objects', 'foo_bar_object']))
+        container = Container(name='foo_bar_container', extra={}, driver=None)
+        self.uploaded = []
+
+        def get_object(data, object_hash='h1'):
+            return Object(name='foo_bar_object', size=len(data),
+                          hash=object_hash, extra={}, container=container,
+                          meta_data=None, driver=None)
+
+        def upload_object_via_stream(iterator, container, object_name,
+                                     extra=None):
+            chunks = list(iterator)
+            self.uploaded.append((chunks, extra))
+            return get_object(''.join(chunks))
+
+        def upload_object(file_path, container, object_name, extra=None,
+                          verify_hash=True):
+            self.uploaded_path = file_path
+            uploaded = open(file_path, 'rb').read()
+            self.uploaded.append(([uploaded], extra))
+            return get_object(uploaded, None)
+
+        all_headers = dict(self.headers)
+        all_headers.update(headers or {})
+        with patch.object(CloudFilesUSStorageDriver, 'get_container',
+                          mocksignature=True) as get_container_mock:
+            get_container_mock.return_value = container
+            with patch.multiple(
+                    CloudFilesUSStorageDriver,
+                    upload_object_via_stream=DEFAULT, upload_object=DEFAULT,
+                    delete_object=DEFAULT,
+                    supports_chunked_encoding=chunked_encoding) as mocks:
+                mocks['upload_object_via_stream'].side_effect = \
+                    upload_object_via_stream
+                mocks['upload_object'].side_effect = upload_object
+                self.delete_object_mock = mocks['delete_object']
+                return self.client.post(url, headers=all_headers, data=data,
+                                        input_stream=input_stream,
+                                        content_type=content_type)
+
+    def test_upload_object(self):
+        object_uploads.chunk_size = 4
+        with patch.object(response_cache, 'invalidate') as invalidate_mock:
+            resp = self.upload_object('abcdefghij')
+        self.assertEqual(resp.status_code, httplib.OK)
+        #cached listings of account are invalidated
+        self.assertEqual(invalidate_mock.call_args[0][0],
+                         CloudFilesUSStorageDriver)
+        self.assertEqual(json.loads(resp.data)['size'], 10)
+        self.assertEqual(resp.headers['ETag'], '"h1"')
+        chunks, extra = self.uploaded[0]
+        self.assertEqual(chunks, ['abcd', 'efgh', 'ij'])
+        self.assertEqual(extra, {'content_type': 'text/plain'})
+
+    def test_upload_object_form_content_type(self):
+        resp = self.upload_object(
+            'a=1&b=2', content_type='application/x-www-form-urlencoded')
+        self.assertEqual(resp.status_code, httplib.OK)
+        self.assertEqual(self.uploaded[0][0], ['a=1&b=2'])
+
+    def test_upload_object_chunked_encoding(self):
+        body = '4\r\nabcd\r\n6;ext=1\r\nefghij\r\n0\r\nX-Trailer: 1\r\n\r\n'
+        resp = self.upload_object(None, {'Transfer-Encoding': 'chunked'},
+                                  input_stream=StringIO(body))
+        self.assertEqual(resp.status_code, httplib.OK)
+        self.assertEqual(''.join(self.uploaded[0][0]), 'abcdefghij')
+        resp = self.upload_object(None, {'Transfer-Encoding': 'chunked'},
+                                  input_stream=StringIO('x\r\nabcd\r\n'))
+        self.assertEqual(resp.status_code, httplib.BAD_REQUEST)
+
+    def test_upload_object_spooled(self):
+        resp = self.upload_object('abcdefghij', chunked_encoding=False)
+        self.assertEqual(resp.status_code, httplib.OK)
+        self.assertEqual(self.uploaded[0][0], ['abcdefghij'])
+        self.assertFalse(os.path.exists(self.uploaded_path))
+        #ETag is MD5 of data if driver does not return hash
+        self.assertEqual(resp.headers['ETag'],
+                         '"%s"' % (hashlib.md5('abcdefghij').hexdigest()))
+
+    def test_upload_object_content_md5(self):
+        content_md5 = base64.b64encode(hashlib.md5('abcdefghij').digest())
+        resp = self.upload_object('abcdefghij', {'Content-MD5': content_md5})
+        self.assertEqual(resp.status_code, httplib.OK)
+        self.assertEqual(self.uploaded[0][0], ['abcdefghij'])
+        self.assertFalse(os.path.exists(self.uploaded_path))
+        #data is verified before upload, existing object is not changed
+        resp = self.upload_object('abcdefghi', {'Content-MD5': content_md5})
+        self.assertEqual(resp.status_code, httplib.BAD_REQUEST)
+        self.assertEqual([], self.uploaded)
+        self.assertFalse(self.delete_object_mock.called)
+
+    def multipart_request(self, method, path='', data=None, headers=None,
+                          content_type=None, **kwargs):
+        url = self.url_tmpl % (
+            '/'.join(['containers', 'foo_bar_container', 'objects',
+                      'foo_bar_object', 'uploads']) + path)
+        all_headers = dict(self.headers)
+        all_headers.update(headers or {})
+        if object_uploads.spool_dir is None:
+            #uploads are kept in private directory of test
+            spool_dir = tempfile.mkdtemp()
+            self.addCleanup(shutil.rmtree, spool_dir)
+            self.addCleanup(setattr, object_uploads, 'spool_dir', None)
+            object_uploads.spool_dir = spool_dir
+        return self.client.open(url, method=method, headers=all_headers,
+                                data=data, content_type=content_type,
+                                **kwargs)
+
+    def test_multipart_upload(self):
+        resp = self.multipart_request('POST', content_type='text/plain')
+        self.assertEqual(resp.status_code, httplib.CREATED)
+        upload_id = json.loads(resp.data)['upload_id']
+        self.assertTrue(resp.headers['Location'].endswith(
+            'objects/foo_bar_object/uploads/' + upload_id))
+        for number, data in ((2, 'efghij'), (1, 'xxxx'), (1, 'abcd')):
+            resp = self.multipart_request(
+                'PUT', '/%s/parts/%d' % (upload_id, number), data)
+            self.assertEqual(resp.status_code, httplib.OK)
+            part = json.loads(resp.data)
+            self.assertEqual(part['size'], len(data))
+            self.assertEqual(part['etag'], hashlib.md5(data).hexdigest())
+            self.assertEqual(resp.headers['ETag'], '"%s"' % (part['etag']))
+        resp = self.multipart_request('GET', '/' + upload_id)
+        parts = json.loads(resp.data)
+        self.assertEqual([(p['part_number'], p['size']) for p in parts],
+                         [(1, 4), (2, 6)])
+        container = Container(name='foo_bar_container', extra={}, driver=None)
+        with patch.object(CloudFilesUSStorageDriver, 'get_container',
+                          mocksignature=True) as get_container_mock:
+            get_container_mock.return_value = container
+            with patch.object(CloudFilesUSStorageDriver,
+                              'upload_object_via_stream') as upload_mock:
+                upload_mock.side_effect = \
+                    lambda iterator, container, object_name, extra: Object(
+                        name=object_name, size=len(''.join(iterator)),
+                        hash='h1', extra=extra, container=container,
+                        meta_data=None, driver=None)
+                with patch.object(response_cache,
+                                  'invalidate') as invalidate_mock:
+                    resp = self.multipart_request('POST', '/' + upload_id)
+        self.assertEqual(resp.status_code, httplib.OK)
+        self.assertTrue(invalidate_mock.called)
+        self.assertEqual(json.loads(resp.data)['size'], 10)
+        self.assertEqual(resp.headers['ETag'], '"h1"')
+        self.assertEqual(upload_mock.call_args[1]['extra'],
+                         {'content_type': 'text/plain'})
+        #upload is removed after completion
+        resp = self.multipart_request('GET', '/' + upload_id)
+        self.assertEqual(resp.status_code, httplib.NOT_FOUND)
+        self.assertEqual(json.loads(resp.data)['error']['code'],
+                         NoSuchUploadError.code)
+
+    def test_multipart_upload_errors(self):
+        resp = self.multipart_request('POST')
+        upload_id = json.loads(resp.data)['upload_id']
+        content_md5 = base64.b64encode(hashlib.md5('abcd').digest())
+        resp = self.multipart_request('PUT', '/%s/parts/1' % (upload_id),
+                                      'abc', {'Content-MD5': content_md5})
+        self.assertEqual(resp.status_code, httplib.BAD_REQUEST)
+        resp = self.multipart_request('PUT', '/%s/parts/0' % (upload_id),
+                                      'abc')
+        self.assertEqual(resp.status_code, httplib.BAD_REQUEST)
+        resp = self.multipart_request('POST', '/' + upload_id)
+        self.assertEqual(resp.status_code, httplib.BAD_REQUEST)
+        self.multipart_request('PUT', '/%s/parts/1' % (upload_id), 'abcd')
+        resp = self.multipart_request(
+            'POST', '/' + upload_id,
+            json.dumps({'parts': [{'part_number': 1, 'etag': 'x'}]}))
+        self.assertEqual(resp.status_code, httplib.BAD_REQUEST)
+        #long list of parts is not read
+        with patch.object(storage_handlers,
+                          'MULTIPART_COMPLETE_MAX_BODY_LENGTH', 10):
+            resp = self.multipart_request('POST', '/' + upload_id,
+                                          json.dumps({'parts': []}))
+            self.assertEqual(resp.status_code,
+                             httplib.REQUEST_ENTITY_TOO_LARGE)
+            self.assertEqual(json.loads(resp.data)['error']['name'],
+                             'RequestTooLarge')
+            body = '5\r\n{"par\r\n8\r\nts": []}\r\n0\r\n\r\n'
+            resp = self.multipart_request(
+                'POST', '/' + upload_id,
+                headers={'Transfer-Encoding': 'chunked'},
+                input_stream=StringIO(body))
+            self.assertEqual(resp.status_code,
+                             httplib.REQUEST_ENTITY_TOO_LARGE)
+        #upload is available with credentials of initiator only
+        resp = self.multipart_request('GET', '/' + upload_id,
+                                      headers={'x-api-key': 'other'})
+        self.assertEqual(resp.status_code, httplib.NOT_FOUND)
+        resp = self.multipart_request('DELETE', '/' + upload_id)
+        self.assertEqual(resp.status_code, httplib.NO_CONTENT)
+        resp = self.multipart_request('PUT', '/%s/parts/1' % (upload_id),
+                                      'abcd')
+        self.assertEqual(resp.status_code, httplib.NOT_FOUND)
+
     def test_delete_object_success(self):
         url = self.url_tmpl % (
             '/'.join(['containers', 'foo_bar_container',
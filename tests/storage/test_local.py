@@ -0,0 +1,155 @@
+# -*- coding:utf-8 -*-
+import httplib
+import json
+import os
+import shutil
+import tempfile
+import unittest2
+
+from werkzeug.datastructures import Headers
+from werkzeug.test import EnvironBuilder, run_wsgi_app
+from werkzeug.wsgi import FileWrapper
+import libcloud
+
+from libcloud_rest.api.downloads import object_downloads
+from libcloud_rest.api.pool import drivers_pool
+from libcloud_rest.api.versions import versions as rest_versions
+from libcloud_rest.application import LibcloudRestApp
+
+
+class LocalStorageTests(unittest2.TestCase):
+    def setUp(self):
+        self.base_path = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.base_path, 'container'))
+        fh = open(os.path.join(self.base_path, 'container', 'object'), 'wb')
+        try:
+            fh.write('abcdefghij')
+        finally:
+            fh.close()
+        self.url = rest_versions[libcloud.__version__] +\
+            '/storage/LOCAL/containers/container/objects/object'
+        self.app = LibcloudRestApp()
+        self.headers = {'x-provider-key': self.base_path,
+                        'x-api-key': 'secret'}
+
+    def tearDown(self):
+        shutil.rmtree(self.base_path)
+
+    def get(self, headers=None, url=None, **kwargs):
+        all_headers = dict(self.headers)
+        all_headers.update(headers or {})
+        environ = EnvironBuilder(url or self.url, headers=all_headers,
+                                 **kwargs).get_environ()
+        app_iter, status, response_headers = run_wsgi_app(self.app, environ)
+        return app_iter, int(status.split()[0]), Headers(response_headers)
+
+    def test_download_file(self):
+        files = object_downloads.get_stats()['files']
+        app_iter, status, headers = self.get()
+        self.assertEqual(httplib.OK, status)
+        #file is returned by wsgi.file_wrapper
+        self.assertTrue(isinstance(app_iter, FileWrapper))
+        self.assertEqual('abcdefghij', ''.join(app_iter))
+        app_iter.close()
+        self.assertEqual('10', headers['Content-Length'])
+        self.assertTrue(headers['ETag'])
+        self.assertEqual(files + 1, object_downloads.get_stats()['files'])
+
+    def test_download_file_range(self):
+        app_iter, status, headers = self.get({'Range': 'bytes=6-'})
+        self.assertEqual(httplib.PARTIAL_CONTENT, status)
+        self.assertTrue(isinstance(app_iter, FileWrapper))
+        self.assertEqual('ghij', ''.join(app_iter))
+        app_iter.close()
+        app_iter, status, headers = self.get({'Range': 'bytes=2-4'})
+        self.assertEqual(httplib.PARTIAL_CONTENT, status)
+        self.assertEqual('cde', ''.join(app_iter))
+        self.assertEqual('bytes 2-4/10', headers['Content-Range'])
+
+    def test_download_file_length(self):
+        path = os.path.join(self.base_path, 'container', 'object')
+        #bytes appended to file after object size was read are not sent
+        body = object_downloads.open_file({}, open(path, 'rb'), None, 6)
+        self.assertEqual('abcdef', ''.join(body))
+        calls = []
+
+        def file_wrapper(fh, block_size=8192, length=None):
+            calls.append((fh.tell(), length))
+            fh.close()
+            return []
+        file_wrapper.accepts_length = True
+        environ = {'wsgi.file_wrapper': file_wrapper}
+        object_downloads.open_file(environ, open(path, 'rb'), (2, 5), 10)
+        object_downloads.open_file(environ, open(path, 'rb'), None, 10)
+        self.assertEqual([(2, 3), (0, 10)], calls)
+
+    def test_driver_is_released(self):
+        app_iter, status, headers = self.get()
+        app_iter.close()
+        idle = drivers_pool.get_stats()['idle']
+        app_iter, status, headers = self.get(method='HEAD')
+        self.assertEqual(httplib.OK, status)
+        self.assertEqual('', ''.join(app_iter))
+        app_iter, status, headers = self.get(
+            {'If-None-Match': headers['ETag']})
+        self.assertEqual(httplib.NOT_MODIFIED, status)
+        self.assertEqual(idle, drivers_pool.get_stats()['idle'])
+
+    def test_list_objects(self):
+        for name in ('b1', 'a1', 'b0'):
+            open(os.path.join(self.base_path, 'container', name), 'wb').close()
+        self.url = self.url.rsplit('/', 1)[0]
+        app_iter, status, headers = self.get(
+            query_string={'prefix': 'b', 'limit': '1'})
+        result = json.loads(''.join(app_iter))
+        self.assertEqual(['b0'], [obj['name'] for obj in result['objects']])
+        self.assertEqual('b0', result['next_marker'])
+        app_iter, status, headers = self.get(
+            {'Accept': 'application/x-ndjson'},
+            query_string={'marker': 'a1'})
+        lines = ''.join(app_iter).splitlines()
+        app_iter.close()
+        names = [json.loads(line)['name'] for line in lines]
+        self.assertEqual(['b0', 'b1', 'object'], sorted(names))
+
+    def test_batch_local_files(self):
+        url = rest_versions[libcloud.__version__] + '/storage/LOCAL/_batch'
+        target = os.path.join(self.base_path, 'copy')
+        operations = [
+            {'method': 'upload_object',
+             'args': {'file_path': __file__, 'container_name': 'container',
+                      'object_name': 'copy'}},
+            {'method': 'download_object',
+             'args': {'container_name': 'container', 'object_name': 'object',
+                      'destination_path': target}},
+            {'method': 'upload_object_via_stream', 'args': {}},
+            {'method': 'download_object_as_stream', 'args': {}},
+            {'method': 'get_object',
+             'args': {'container_name': 'container',
+                      'object_name': 'object'}}]
+        app_iter, status, headers = self.get(
+            method='POST', data=json.dumps({'operations': operations}),
+            content_type='application/json', url=url)
+        results = json.loads(''.join(app_iter))
+        #methods which read or write server files are not allowed
+        self.assertEqual(['NoSuchOperation'] * 4,
+                         [result['error']['name'] for result in results[:4]])
+        self.assertEqual(httplib.OK, results[4]['status'])
+        self.assertFalse(os.path.exists(target))
+        self.assertEqual(['object'], os.listdir(
+            os.path.join(self.base_path, 'container')))
+
+    def test_batch_request_validation(self):
+        url = rest_versions[libcloud.__version__] + '/storage/LOCAL/_batch'
+        data = json.dumps({'operations': [{'method': 'list_containers'}]})
+        app_iter, status, headers = self.get(
+            method='POST', data=data + ' ' * 64 * 1024,
+            content_type='application/json', url=url)
+        self.assertEqual(httplib.BAD_REQUEST, status)
+        app_iter, status, headers = self.get(
+            method='POST', data=data, content_type='text/plain', url=url)
+        self.assertEqual(httplib.BAD_REQUEST, status)
+        app_iter, status, headers = self.get(
+            method='POST', data=data, content_type='application/json',
+            url=url)
+        self.assertEqual(httplib.OK, status)
@@ -0,0 +1,65 @@
+# -*- coding:utf-8 -*-
+import httplib
+import os
+import signal
+import socket
+import time
+import unittest2
+
+from libcloud_rest import async_server
+
+
+def hello_app(environ, start_response):
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return ['hello']
+
+
+def get_free_port():
+    sock = socket.socket()
+    try:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+    finally:
+        sock.close()
+
+
+@unittest2.skipUnless(async_server.gevent, 'gevent is not installed')
+class AsyncServerTests(unittest2.TestCase):
+    def setUp(self):
+        self.port = get_free_port()
+        pid = os.fork()
+        if not pid:
+            status = 0
+            try:
+                #standard library of test process is not patched
+                async_server.patch()
+                async_server.AsyncServer(hello_app, '127.0.0.1',
+                                         self.port).run()
+            except Exception:
+                status = 1
+            os._exit(status)
+        self.server_pid = pid
+
+    def tearDown(self):
+        os.kill(self.server_pid, signal.SIGTERM)
+        os.waitpid(self.server_pid, 0)
+
+    def test_request(self):
+        deadline = time.time() + 10
+        while True:
+            try:
+                connection = httplib.HTTPConnection('127.0.0.1', self.port,
+                                                    timeout=10)
+                connection.request('GET', '/')
+                response = connection.getresponse()
+                break
+            except socket.error:
+                if time.time() > deadline:
+                    raise
+                time.sleep(0.1)
+        self.assertEqual(httplib.OK, response.status)
+        self.assertEqual('hello', response.read())
+
+
+if __name__ == '__main__':
+    unittest2.main()
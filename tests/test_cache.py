@@ -0,0 +1,417 @@
+# -*- coding:utf-8 -*-
+import httplib
+import threading
+import time
+import unittest2
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+import mock
+from libcloud.compute.drivers.dummy import DummyNodeDriver
+from werkzeug.test import Client
+from werkzeug.wrappers import BaseResponse
+import libcloud
+
+from libcloud_rest.api.cache import ResponseCache, SingleFlight,\
+    MAX_INVALIDATED_ACCOUNTS, response_cache, request_flights,\
+    get_arguments_hash, is_read_only_method
+from libcloud_rest.api.versions import versions as rest_versions
+from libcloud_rest.application import LibcloudRestApp
+
+
+class ResponseCacheTests(unittest2.TestCase):
+    def setUp(self):
+        self.cache = ResponseCache(ttls={'list_sizes': 60,
+                                         'list_images': 60},
+                                   max_bytes=10)
+
+    def test_get_set(self):
+        key = ('Driver', 'creds', 'list_sizes', get_arguments_hash({}))
+        self.assertEqual(None, self.cache.get(key))
+        self.cache.set(key, '[1]')
+        self.assertEqual('[1]', self.cache.get(key))
+        stats = self.cache.get_stats()
+        self.assertEqual(1, stats['hits'])
+        self.assertEqual(1, stats['misses'])
+        self.assertEqual(0.5, stats['hit_rate'])
+        self.assertEqual(3, stats['bytes'])
+
+    def test_not_cached_method(self):
+        key = ('Driver', 'creds', 'list_nodes', '')
+        self.cache.set(key, '[]')
+        self.assertEqual(None, self.cache.get(key))
+        self.assertFalse(self.cache.is_cached_method('list_nodes'))
+        self.assertTrue(self.cache.is_cached_method('list_sizes'))
+        self.cache.max_bytes = 0
+        self.assertFalse(self.cache.is_cached_method('list_sizes'))
+
+    def test_expiration(self):
+        key = ('Driver', 'creds', 'list_sizes', '')
+        with mock.patch('time.time', return_value=1000):
+            self.cache.set(key, '[]')
+        with mock.patch('time.time', return_value=1059):
+            self.assertEqual('[]', self.cache.get(key))
+        with mock.patch('time.time', return_value=1060):
+            self.assertEqual(None, self.cache.get(key))
+        self.assertEqual(0, self.cache.get_stats()['size'])
+
+    def test_lru_eviction(self):
+        keys = [('Driver', 'creds', 'list_sizes', str(i)) for i in range(3)]
+        self.cache.set(keys[0], '1234')
+        self.cache.set(keys[1], '1234')
+        self.cache.get(keys[0])
+        self.cache.set(keys[2], '1234')
+        self.assertEqual(None, self.cache.get(keys[1]))
+        self.assertEqual('1234', self.cache.get(keys[0]))
+        self.assertEqual('1234', self.cache.get(keys[2]))
+        self.assertEqual(1, self.cache.get_stats()['evictions'])
+        #too long body is not cached
+        self.cache.set(keys[1], '12345678901')
+        self.assertEqual(None, self.cache.get(keys[1]))
+
+    def test_invalidate(self):
+        sizes_key = ('Driver', 'creds', 'list_sizes', '')
+        images_key = ('Driver', 'creds', 'list_images', '')
+        other_key = ('Driver', 'other', 'list_sizes', '')
+        for key in (sizes_key, images_key, other_key):
+            self.cache.set(key, '[]')
+        self.cache.invalidate('Driver', 'creds')
+        self.assertEqual(None, self.cache.get(sizes_key))
+        self.assertEqual(None, self.cache.get(images_key))
+        self.assertEqual('[]', self.cache.get(other_key))
+        self.assertEqual(2, self.cache.get_stats()['invalidations'])
+        self.assertEqual(2, self.cache.get_stats()['bytes'])
+
+    def test_arguments_hash(self):
+        self.assertEqual(get_arguments_hash({'a': 1, 'b': [1, 2]}),
+                         get_arguments_hash({'b': [1, 2], 'a': 1}))
+        self.assertNotEqual(get_arguments_hash({'a': 1}),
+                            get_arguments_hash({'a': 2}))
+
+    def test_read_only_methods(self):
+        self.assertTrue(is_read_only_method('list_sizes'))
+        self.assertTrue(is_read_only_method('ex_list_networks'))
+        self.assertFalse(is_read_only_method('create_node'))
+        self.assertFalse(is_read_only_method('ex_create_tags'))
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+
+class SingleFlightTests(unittest2.TestCase):
+    def call_concurrently(self, flight, function, count=5):
+        results = []
+
+        def call():
+            try:
+                results.append(flight.do('key', function))
+            except Exception, e:
+                results.append(e)
+
+        threads = [threading.Thread(target=call) for _ in xrange(count)]
+        for thread in threads:
+            thread.start()
+        return threads, results
+
+    def test_do(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def function():
+            calls.append(True)
+            release.wait(5)
+            return 'result'
+
+        threads, results = self.call_concurrently(flight, function)
+        self.assertTrue(wait_for(lambda: flight.coalesced == 4))
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(['result'] * 5, results)
+        self.assertEqual(1, len(calls))
+        #next call is not coalesced with finished one
+        self.assertEqual('result', flight.do('key', function))
+        self.assertEqual(2, len(calls))
+
+    def test_error(self):
+        flight = SingleFlight()
+        release = threading.Event()
+
+        def function():
+            release.wait(5)
+            raise ValueError('error')
+
+        threads, results = self.call_concurrently(flight, function, 3)
+        self.assertTrue(wait_for(lambda: flight.coalesced == 2))
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(3, len(results))
+        for result in results:
+            self.assertTrue(isinstance(result, ValueError))
+
+
+class StaleWhileRevalidateTests(unittest2.TestCase):
+    def setUp(self):
+        self.cache = ResponseCache(ttls={'list_nodes': 60},
+                                   stale_ttls={'list_nodes': 60},
+                                   max_bytes=100)
+        self.key = ('Driver', 'creds', 'list_nodes', '')
+
+    def test_stale_refresh(self):
+        with mock.patch('time.time', return_value=1000):
+            self.assertEqual('[1]', self.cache.get_or_load(self.key,
+                                                           lambda: '[1]'))
+            self.assertEqual('[1]', self.cache.get_or_load(self.key,
+                                                           lambda: '[2]'))
+        with mock.patch('time.time', return_value=1070):
+            self.assertEqual('[1]', self.cache.get_or_load(self.key,
+                                                           lambda: '[2]'))
+            self.assertTrue(wait_for(
+                lambda: self.cache.get_stats()['refreshes'] == 1))
+            self.assertEqual('[2]', self.cache.get(self.key))
+        stats = self.cache.get_stats()
+        self.assertEqual(2, stats['hits'])
+        self.assertEqual(1, stats['stale_hits'])
+        self.assertEqual(1, stats['misses'])
+
+    def test_expired_stale(self):
+        with mock.patch('time.time', return_value=1000):
+            self.cache.get_or_load(self.key, lambda: '[1]')
+        with mock.patch('time.time', return_value=1120):
+            self.assertEqual('[2]', self.cache.get_or_load(self.key,
+                                                           lambda: '[2]'))
+        self.assertEqual(0, self.cache.get_stats()['stale_hits'])
+        #stale entry is not returned without refresh function
+        with mock.patch('time.time', return_value=1190):
+            self.assertEqual(None, self.cache.get(self.key))
+
+    def test_refresh_error(self):
+        def load():
+            raise ValueError('error')
+
+        with mock.patch('time.time', return_value=1000):
+            self.cache.get_or_load(self.key, lambda: '[1]')
+        with mock.patch('time.time', return_value=1070):
+            self.assertEqual('[1]', self.cache.get_or_load(self.key, load))
+            self.assertTrue(wait_for(
+                lambda: self.cache.get_stats()['refresh_errors'] == 1))
+            self.assertEqual('[1]', self.cache.get_or_load(self.key, load))
+
+    def test_invalidation_during_load(self):
+        def load():
+            self.cache.invalidate('Driver', 'creds')
+            return '[1]'
+
+        self.assertEqual('[1]', self.cache.get_or_load(self.key, load))
+        self.assertEqual(None, self.cache.get(self.key))
+
+    def test_other_account_invalidation_during_load(self):
+        def load():
+            self.cache.invalidate('Driver', 'other')
+            return '[1]'
+
+        #result of account is stored after invalidation of other account
+        self.assertEqual('[1]', self.cache.get_or_load(self.key, load))
+        self.assertEqual('[1]', self.cache.get(self.key))
+
+    def test_forgotten_invalidations(self):
+        def load():
+            for index in xrange(MAX_INVALIDATED_ACCOUNTS + 1):
+                self.cache.invalidate('Driver', str(index))
+            return '[1]'
+
+        #invalidation of account may be forgotten, so result is not stored
+        self.assertEqual('[1]', self.cache.get_or_load(self.key, load))
+        self.assertEqual(None, self.cache.get(self.key))
+        self.cache.get_or_load(self.key, lambda: '[2]')
+        self.assertEqual('[2]', self.cache.get(self.key))
+
+    def test_concurrent_misses(self):
+        release = threading.Event()
+        calls = []
+        results = []
+
+        def load():
+            calls.append(True)
+            release.wait(5)
+            return '[1]'
+
+        def get():
+            results.append(self.cache.get_or_load(self.key, load))
+
+        threads = [threading.Thread(target=get) for _ in xrange(4)]
+        for thread in threads:
+            thread.start()
+        self.assertTrue(wait_for(
+            lambda: self.cache.get_stats()['coalesced'] == 3))
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(['[1]'] * 4, results)
+        self.assertEqual(1, len(calls))
+
+
+class ResponseCacheRequestTests(unittest2.TestCase):
+    def setUp(self):
+        self.client = Client(
+            LibcloudRestApp(response_cache_ttls={'list_nodes': 60}),
+            BaseResponse)
+        self.url = rest_versions[libcloud.__version__] + \
+            '/compute/DUMMY/nodes'
+
+    def tearDown(self):
+        LibcloudRestApp()
+
+    def get_stats(self):
+        resp = self.client.get('/stats')
+        self.assertEqual(resp.status_code, httplib.OK)
+        return json.loads(resp.data)['response_cache']
+
+    def test_cached_list(self):
+        headers = {'x-dummy-creds': '2'}
+        first = self.client.get(self.url, headers=headers)
+        self.assertEqual(first.status_code, httplib.OK)
+        with mock.patch('libcloud.compute.drivers.dummy.DummyNodeDriver.'
+                        'list_nodes') as list_nodes:
+            second = self.client.get(self.url, headers=headers)
+            self.assertFalse(list_nodes.called)
+        self.assertEqual(second.status_code, httplib.OK)
+        self.assertEqual(first.data, second.data)
+        #other credentials are cached separately
+        resp = self.client.get(self.url, headers={'x-dummy-creds': '3'})
+        self.assertEqual(len(json.loads(resp.data)), 3)
+        stats = self.get_stats()
+        self.assertEqual(1, stats['hits'])
+        self.assertEqual(2, stats['misses'])
+        self.assertEqual(2, stats['size'])
+
+    def test_invalidation(self):
+        headers = {'x-dummy-creds': '2'}
+        self.client.get(self.url, headers=headers)
+        resp = self.client.put(self.url + '/1/reboot', headers=headers,
+                               content_type='application/json')
+        self.assertEqual(resp.status_code, httplib.ACCEPTED)
+        stats = self.get_stats()
+        self.assertEqual(1, stats['invalidations'])
+        self.assertEqual(0, stats['size'])
+        self.client.get(self.url, headers=headers)
+        self.assertEqual(2, self.get_stats()['misses'])
+
+    def test_invalidation_without_pool(self):
+        LibcloudRestApp(response_cache_ttls={'list_nodes': 60},
+                        drivers_pool_size=0)
+        headers = {'x-dummy-creds': '2'}
+        list_nodes = DummyNodeDriver.list_nodes.im_func
+        calls = []
+
+        def counted_list_nodes(self):
+            calls.append(True)
+            return list_nodes(self)
+
+        counted_list_nodes.__doc__ = list_nodes.__doc__
+        with mock.patch.object(DummyNodeDriver, 'list_nodes',
+                               counted_list_nodes):
+            self.client.get(self.url, headers=headers)
+            self.client.get(self.url, headers=headers)
+            self.assertEqual(1, len(calls))
+            data = {'name': 'new', 'size_id': '1', 'image_id': '1'}
+            resp = self.client.post(self.url, headers=headers,
+                                    data=json.dumps(data),
+                                    content_type='application/json')
+            self.assertEqual(resp.status_code, httplib.CREATED)
+            #unpooled driver invalidates cached results of account
+            self.assertEqual(1, self.get_stats()['invalidations'])
+            self.client.get(self.url, headers=headers)
+            self.assertEqual(2, len(calls))
+
+    def test_stale_list(self):
+        LibcloudRestApp(response_cache_ttls={'list_nodes': 60},
+                        response_cache_stale_ttls={'list_nodes': 60})
+        headers = {'x-dummy-creds': '2'}
+        first = self.client.get(self.url, headers=headers)
+        with mock.patch('time.time', return_value=time.time() + 70):
+            second = self.client.get(self.url, headers=headers)
+            self.assertTrue(wait_for(
+                lambda: self.get_stats()['refreshes'] == 1))
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(1, self.get_stats()['stale_hits'])
+
+    def test_disabled(self):
+        LibcloudRestApp(response_cache_ttls={'list_nodes': 60},
+                        response_cache_max_bytes=0)
+        for _ in xrange(2):
+            self.client.get(self.url, headers={'x-dummy-creds': '2'})
+        self.assertEqual(0, response_cache.get_stats()['hits'])
+
+
+class RequestCoalescingTests(unittest2.TestCase):
+    def setUp(self):
+        self.app = LibcloudRestApp()
+        self.url = rest_versions[libcloud.__version__] + \
+            '/compute/DUMMY/nodes'
+        self.release = threading.Event()
+        self.calls = []
+
+    def tearDown(self):
+        LibcloudRestApp()
+
+    def get_list_nodes(self):
+        def list_nodes(driver):
+            self.calls.append(True)
+            self.release.wait(5)
+            return []
+
+        list_nodes.__doc__ = DummyNodeDriver.list_nodes.__doc__
+        return list_nodes
+
+    def get_concurrently(self, count):
+        responses = []
+
+        def get():
+            client = Client(self.app, BaseResponse)
+            responses.append(client.get(self.url,
+                                        headers={'x-dummy-creds': '2'}))
+
+        threads = [threading.Thread(target=get) for _ in xrange(count)]
+        with mock.patch.object(DummyNodeDriver, 'list_nodes',
+                               self.get_list_nodes()):
+            for thread in threads:
+                thread.start()
+            wait_for(lambda: len(self.calls) == count or
+                     request_flights.get_stats()['coalesced'] == count - 1)
+            self.release.set()
+            for thread in threads:
+                thread.join(5)
+        return responses
+
+    def test_coalesced(self):
+        coalesced = request_flights.get_stats()['coalesced']
+        responses = self.get_concurrently(4)
+        self.assertEqual(1, len(self.calls))
+        self.assertEqual(4, len(responses))
+        for response in responses:
+            self.assertEqual(response.status_code, httplib.OK)
+            self.assertEqual('[]', response.data)
+        self.assertEqual(coalesced + 3,
+                         request_flights.get_stats()['coalesced'])
+        client = Client(self.app, BaseResponse)
+        stats = json.loads(client.get('/stats').data)
+        self.assertIn('coalesced', stats['request_coalescing'])
+
+    def test_disabled(self):
+        self.app = LibcloudRestApp(request_coalescing=False)
+        self.get_concurrently(3)
+        self.assertEqual(3, len(self.calls))
+
+
+if __name__ == '__main__':
+    unittest2.main()
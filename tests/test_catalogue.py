@@ -0,0 +1,125 @@
+# -*- coding:utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest2
+
+import mock
+from libcloud.compute import providers as compute_providers
+from libcloud.compute.drivers.dummy import DummyNodeDriver
+
+from libcloud_rest.api.catalogue import MethodsCatalogue,\
+    load_methods_catalogue
+from libcloud_rest.api.providers import DriverMethodsCache
+from libcloud_rest.application import LibcloudRestApp
+
+
+class MethodsCatalogueTests(unittest2.TestCase):
+    def setUp(self):
+        self.cache = DriverMethodsCache()
+        self.catalogue = MethodsCatalogue(self.cache)
+        self.catalogue.build({'compute': compute_providers})
+
+    def test_build(self):
+        drivers = self.catalogue.drivers['compute']
+        self.assertEqual(drivers['DUMMY'], (DummyNodeDriver.__module__,
+                                            DummyNodeDriver.__name__))
+        self.assertTrue(self.cache.get_stats()['size'] > 0)
+        misses = self.cache.misses
+        self.cache.get(DummyNodeDriver, 'list_nodes')
+        self.assertEqual(self.cache.misses, misses)
+
+    def test_failures(self):
+        stats = self.catalogue.get_stats()
+        self.assertEqual(stats['drivers'],
+                         len(self.catalogue.drivers['compute']))
+        for provider_name, failures in \
+                self.catalogue.failures['compute'].items():
+            self.assertEqual(
+                failures,
+                self.catalogue.get_failures('compute', provider_name))
+            self.assertTrue(all(isinstance(error, str)
+                                for error in failures.values()))
+        self.assertEqual(self.catalogue.get_failures('dns', 'DUMMY'), {})
+
+
+class CatalogueFileTests(unittest2.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'catalogue.marshal')
+        self.catalogue = MethodsCatalogue(DriverMethodsCache())
+        self.catalogue.build({'compute': compute_providers})
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_save_and_load(self):
+        self.catalogue.save(self.path, 'key')
+        cache = DriverMethodsCache()
+        catalogue = MethodsCatalogue(cache)
+        self.assertTrue(catalogue.load(self.path, 'key'))
+        self.assertEqual(catalogue.drivers, self.catalogue.drivers)
+        self.assertEqual(catalogue.failures, self.catalogue.failures)
+        method_info = cache.get(DummyNodeDriver, 'list_nodes')
+        parsed_info = self.catalogue.cache.get(DummyNodeDriver, 'list_nodes')
+        self.assertEqual(method_info.spec, parsed_info.spec)
+        self.assertEqual(method_info.result_entry.type_name,
+                         parsed_info.result_entry.type_name)
+        for provider_name, failures in \
+                catalogue.failures['compute'].items():
+            method_name, error = failures.items()[0]
+            if method_name == '__import__':
+                continue
+            Driver = compute_providers.get_driver(
+                getattr(compute_providers.Provider, provider_name))
+            self.assertRaises(Exception, cache.get, Driver,
+                              method_name)
+
+    def test_outdated_key(self):
+        self.catalogue.save(self.path, 'old_key')
+        catalogue = MethodsCatalogue(DriverMethodsCache())
+        self.assertFalse(catalogue.load(self.path, 'new_key'))
+        self.assertFalse(catalogue.load(self.path + '.missing', 'old_key'))
+
+    def test_load_methods_catalogue_writes_file(self):
+        self.assertFalse(os.path.exists(self.path))
+        load_methods_catalogue(self.path)
+        self.assertTrue(os.path.exists(self.path))
+        self.assertEqual(os.listdir(self.tmp_dir), ['catalogue.marshal'])
+
+    def test_untrusted_file(self):
+        self.catalogue.save(self.path, 'key')
+        catalogue = MethodsCatalogue(DriverMethodsCache())
+        with mock.patch('os.getuid', return_value=os.getuid() + 1):
+            self.assertFalse(catalogue.load(self.path, 'key'))
+        os.chmod(self.path, 0666)
+        self.assertFalse(catalogue.load(self.path, 'key'))
+        os.chmod(self.path, 0600)
+        self.assertTrue(catalogue.load(self.path, 'key'))
+
+    def test_load_methods_catalogue_private_directory(self):
+        os.chmod(self.tmp_dir, 0777)
+        catalogue = load_methods_catalogue(self.path)
+        #catalogue is built, file in shared directory is not written
+        self.assertIn('compute', catalogue.drivers)
+        self.assertFalse(os.path.exists(self.path))
+        os.chmod(self.tmp_dir, 0700)
+        self.catalogue.save(self.path)
+        os.chmod(self.tmp_dir, 0777)
+        with mock.patch.object(MethodsCatalogue, 'load') as load:
+            load_methods_catalogue(self.path)
+        self.assertFalse(load.called)
+
+
+class ApplicationCatalogueTests(unittest2.TestCase):
+    def test_lazy_by_default(self):
+        self.assertTrue(LibcloudRestApp().catalogue is None)
+
+    def test_eager(self):
+        app = LibcloudRestApp(eager_catalogue=True)
+        self.assertEqual(set(app.catalogue.drivers),
+                         set(['compute', 'dns', 'loadbalancer', 'storage']))
+
+
+if __name__ == '__main__':
+    unittest2.main()
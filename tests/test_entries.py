@@ -9,10 +9,11 @@ except ImportError:
 from libcloud.compute.base import Node, NodeState, \
     NodeAuthPassword, NodeAuthSSHKey
 from libcloud.compute.drivers.cloudstack import CloudStackNodeDriver
+from libcloud.dns.base import Zone, Record
 from libcloud.dns.types import RecordType
 
-from libcloud_rest.api.entries import Entry, LibcloudObjectEntry, StringField, \
-    ListEntry
+from libcloud_rest.api.entries import Entry, LibcloudObjectEntry, \
+    StringField, ListEntry, get_json_data, get_render_function
 from libcloud_rest.errors import MalformedJSONError, ValidationError, \
     NoSuchObjectError, MissingArguments, TooManyArgumentsError
 from tests.utils import get_test_driver_instance
@@ -49,9 +50,9 @@ class StringEntryTests(unittest2.TestCase):
         self.assertRaises(ValueError, self.entry.to_json, invalid)
 
     def test_from_json(self):
-        valid = '{"zone_id": "123"}'
+        valid = {'zone_id': '123'}
         self.entry.from_json(valid)
-        invalid = '{"zone_id": 333}'
+        invalid = {'zone_id': 333}
         self.assertRaises(ValidationError, self.entry.from_json, invalid)
 
     def test_default(self):
@@ -59,10 +60,10 @@ class StringEntryTests(unittest2.TestCase):
                       'ID of the zone which is required',
                       default='12345')
         valid_json = '{"zone_id": "33333", "unknown_arg": 123}'
-        self.assertEqual('33333', entry.from_json(valid_json))
+        self.assertEqual('33333', entry.from_json(json.loads(valid_json)))
         self.assertTrue(entry._get_json_and_validate(valid_json))
         node_json = '{"node_id": "33333", "unknown_arg": 123}'
-        self.assertEqual('12345', entry.from_json(node_json))
+        self.assertEqual('12345', entry.from_json(json.loads(node_json)))
         self.assertRaises(MissingArguments,
                           entry._get_json_and_validate, node_json)
         valid = '123'
@@ -112,18 +113,18 @@ class FakeEntryTests(unittest2.TestCase):
                           malformed_json)
 
     def test_from_json(self):
-        valid_data = '{"fake_id": "a", "fake_name": "b", "extra": 5}'
+        valid_data = {'fake_id': 'a', 'fake_name': 'b', 'extra': 5}
         fake = self.entry.from_json(valid_data, None)
         self.assertEqual('a', fake.id)
         self.assertEqual('b', fake.name)
-        valid_data = '{"fake_id": "a", "extra": 5}'
+        valid_data = {'fake_id': 'a', 'extra': 5}
         fake = self.entry.from_json(valid_data, None)
         self.assertEqual('a', fake.id)
         self.assertEqual('', fake.name)
-        invalid_data = '{"fake_name": "b", "extra": 5}'
+        invalid_data = {'fake_name': 'b', 'extra': 5}
         self.assertRaises(MissingArguments, self.entry.from_json,
                           invalid_data, None)
-        empty_json = '{"extra": 1}'
+        empty_json = {'extra': 1}
         self.assertRaises(MissingArguments, self.entry.from_json,
                           empty_json, None)
 
@@ -168,18 +169,18 @@ class FakeDefaultEntryTests(unittest2.TestCase):
                           malformed_json)
 
     def test_from_json(self):
-        valid_data = '{"fake_id": "a", "fake_name": "b", "extra": 5}'
+        valid_data = {'fake_id': 'a', 'fake_name': 'b', 'extra': 5}
         fake = self.entry.from_json(valid_data, None)
         self.assertEqual('a', fake.id)
         self.assertEqual('b', fake.name)
-        valid_data = '{"fake_id": "a", "extra": 5}'
+        valid_data = {'fake_id': 'a', 'extra': 5}
         fake = self.entry.from_json(valid_data, None)
         self.assertEqual('a', fake.id)
         self.assertEqual('', fake.name)
-        invalid_data = '{"fake_name": "b", "extra": 5}'
+        invalid_data = {'fake_name': 'b', 'extra': 5}
         self.assertRaises(MissingArguments, self.entry.from_json,
                           invalid_data, None)
-        empty_json = '{"extra": 1}'
+        empty_json = {'extra': 1}
         fake = self.entry.from_json(empty_json, None)
         self.assertEqual('fid', fake.id)
         self.assertEqual('fname', fake.name)
@@ -235,7 +236,7 @@ class NodeEntryTests(unittest2.TestCase):
         self.assertRaises(ValueError, self.entry.to_json, ['pass'])
 
     def test_from_json(self):
-        json_data = '{"node_id": "2600"}'
+        json_data = {'node_id': '2600'}
         node = self.entry.from_json(json_data, None)
         self.assertEqual(node.id, '2600')
 
@@ -257,29 +258,30 @@ class OneOfEntryTests(unittest2.TestCase):
         self.assertEqual(node_password_arg['type'], 'str')
 
     def test_from_json(self):
-        key_json = '{"node_pubkey": "123", "unknown_arg": 123}'
+        key_json = {'node_pubkey': '123', 'unknown_arg': 123}
         node_auth_ssh_key = self.entry.from_json(key_json, None)
         self.assertEqual("123", node_auth_ssh_key.pubkey)
-        password_json = '{"node_password": "321", "unknown_arg": 123}'
+        password_json = {'node_password': '321', 'unknown_arg': 123}
         node_auth_password = self.entry.from_json(password_json, None)
         self.assertEqual("321", node_auth_password.password)
-        key_password_json = '{"node_pubkey": "123",' \
-                            ' "node_password": "321", "unknown_args": 123}'
+        key_password_json = {'node_pubkey': '123',
+                             'node_password': '321', 'unknown_args': 123}
         self.assertRaises(TooManyArgumentsError, self.entry.from_json,
                           key_password_json, None)
-        empty_json = "{}"
+        empty_json = {}
         self.assertRaises(MissingArguments, self.entry.from_json,
                           empty_json, None)
-        invalid_json = '{"node_pubkey": 123}'
+        invalid_json = {'node_pubkey': 123}
         self.assertRaises(ValidationError, self.entry.from_json,
                           invalid_json, None)
 
     def test_to_json(self):
         node_ssh_key = NodeAuthSSHKey('pk')
-        self.assertEqual('{"pubkey": "pk"}', self.entry.to_json(node_ssh_key))
+        self.assertEqual({'pubkey': 'pk'},
+                         json.loads(self.entry.to_json(node_ssh_key)))
         node_password = NodeAuthPassword('pwd')
-        self.assertEqual('{"password": "pwd"}',
-                         self.entry.to_json(node_password))
+        self.assertEqual({'password': 'pwd'},
+                         json.loads(self.entry.to_json(node_password)))
 
 
 class DefaultOneOfEntryTests(unittest2.TestCase):
@@ -300,29 +302,79 @@ class DefaultOneOfEntryTests(unittest2.TestCase):
         self.assertEqual(test_args, args)
 
     def test_from_json(self):
-        str_json = '{"attr": "123", "unknown_arg": 123}'
+        str_json = {'attr': '123', 'unknown_arg': 123}
         self.assertEqual("123", self.entry.from_json(str_json, None))
-        dict_json = '{"attr": "{}", "unknown_arg": 123}'
+        dict_json = {'attr': '{}', 'unknown_arg': 123}
         self.assertEqual("{}", self.entry.from_json(dict_json, None))
-        invalid_json = '{"attr": 555}'
+        invalid_json = {'attr': 555}
         self.assertRaises(ValidationError, self.entry.from_json,
                           invalid_json, None)
-        without_attr_json = '{"unknown_arg": 123}'
+        without_attr_json = {'unknown_arg': 123}
         self.assertEqual('default_value',
                          self.entry.from_json(without_attr_json, None))
         malformed_json = '{'
-        self.assertRaises(MalformedJSONError, self.entry.from_json,
-                          malformed_json, None)
+        self.assertRaises(MalformedJSONError, get_json_data, malformed_json)
 
     def test_to_json(self):
         str_data = 'abc'
-        self.assertEqual('{"attr": "abc"}', self.entry.to_json(str_data))
+        self.assertEqual({'attr': 'abc'},
+                         json.loads(self.entry.to_json(str_data)))
         dict_data = {'1': 2}
-        self.assertEqual('{"attr": {"1": 2}}', self.entry.to_json(dict_data))
+        self.assertEqual({'attr': {'1': 2}},
+                         json.loads(self.entry.to_json(dict_data)))
         int_data = 5
         self.assertRaises(ValueError, self.entry.to_json, int_data)
 
 
+class RenderFunctionTests(unittest2.TestCase):
+    def test_get_render_function(self):
+        fake = FakeObject('a', 'b')
+        self.assertEqual({'id': 'a', 'name': 'b'},
+                         get_render_function(['id', 'name'])(fake))
+        self.assertEqual({'id': 'a'}, get_render_function(('id',))(fake))
+        self.assertEqual(None, get_render_function(None))
+
+    def test_entry_render(self):
+        self.assertEqual({'id': 'a', 'name': 'b'},
+                         FakeEntry.render(FakeObject('a', 'b')))
+
+    def test_render_nested_object(self):
+        entry = Entry('record', 'L{Record}', 'pass')
+        zone = Zone('1', 'example.com', 'master', 3600, None)
+        record = Record('2', 'www', RecordType.A, '10.0.0.1', zone, None,
+                        {'ttl': 300})
+        json_data = json.loads(entry.to_json(record))
+        self.assertEqual('2', json_data['id'])
+        self.assertEqual({'ttl': 300}, json_data['extra'])
+        self.assertEqual({'id': '1', 'domain': 'example.com',
+                          'type': 'master', 'ttl': 3600, 'extra': {}},
+                         json_data['zone'])
+
+
+class ListEntryJsonTests(unittest2.TestCase):
+    def setUp(self):
+        self.entry = ListEntry('result', 'C{list} of L{Node}', 'pass', True)
+        self.nodes = [Node('id%d' % (i), 'test%d' % (i), NodeState.RUNNING,
+                           ['10.0.0.%d' % (i)], None, None)
+                      for i in range(5)]
+
+    def test_iter_json(self):
+        chunks = list(self.entry.iter_json(self.nodes, chunk_size=2))
+        self.assertEqual(3, len(chunks))
+        json_data = json.loads(''.join(chunks))
+        self.assertEqual(['id%d' % (i) for i in range(5)],
+                         [node['id'] for node in json_data])
+        self.assertEqual(['10.0.0.4'], json_data[4]['public_ips'])
+        self.assertEqual(json_data, json.loads(self.entry.to_json(self.nodes)))
+
+    def test_iter_json_empty(self):
+        self.assertEqual(['[]'], list(self.entry.iter_json([])))
+        self.assertEqual([], json.loads(self.entry.to_json([])))
+
+    def test_iter_json_bad_object(self):
+        self.assertRaises(ValueError, self.entry.to_json, self.nodes + [1])
+
+
 class ListEntryTest(unittest2.TestCase):
     def setUp(self):
         self.entry = ListEntry('result', 'C{list} of L{Node}', 'pass', True)
@@ -343,7 +395,7 @@ class ListEntryTest(unittest2.TestCase):
                                   json.loads(self.entry.to_json([n1, n2])))
 
         def test_from_json(self):
-            nodes = '{"result": [{"node_id": "2600"}, {"node_id": "2601"}]}'
+            nodes = {'result': [{'node_id': '2600'}, {'node_id': '2601'}]}
             result = self.entry.from_json(nodes, self.driver)
             get_node = lambda x: [node for node in result if node.id == x][0]
             self.assertTrue(get_node('2600'))
@@ -355,9 +407,9 @@ class ListEntryTest(unittest2.TestCase):
             self.entry = Entry('type', 'L{RecordType}', 'pass', True)
 
         def test_from_json(self):
-            valid_json = '{"record_type": 1}'
+            valid_json = {'record_type': 1}
             self.assertEqual(self.entry.from_json(valid_json, None),
                              RecordType.AAAA)
-            invalid_json = '{"record_type": "ABC"}'
+            invalid_json = {'record_type': 'ABC'}
             self.assertRaises(ValidationError, self.entry.from_json,
                               invalid_json, None)
@@ -0,0 +1,112 @@
+# -*- coding:utf-8 -*-
+import datetime
+import json
+import unittest2
+
+from libcloud.compute.base import Node, NodeState
+
+from libcloud_rest import json_codec
+from libcloud_rest.api import entries
+
+
+class CodecTestsMixin(object):
+    backend = None
+
+    def setUp(self):
+        try:
+            self.codec = json_codec.get_codec(self.backend)
+        except ValueError:
+            self.skipTest('%s is not installed' % (self.backend))
+
+    def test_round_trip(self):
+        data = {'name': u'тest', 'list': [1, 2.5, None, True],
+                'nested': {'tuple': (1, 'a')}, 'url': 'http://a/b'}
+        json_data = json.loads(self.codec.dumps(data))
+        self.assertEqual(json_data, {'name': u'тest',
+                                     'list': [1, 2.5, None, True],
+                                     'nested': {'tuple': [1, 'a']},
+                                     'url': 'http://a/b'})
+        self.assertEqual(json_data, self.codec.loads(json.dumps(data)))
+
+    def test_loads_malformed(self):
+        self.assertRaises(ValueError, self.codec.loads, '{123}')
+
+    def test_datetime(self):
+        data = {'datetime': datetime.datetime(2013, 1, 2, 3, 4, 5, 678000),
+                'date': datetime.date(2013, 1, 2),
+                'time': datetime.time(3, 4, 5)}
+        self.assertEqual(json.loads(self.codec.dumps(data)),
+                         {'datetime': '2013-01-02T03:04:05.678',
+                          'date': '2013-01-02', 'time': '03:04:05'})
+
+    def test_entry_objects(self):
+        node = Node('1', 'test', NodeState.RUNNING, ['10.0.0.1'], [], None)
+        self.assertEqual(json.loads(self.codec.dumps({'nodes': [node]})),
+                         {'nodes': [{'id': '1', 'name': 'test', 'state': 0,
+                                     'public_ips': ['10.0.0.1']}]})
+
+    def test_unknown_object(self):
+        self.assertRaises(TypeError, self.codec.dumps, {'a': object()})
+
+    def test_float_precision(self):
+        self.assertEqual(json.loads(self.codec.dumps([0.1234567891234])),
+                         [0.1234567891234])
+
+    def test_float_round_trip(self):
+        data = {'price': 0.1, 'values': [1.0000000000000002, 1e-07,
+                                         123456789.12345679, 1e+300, -0.0]}
+        #floats are formatted as by json module
+        self.assertEqual(json.loads(self.codec.dumps(data)), data)
+        self.assertEqual(self.codec.dumps(data),
+                         json_codec.get_codec('json').dumps(data))
+        self.assertEqual(self.codec.loads(self.codec.dumps(data)), data)
+
+
+class JsonCodecTests(CodecTestsMixin, unittest2.TestCase):
+    backend = 'json'
+
+
+class SimplejsonCodecTests(CodecTestsMixin, unittest2.TestCase):
+    backend = 'simplejson'
+
+
+class UjsonCodecTests(CodecTestsMixin, unittest2.TestCase):
+    backend = 'ujson'
+
+    def test_not_supported_value(self):
+        self.assertEqual('[NaN]', self.codec.dumps([float('nan')]))
+
+
+class BackendTests(unittest2.TestCase):
+    def setUp(self):
+        self.backend = json_codec.get_backend()
+
+    def tearDown(self):
+        json_codec.set_backend(self.backend)
+
+    def test_set_backend(self):
+        json_codec.set_backend('json')
+        self.assertEqual('json', json_codec.get_backend())
+        self.assertEqual({'a': [1]}, json_codec.loads(json_codec.dumps(
+            {'a': [1]})))
+        self.assertRaises(ValueError, json_codec.set_backend, 'unknown')
+        self.assertEqual('json', json_codec.get_backend())
+
+    def test_mixed_backend(self):
+        json_codec.set_backend('json/json')
+        self.assertEqual('json/json', json_codec.get_backend())
+        self.assertEqual({'a': [1]}, json_codec.loads(json_codec.dumps(
+            {'a': [1]})))
+        self.assertRaises(ValueError, json_codec.set_backend, 'json/unknown')
+
+    def test_default_backend(self):
+        json_codec.set_backend()
+        decoder, encoder = json_codec.get_backend().split('/')
+        self.assertIn(decoder, json_codec.BACKENDS)
+        self.assertEqual('json', encoder)
+        self.assertEqual({'a': [1]}, json_codec.loads(json_codec.dumps(
+            {'a': [1]})))
+
+
+if __name__ == '__main__':
+    unittest2.main()
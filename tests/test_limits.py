@@ -0,0 +1,112 @@
+# -*- coding:utf-8 -*-
+import httplib
+import threading
+import time
+import unittest2
+
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+from libcloud.compute.drivers.dummy import DummyNodeDriver
+from werkzeug.test import Client
+from werkzeug.wrappers import BaseResponse
+import libcloud
+
+from libcloud_rest.api.limits import ProviderLimits, provider_limits
+from libcloud_rest.api.versions import versions as rest_versions
+from libcloud_rest.application import LibcloudRestApp
+from libcloud_rest.errors import ProviderBusyError
+
+
+class ProviderLimitsTests(unittest2.TestCase):
+    def test_disabled(self):
+        limits = ProviderLimits(limit=0)
+        for _ in xrange(10):
+            limits.acquire('a')
+        self.assertEqual(0, limits.get_stats()['in_flight'])
+
+    def test_timeout(self):
+        limits = ProviderLimits(limit=2, timeout=0.05)
+        limits.acquire('a')
+        limits.acquire('a')
+        limits.acquire('b')
+        self.assertRaises(ProviderBusyError, limits.acquire, 'a', 'A')
+        self.assertEqual({'in_flight': 3, 'waited': 1, 'rejected': 1},
+                         limits.get_stats())
+        limits.release('a')
+        limits.acquire('a')
+
+    def test_wait_for_release(self):
+        limits = ProviderLimits(limit=1, timeout=10)
+        limits.acquire('a')
+        acquired = []
+
+        def acquire():
+            limits.acquire('a')
+            acquired.append(True)
+
+        thread = threading.Thread(target=acquire)
+        thread.start()
+        time.sleep(0.05)
+        self.assertEqual([], acquired)
+        limits.release('a')
+        thread.join(10)
+        self.assertEqual([True], acquired)
+        self.assertEqual({'in_flight': 1, 'waited': 1, 'rejected': 0},
+                         limits.get_stats())
+
+    def test_max_concurrency(self):
+        limits = ProviderLimits(limit=3, timeout=10)
+        lock = threading.Lock()
+        state = {'current': 0, 'max': 0}
+
+        def call():
+            limits.acquire('a')
+            try:
+                lock.acquire()
+                state['current'] += 1
+                state['max'] = max(state['max'], state['current'])
+                lock.release()
+                time.sleep(0.01)
+                lock.acquire()
+                state['current'] -= 1
+                lock.release()
+            finally:
+                limits.release('a')
+
+        threads = [threading.Thread(target=call) for _ in xrange(12)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        self.assertEqual(3, state['max'])
+        self.assertEqual(0, limits.get_stats()['in_flight'])
+
+
+class ProviderLimitsRequestTests(unittest2.TestCase):
+    def setUp(self):
+        self.client = Client(LibcloudRestApp(provider_concurrency_limit=1,
+                                             provider_queue_timeout=0.01),
+                             BaseResponse)
+        self.url = rest_versions[libcloud.__version__] + \
+            '/compute/DUMMY/nodes'
+
+    def tearDown(self):
+        provider_limits.release(DummyNodeDriver)
+        LibcloudRestApp()
+
+    def test_provider_busy(self):
+        headers = {'x-dummy-creds': '2'}
+        resp = self.client.get(self.url, headers=headers)
+        self.assertEqual(resp.status_code, httplib.OK)
+        provider_limits.acquire(DummyNodeDriver)
+        resp = self.client.get(self.url, headers=headers)
+        self.assertEqual(resp.status_code, httplib.SERVICE_UNAVAILABLE)
+        self.assertEqual(json.loads(resp.data)['error']['code'],
+                         ProviderBusyError.code)
+
+
+if __name__ == '__main__':
+    unittest2.main()
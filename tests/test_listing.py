@@ -0,0 +1,128 @@
+# -*- coding:utf-8 -*-
+import httplib
+import unittest2
+import urlparse
+
+from libcloud.storage.base import Container, Object
+from libcloud.storage.drivers.s3 import S3StorageDriver
+from libcloud.test import StorageMockHttp
+from libcloud.test.file_fixtures import StorageFileFixtures
+
+from libcloud_rest.api.listing import ObjectListings, get_page_function,\
+    get_s3_page
+
+
+class S3ListingMockHttp(StorageMockHttp):
+    fixtures = StorageFileFixtures('s3')
+    requests = []
+
+    def _test_container(self, method, url, body, headers):
+        query = dict(urlparse.parse_qsl(urlparse.urlsplit(url).query))
+        self.requests.append(dict(
+            (name, value) for name, value in query.items()
+            if name in ('prefix', 'marker', 'max-keys')))
+        if query.get('marker') == '3.zip':
+            name = 'list_container_objects_not_exhausted2.xml'
+        else:
+            name = 'list_container_objects_not_exhausted1.xml'
+        body = self.fixtures.load(name)
+        return (httplib.OK, body, {}, httplib.responses[httplib.OK])
+
+
+class IteratorDriver(object):
+    def __init__(self, names):
+        self.names = names
+        self.read = 0
+
+    def iterate_container_objects(self, container):
+        for name in self.names:
+            self.read += 1
+            yield Object(name=name, size=1, hash=None, extra={},
+                         meta_data=None, container=container, driver=self)
+
+
+class ObjectListingsTests(unittest2.TestCase):
+    def setUp(self):
+        self.listings = ObjectListings(page_size=3, max_limit=10)
+        self.calls = []
+        connection_cls = S3StorageDriver.connectionCls
+        self.conn_classes = connection_cls.conn_classes
+        connection_cls.conn_classes = (None, S3ListingMockHttp)
+        S3ListingMockHttp.requests = []
+        self.container = Container(name='test_container', extra={},
+                                   driver=None)
+
+    def tearDown(self):
+        S3StorageDriver.connectionCls.conn_classes = self.conn_classes
+
+    def call(self, function, *args, **kwargs):
+        self.calls.append(function)
+        return function(*args, **kwargs)
+
+    def get_names(self, pages):
+        return [[obj.name for obj in page] for page in pages]
+
+    def test_get_page_function(self):
+        self.assertEqual(get_s3_page,
+                         get_page_function(S3StorageDriver('key', 'secret')))
+        self.assertEqual(None, get_page_function(IteratorDriver([])))
+
+    def test_s3_pages(self):
+        driver = S3StorageDriver('key', 'secret')
+        pages = self.listings.iter_pages(driver, self.container, self.call,
+                                         prefix='', marker='0.zip')
+        self.assertEqual([['1.zip', '2.zip', '3.zip'], ['4.zip', '5.zip']],
+                         self.get_names(pages))
+        #marker and page size are sent to provider
+        self.assertEqual([{'max-keys': '3', 'marker': '0.zip'},
+                          {'max-keys': '3', 'marker': '3.zip'}],
+                         S3ListingMockHttp.requests)
+        self.assertEqual(2, len(self.calls))
+
+    def test_s3_list_objects(self):
+        driver = S3StorageDriver('key', 'secret')
+        objects, next_marker = self.listings.list_objects(
+            driver, self.container, self.call, prefix='1', limit=2)
+        self.assertEqual(['1.zip', '2.zip'], [obj.name for obj in objects])
+        self.assertEqual('2.zip', next_marker)
+        self.assertEqual([{'max-keys': '3', 'prefix': '1'}],
+                         S3ListingMockHttp.requests)
+        objects, next_marker = self.listings.list_objects(
+            driver, self.container, self.call, marker='3.zip', limit=2)
+        self.assertEqual(['4.zip', '5.zip'], [obj.name for obj in objects])
+        self.assertEqual(None, next_marker)
+
+    def test_iterator_pages(self):
+        driver = IteratorDriver(['b', 'a2', 'c', 'a1', 'a3', 'a0', 'a4'])
+        pages = self.listings.iter_pages(driver, self.container, self.call,
+                                         prefix='a', marker='a0', limit=3)
+        #objects are filtered and the first limit by name are returned
+        self.assertEqual([['a1', 'a2', 'a3']], self.get_names(pages))
+        self.assertEqual(7, driver.read)
+
+    def test_iterator_pages_unsorted(self):
+        driver = IteratorDriver(['e', 'b', 'g', 'a', 'f', 'c', 'd'])
+        pages = self.listings.iter_pages(driver, self.container, self.call,
+                                         marker='a')
+        self.assertEqual([['b', 'c', 'd'], ['e', 'f', 'g']],
+                         self.get_names(pages))
+        #pages of stream follow the same order as listing by marker
+        pages = self.listings.iter_pages(driver, self.container, self.call,
+                                         marker='c', limit=2)
+        self.assertEqual([['d', 'e']], self.get_names(pages))
+        objects, next_marker = self.listings.list_objects(
+            driver, self.container, self.call, marker='c', limit=2)
+        self.assertEqual(['d', 'e'], [obj.name for obj in objects])
+        self.assertEqual('e', next_marker)
+
+    def test_iterator_list_objects(self):
+        driver = IteratorDriver(['b', 'a2', 'c', 'a1', 'a3', 'a0', 'a4'])
+        objects, next_marker = self.listings.list_objects(
+            driver, self.container, self.call, prefix='a', marker='a0',
+            limit=2)
+        self.assertEqual(['a1', 'a2'], [obj.name for obj in objects])
+        self.assertEqual('a2', next_marker)
+        objects, next_marker = self.listings.list_objects(
+            driver, self.container, self.call, marker='a3')
+        self.assertEqual(['a4', 'b', 'c'], [obj.name for obj in objects])
+        self.assertEqual(None, next_marker)
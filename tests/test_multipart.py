@@ -0,0 +1,217 @@
+# -*- coding:utf-8 -*-
+import httplib
+import os
+import shutil
+import stat
+import tempfile
+import threading
+import time
+import unittest2
+import urlparse
+
+import mock
+from libcloud.common.types import LibcloudError
+from libcloud.storage.base import Container
+from libcloud.storage.drivers.s3 import S3StorageDriver
+from libcloud.test import MockRawResponse, StorageMockHttp
+from libcloud.test.file_fixtures import StorageFileFixtures
+
+from libcloud_rest.api.multipart import MultipartUploads, S3MultipartUpload
+from libcloud_rest.api.uploads import ObjectUploads
+from libcloud_rest.errors import NoSuchUploadError, ValidationError
+
+
+class S3MultipartMockHttp(StorageMockHttp):
+    fixtures = StorageFileFixtures('s3')
+    requests = []
+
+    def _foo_bar_container_foo_bar_object(self, method, url, body, headers):
+        query = urlparse.parse_qs(urlparse.urlsplit(url).query,
+                                  keep_blank_values=True)
+        self.requests.append((method, sorted(query), body))
+        if 'uploads' in query:
+            body = self.fixtures.load('initiate_multipart.xml')
+        elif method == 'POST':
+            body = self.fixtures.load('complete_multipart.xml')
+        else:
+            return (httplib.NO_CONTENT, '', {},
+                    httplib.responses[httplib.NO_CONTENT])
+        return (httplib.OK, body, {}, httplib.responses[httplib.OK])
+
+
+class S3MultipartMockRawResponse(MockRawResponse):
+    fail = False
+
+    def _foo_bar_container_foo_bar_object(self, method, url, body, headers):
+        if self.fail:
+            return (httplib.BAD_REQUEST, '', {},
+                    httplib.responses[httplib.BAD_REQUEST])
+        return (httplib.OK, '', {'etag': '"part"'},
+                httplib.responses[httplib.OK])
+
+
+class MultipartUploadsTests(unittest2.TestCase):
+    def setUp(self):
+        self.spool_dir = tempfile.mkdtemp()
+        self.uploads = MultipartUploads(
+            ObjectUploads(chunk_size=4, spool_dir=self.spool_dir),
+            max_parallel=3, expires=60)
+        self.target = {'provider': 'S3', 'credentials': 'c',
+                       'container': 'foo_bar_container',
+                       'object': 'foo_bar_object'}
+        connection_cls = S3StorageDriver.connectionCls
+        self.conn_classes = connection_cls.conn_classes
+        self.raw_response_cls = connection_cls.rawResponseCls
+        connection_cls.conn_classes = (None, S3MultipartMockHttp)
+        connection_cls.rawResponseCls = S3MultipartMockRawResponse
+        S3MultipartMockHttp.requests = []
+        S3MultipartMockRawResponse.fail = False
+        self.released = []
+        patcher = mock.patch.object(S3StorageDriver, 'get_container')
+        patcher.start().side_effect = lambda name: Container(
+            name=name, extra={}, driver=None)
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        S3StorageDriver.connectionCls.conn_classes = self.conn_classes
+        S3StorageDriver.connectionCls.rawResponseCls = self.raw_response_cls
+        shutil.rmtree(self.spool_dir)
+
+    def get_driver(self):
+        return S3StorageDriver('key', 'secret')
+
+    def call(self, function, *args, **kwargs):
+        return function(*args, **kwargs)
+
+    def create_upload(self, parts):
+        upload_id = self.uploads.initiate(self.target, 'text/plain')
+        upload = self.uploads.get_upload(upload_id, self.target)
+        for number, data in parts:
+            self.uploads.put_part(upload, number, iter([data]))
+        return upload
+
+    def complete(self, upload):
+        return self.uploads.complete(
+            upload, self.uploads.select_parts(upload), self.get_driver,
+            self.released.append, self.call)
+
+    def test_get_upload(self):
+        upload = self.create_upload([])
+        self.assertEqual('text/plain', upload['content_type'])
+        self.assertRaises(NoSuchUploadError, self.uploads.get_upload,
+                          upload['id'], dict(self.target, credentials='x'))
+        self.assertRaises(NoSuchUploadError, self.uploads.get_upload,
+                          '../' + upload['id'], self.target)
+        self.uploads.abort(upload)
+        self.assertRaises(NoSuchUploadError, self.uploads.get_upload,
+                          upload['id'], self.target)
+
+    def test_replace_part_concurrently(self):
+        upload = self.create_upload([])
+        list_parts = self.uploads.list_parts
+
+        def slow_list_parts(upload):
+            parts = list_parts(upload)
+            time.sleep(0.05)
+            return parts
+
+        threads = [threading.Thread(target=self.uploads.put_part,
+                                    args=(upload, 1, iter([data])))
+                   for data in ('a', 'b', 'c')]
+        with mock.patch.object(self.uploads, 'list_parts', slow_list_parts):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        parts = self.uploads.list_parts(upload)
+        self.assertEqual([1], [part['part_number'] for part in parts])
+
+    def test_private_root(self):
+        root = self.uploads.get_root()
+        self.assertEqual(0700, stat.S_IMODE(os.stat(root).st_mode))
+        os.chmod(root, 0777)
+        self.assertRaises(OSError, self.uploads.initiate, self.target)
+
+    def test_select_parts(self):
+        upload = self.create_upload([(3, 'c'), (1, 'a'), (2, 'b')])
+        parts = self.uploads.select_parts(upload)
+        self.assertEqual([1, 2, 3], [part['part_number'] for part in parts])
+        parts = self.uploads.select_parts(
+            upload, [{'part_number': 1}, {'part_number': 3}])
+        self.assertEqual([1, 3], [part['part_number'] for part in parts])
+        for requested in ([{'part_number': 3}, {'part_number': 1}],
+                          [{'part_number': 4}], [1], {}):
+            self.assertRaises(ValidationError, self.uploads.select_parts,
+                              upload, requested)
+
+    def test_native_upload(self):
+        upload = self.create_upload([(number, 'x' * number)
+                                     for number in xrange(1, 6)])
+        obj = self.complete(upload)
+        self.assertEqual('3858f62230ac3c915f300c664312c11f-9', obj.hash)
+        self.assertEqual(15, obj.size)
+        self.assertEqual('foo_bar_object', obj.name)
+        requests = S3MultipartMockHttp.requests
+        self.assertEqual('POST', requests[0][0])
+        self.assertTrue('uploads' in requests[0][1])
+        method, query, body = requests[-1]
+        self.assertEqual('POST', method)
+        self.assertTrue('uploadId' in query)
+        self.assertEqual(5, body.count('<ETag>"part"</ETag>'))
+        self.assertTrue(body.index('<PartNumber>1<') <
+                        body.index('<PartNumber>5<'))
+        #main driver and max_parallel - 1 part drivers are released
+        self.assertEqual(3, len(self.released))
+        self.assertFalse(os.path.exists(upload['path']))
+        self.assertEqual(1, self.uploads.get_stats()['native'])
+
+    def test_native_upload_parallel(self):
+        upload = self.create_upload([(number, 'x') for number in xrange(1, 7)])
+        threads = set()
+
+        def upload_part(native, driver, part):
+            threads.add((threading.current_thread().name, id(driver)))
+            time.sleep(0.01)
+            return '"%d"' % (part['part_number'])
+
+        with mock.patch.object(S3MultipartUpload, 'upload_part',
+                               upload_part):
+            with mock.patch.object(S3MultipartUpload, 'commit') as commit:
+                commit.return_value = '"etag"'
+                obj = self.complete(upload)
+        self.assertEqual('etag', obj.hash)
+        self.assertEqual(3, len(threads))
+        self.assertEqual([(number, '"%d"' % (number))
+                          for number in xrange(1, 7)],
+                         commit.call_args[0][1])
+
+    def test_native_upload_error(self):
+        upload = self.create_upload([(1, 'a'), (2, 'b')])
+        S3MultipartMockRawResponse.fail = True
+        self.assertRaises(LibcloudError, self.complete, upload)
+        #provider upload is aborted, parts are kept for next completion
+        self.assertEqual('DELETE', S3MultipartMockHttp.requests[-1][0])
+        self.assertEqual(2, len(self.uploads.list_parts(upload)))
+        self.assertEqual(2, len(self.released))
+
+    def test_concatenated_upload(self):
+        upload = self.create_upload([(2, 'efghij'), (1, 'abcd')])
+        with mock.patch.object(S3StorageDriver,
+                               'supports_s3_multipart_upload', False):
+            with mock.patch.object(S3StorageDriver,
+                                   'upload_object') as upload_object:
+                upload_object.side_effect = \
+                    lambda path, *args, **kwargs: open(path).read()
+                self.assertEqual('abcdefghij', self.complete(upload))
+        self.assertEqual({'content_type': 'text/plain'},
+                         upload_object.call_args[1]['extra'])
+        self.assertEqual(0, self.uploads.get_stats()['native'])
+
+    def test_remove_expired(self):
+        upload = self.create_upload([(1, 'a')])
+        expired = time.time() - 61
+        os.utime(os.path.join(upload['path'], 'manifest.json'),
+                 (expired, expired))
+        self.create_upload([])
+        self.assertFalse(os.path.exists(upload['path']))
+        self.assertEqual(1, self.uploads.get_stats()['expired'])
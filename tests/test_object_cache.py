@@ -0,0 +1,118 @@
+# -*- coding:utf-8 -*-
+import os
+import shutil
+import stat
+import tempfile
+import time
+import unittest2
+
+import mock
+from libcloud.storage.base import Container, Object
+
+from libcloud_rest.api.object_cache import ObjectCache, TEMP_EXPIRES
+
+
+def get_object(name='object', size=10, object_hash='h1'):
+    container = Container(name='container', extra={}, driver=None)
+    return Object(name=name, size=size, hash=object_hash, extra={},
+                  container=container, meta_data=None, driver=None)
+
+
+class ObjectCacheTests(unittest2.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = ObjectCache(os.path.join(self.directory, 'cache'),
+                                 max_bytes=25)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def store(self, key, data, size=None):
+        stream = self.cache.store(key, len(data) if size is None else size,
+                                  iter([data[:5], data[5:]]))
+        return ''.join(stream)
+
+    def test_get_key(self):
+        key = self.cache.get_key('S3', 'c', get_object())
+        self.assertEqual(key, self.cache.get_key('S3', 'c', get_object()))
+        for args in (('S3', 'c', get_object(object_hash='h2')),
+                     ('S3', 'other', get_object()),
+                     ('CLOUDFILES_US', 'c', get_object()),
+                     ('S3', 'c', get_object(name=u'об'))):
+            self.assertNotEqual(key, self.cache.get_key(*args))
+        for obj in (get_object(object_hash=None), get_object(size=None),
+                    get_object(size=26)):
+            self.assertEqual(None, self.cache.get_key('S3', 'c', obj))
+        self.cache.directory = None
+        self.assertEqual(None, self.cache.get_key('S3', 'c', get_object()))
+
+    def test_store(self):
+        self.assertEqual(None, self.cache.get('a', 10))
+        self.assertEqual('0123456789', self.store('a', '0123456789'))
+        fh = self.cache.get('a', 10)
+        path = os.path.join(self.cache.directory, 'a')
+        #file stays readable when it is evicted by other process
+        os.unlink(path)
+        self.assertEqual('0123456789', fh.read())
+        fh.close()
+        self.store('a', '0123456789')
+        #file with other size is removed
+        self.assertEqual(None, self.cache.get('a', 11))
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual({'enabled': True, 'hits': 1, 'misses': 2,
+                          'hit_rate': 1 / 3.0, 'stores': 2, 'evictions': 0,
+                          'bytes': 20}, self.cache.get_stats())
+
+    def test_private_directory(self):
+        self.assertEqual('0123456789', self.store('a', '0123456789'))
+        self.assertEqual(0700,
+                         stat.S_IMODE(os.stat(self.cache.directory).st_mode))
+        #directory of other users is not used
+        cache = ObjectCache(self.directory + '/shared', max_bytes=25)
+        os.mkdir(cache.directory, 0777)
+        os.chmod(cache.directory, 0777)
+        open(os.path.join(cache.directory, 'a'), 'wb').write('planted!!!')
+        self.assertEqual(None, cache.get('a', 10))
+        stream = iter(['01234', '56789'])
+        self.assertTrue(stream is cache.store('b', 10, stream))
+        self.assertEqual(['a'], os.listdir(cache.directory))
+
+    def test_directory_is_scanned_when_full(self):
+        self.store('a', '0123456789')
+        with mock.patch('os.listdir') as listdir:
+            self.store('b', '0123456789')
+            self.assertFalse(listdir.called)
+        self.assertEqual(20, self.cache.get_stats()['bytes'])
+        self.store('c', '0123456789')
+        self.assertEqual(2, len(os.listdir(self.cache.directory)))
+        self.assertEqual(20, self.cache.get_stats()['bytes'])
+
+    def test_incomplete_stream(self):
+        self.store('a', '0123456789', size=11)
+        stream = self.cache.store('b', 10, iter(['01234', '56789']))
+        next(stream)
+        stream.close()
+        self.assertEqual(None, self.cache.get('a', 10))
+        self.assertEqual(None, self.cache.get('b', 10))
+        #temporary files are removed
+        self.assertEqual([], os.listdir(self.cache.directory))
+
+    def test_evict_least_recently_used(self):
+        for key in ('a', 'b'):
+            self.store(key, '0123456789')
+            path = os.path.join(self.cache.directory, key)
+            os.utime(path, (time.time() - 10, time.time() - 10))
+        self.cache.get('a', 10).close()
+        self.store('c', '0123456789')
+        self.assertEqual(['a', 'c'], sorted(os.listdir(self.cache.directory)))
+        self.assertEqual(1, self.cache.get_stats()['evictions'])
+        self.assertEqual(20, self.cache.get_stats()['bytes'])
+
+    def test_evict_temporary_files(self):
+        self.store('a', '0123456789')
+        stale = os.path.join(self.cache.directory, '.tmp-stale')
+        open(stale, 'wb').close()
+        expired = time.time() - TEMP_EXPIRES - 1
+        os.utime(stale, (expired, expired))
+        self.cache.evict()
+        self.assertEqual(['a'], os.listdir(self.cache.directory))
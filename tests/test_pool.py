@@ -0,0 +1,100 @@
+# -*- coding:utf-8 -*-
+import unittest2
+
+from werkzeug.test import Client
+from werkzeug.wrappers import BaseResponse
+import libcloud
+from libcloud.compute.drivers.dummy import DummyNodeDriver
+
+from libcloud_rest.api.pool import DriversPool, drivers_pool
+from libcloud_rest.api.versions import versions as rest_versions
+from libcloud_rest.application import LibcloudRestApp
+
+
+class DriversPoolTests(unittest2.TestCase):
+    def setUp(self):
+        self.pool = DriversPool(max_size=2, idle_timeout=60, max_age=600)
+
+    def test_reuse(self):
+        driver = self.pool.checkout(DummyNodeDriver, {'creds': '1'})
+        self.pool.checkin(driver)
+        self.assertTrue(driver is
+                        self.pool.checkout(DummyNodeDriver, {'creds': '1'}))
+        other_driver = self.pool.checkout(DummyNodeDriver, {'creds': '2'})
+        self.assertFalse(driver is other_driver)
+        self.assertEqual(self.pool.get_stats(),
+                         {'idle': 0, 'created': 2, 'reused': 1,
+                          'evicted': 0})
+
+    def test_checked_out_driver_not_shared(self):
+        driver = self.pool.checkout(DummyNodeDriver, {'creds': '1'})
+        other_driver = self.pool.checkout(DummyNodeDriver, {'creds': '1'})
+        self.assertFalse(driver is other_driver)
+
+    def test_max_size(self):
+        drivers = [self.pool.checkout(DummyNodeDriver, {'creds': str(i)})
+                   for i in range(3)]
+        for driver in drivers:
+            self.pool.checkin(driver)
+        self.assertEqual(self.pool.get_stats()['idle'], 2)
+        self.assertEqual(self.pool.evicted, 1)
+        # least recently used driver was evicted
+        self.assertFalse(drivers[0] is
+                         self.pool.checkout(DummyNodeDriver, {'creds': '0'}))
+        self.assertTrue(drivers[2] is
+                        self.pool.checkout(DummyNodeDriver, {'creds': '2'}))
+
+    def test_idle_timeout(self):
+        self.pool.idle_timeout = 0
+        driver = self.pool.checkout(DummyNodeDriver, {'creds': '1'})
+        self.pool.checkin(driver)
+        self.assertFalse(driver is
+                         self.pool.checkout(DummyNodeDriver, {'creds': '1'}))
+
+    def test_max_age(self):
+        self.pool.max_age = 0
+        driver = self.pool.checkout(DummyNodeDriver, {'creds': '1'})
+        self.pool.checkin(driver)
+        self.assertFalse(driver is
+                         self.pool.checkout(DummyNodeDriver, {'creds': '1'}))
+
+    def test_max_age_behind_fresh_driver(self):
+        old_driver = self.pool.checkout(DummyNodeDriver, {'creds': '1'})
+        other_driver = self.pool.checkout(DummyNodeDriver, {'creds': '2'})
+        #old driver was used recently, but it was created long ago
+        old_driver._pool_info = (old_driver._pool_info[0],
+                                 old_driver._pool_info[1] - 601)
+        self.pool.checkin(other_driver)
+        self.pool.checkin(old_driver)
+        self.assertFalse(old_driver is
+                         self.pool.checkout(DummyNodeDriver, {'creds': '1'}))
+        self.assertEqual(1, self.pool.evicted)
+        self.assertTrue(other_driver is
+                        self.pool.checkout(DummyNodeDriver, {'creds': '2'}))
+
+    def test_disabled(self):
+        pool = DriversPool(max_size=0)
+        driver = pool.checkout(DummyNodeDriver, {'creds': '1'})
+        pool.checkin(driver)
+        self.assertFalse(driver is pool.checkout(DummyNodeDriver,
+                                                 {'creds': '1'}))
+        self.assertEqual(pool.get_stats()['idle'], 0)
+
+
+class ApplicationPoolTests(unittest2.TestCase):
+    def setUp(self):
+        self.client = Client(LibcloudRestApp(), BaseResponse)
+        self.url = rest_versions[libcloud.__version__] + '/compute/DUMMY/nodes'
+        drivers_pool.clear()
+
+    def test_driver_reused_between_requests(self):
+        reused = drivers_pool.reused
+        headers = {'x-dummy-creds': 'pool_test'}
+        for _ in range(3):
+            resp = self.client.get(self.url, headers=headers)
+            self.assertEqual(resp.status_code, 200)
+        self.assertEqual(drivers_pool.reused - reused, 2)
+
+
+if __name__ == '__main__':
+    unittest2.main()
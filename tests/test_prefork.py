@@ -0,0 +1,187 @@
+# -*- coding:utf-8 -*-
+import httplib
+import os
+import signal
+import socket
+import tempfile
+import time
+import unittest2
+
+from libcloud_rest import prefork
+from libcloud_rest.prefork import PreforkServer
+
+
+def pid_app(environ, start_response):
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return [str(os.getpid())]
+
+
+def get_pipe_app(fd):
+    def pipe_app(environ, start_response):
+        #blocking system call which is not retried by Python on EINTR
+        data = os.read(fd, 5) if environ['PATH_INFO'] == '/read' else ''
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+        return [data]
+    return pipe_app
+
+
+def get_file_app(path):
+    def file_app(environ, start_response):
+        fh = open(path, 'rb')
+        #file is sent from current position
+        offset, _, length = environ['QUERY_STRING'].partition('&')
+        fh.seek(int(offset))
+        if length:
+            length = int(length)
+            body = environ['wsgi.file_wrapper'](fh, 8192, length)
+        else:
+            length = os.path.getsize(path) - fh.tell()
+            body = environ['wsgi.file_wrapper'](fh)
+        start_response('200 OK', [('Content-Length', str(length))])
+        return body
+    return file_app
+
+
+class PreforkServerTests(unittest2.TestCase):
+    def setUp(self):
+        self.master_pid = None
+
+    def tearDown(self):
+        if self.master_pid is not None:
+            os.kill(self.master_pid, signal.SIGTERM)
+            os.waitpid(self.master_pid, 0)
+
+    def start_server(self, app=pid_app, **kwargs):
+        server = PreforkServer(lambda: app, '127.0.0.1', 0, **kwargs)
+        server.bind()
+        self.port = server.port
+        pid = os.fork()
+        if not pid:
+            status = 0
+            try:
+                server.run()
+            except Exception:
+                status = 1
+            os._exit(status)
+        self.master_pid = pid
+        if server.listener is not None:
+            server.listener.close()
+
+    def get(self, url='/', timeout=10):
+        """
+        Return response, wait until server is started.
+        """
+        deadline = time.time() + timeout
+        while True:
+            try:
+                connection = httplib.HTTPConnection('127.0.0.1', self.port,
+                                                    timeout=timeout)
+                connection.request('GET', url)
+                return connection.getresponse()
+            except (socket.error, httplib.HTTPException):
+                if time.time() > deadline:
+                    raise
+                time.sleep(0.1)
+
+    def get_worker_pid(self, timeout=10):
+        return int(self.get(timeout=timeout).read())
+
+    def test_workers(self):
+        self.start_server(workers=2)
+        pids = set(self.get_worker_pid() for _ in xrange(10))
+        self.assertTrue(pids)
+        self.assertNotIn(self.master_pid, pids)
+
+    def test_threads(self):
+        self.start_server(workers=1, threads=3)
+        pids = set(self.get_worker_pid() for _ in xrange(5))
+        self.assertEqual(1, len(pids))
+
+    def test_max_requests(self):
+        self.start_server(workers=1, max_requests=2)
+        pids = [self.get_worker_pid() for _ in xrange(6)]
+        self.assertEqual(pids[0], pids[1])
+        self.assertEqual(3, len(set(pids)))
+
+    def test_reload(self):
+        self.start_server(workers=1)
+        pid = self.get_worker_pid()
+        os.kill(self.master_pid, signal.SIGHUP)
+        deadline = time.time() + 10
+        while self.get_worker_pid() == pid:
+            self.assertLess(time.time(), deadline)
+            time.sleep(0.1)
+
+    def test_stop(self):
+        self.start_server(workers=2)
+        self.get_worker_pid()
+        os.kill(self.master_pid, signal.SIGTERM)
+        pid, status = os.waitpid(self.master_pid, 0)
+        self.master_pid = None
+        self.assertEqual(0, status)
+
+    def test_stop_request_in_progress(self):
+        read_fd, write_fd = os.pipe()
+        self.addCleanup(os.close, read_fd)
+        self.addCleanup(os.close, write_fd)
+        self.start_server(app=get_pipe_app(read_fd), workers=1)
+        self.get().read()
+        connection = httplib.HTTPConnection('127.0.0.1', self.port,
+                                            timeout=10)
+        connection.request('GET', '/read')
+        #worker is asked to stop while request waits for data
+        time.sleep(0.5)
+        os.kill(self.master_pid, signal.SIGTERM)
+        time.sleep(0.5)
+        os.write(write_fd, 'hello')
+        response = connection.getresponse()
+        self.assertEqual(httplib.OK, response.status)
+        self.assertEqual('hello', response.read())
+        pid, status = os.waitpid(self.master_pid, 0)
+        self.master_pid = None
+        self.assertEqual(0, status)
+
+    @unittest2.skipIf(prefork.sendfile is None, 'sendfile is not available')
+    def test_sendfile(self):
+        fd, path = tempfile.mkstemp()
+        self.addCleanup(os.unlink, path)
+        #more than one sendfile call
+        data = os.urandom(prefork.SENDFILE_BLOCK_SIZE + 1000)
+        os.write(fd, data)
+        os.close(fd)
+        self.start_server(app=get_file_app(path), workers=1)
+        for offset in (0, 1000):
+            response = self.get('/?%d' % (offset))
+            self.assertEqual(httplib.OK, response.status)
+            self.assertEqual(data[offset:], response.read())
+        #bytes after length are not sent, connection is read to the end
+        for offset, length in ((0, 10), (1000, prefork.SENDFILE_BLOCK_SIZE)):
+            sock = socket.create_connection(('127.0.0.1', self.port), 10)
+            sock.sendall('GET /?%d&%d HTTP/1.0\r\n\r\n' % (offset, length))
+            response = ''.join(iter(lambda: sock.recv(65536), ''))
+            sock.close()
+            self.assertEqual(data[offset:offset + length],
+                             response.split('\r\n\r\n', 1)[1])
+
+    @unittest2.skipUnless(hasattr(socket, 'SO_REUSEPORT'),
+                          'SO_REUSEPORT is not supported')
+    def test_reuse_port(self):
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+        sock.close()
+        server = PreforkServer(lambda: pid_app, '127.0.0.1', port,
+                               workers=2, reuse_port=True)
+        self.port = port
+        pid = os.fork()
+        if not pid:
+            try:
+                server.run()
+            finally:
+                os._exit(0)
+        self.master_pid = pid
+        self.assertNotEqual(self.master_pid, self.get_worker_pid())
+
+
+if __name__ == '__main__':
+    unittest2.main()
@@ -1,8 +1,15 @@
 # -*- coding:utf-8 -*-
+import sys
+import types
 import unittest2
 
-from libcloud_rest.api.providers import DriverMethod
-from libcloud_rest.errors import NoSuchOperationError, MethodParsingException
+import mock
+
+from libcloud_rest.api.providers import DriverMethod, DriverMethodsCache,\
+    driver_methods_cache, ProvidersRegistry
+from libcloud_rest.errors import NoSuchOperationError,\
+    MethodParsingException, MalformedJSONError, ProviderNotSupportedError
+from libcloud_rest import json_codec
 
 
 class FakeDriver(object):
@@ -97,6 +104,146 @@ class DriverMethodTests(unittest2.TestCase):
         self.assertRaises(MethodParsingException, DriverMethod, FakeDriver,
                           'get_unknown_argument')
 
+    def test_invoke_parses_body_once(self):
+        driver_method = DriverMethod(FakeDriver(), 'ex_create_fake')
+        data = json_codec.dumps({'node_id': '1', 'volume': 'v',
+                                 'device': 'd', 'extra': {}, 'kwarg': 'k'})
+        method = driver_method.method = mock.Mock()
+        with mock.patch.object(json_codec, 'loads',
+                               wraps=json_codec.loads) as loads:
+            driver_method.invoke(data)
+        self.assertEqual(1, loads.call_count)
+        node = method.call_args[0][0]
+        self.assertEqual('1', node.id)
+        self.assertEqual({}, method.call_args[0][3])
+        self.assertEqual({'kwarg': 'k'}, method.call_args[1])
+        self.assertRaises(MalformedJSONError, driver_method.invoke, '{')
+
+
+class DriverMethodsCacheTests(unittest2.TestCase):
+    def setUp(self):
+        self.cache = DriverMethodsCache()
+
+    def test_get(self):
+        method_info = self.cache.get(FakeDriver, 'ex_create_fake')
+        self.assertEqual(self.cache.get_stats(),
+                         {'size': 1, 'hits': 0, 'misses': 1})
+        self.assertTrue(method_info is
+                        self.cache.get(FakeDriver, 'ex_create_fake'))
+        self.assertEqual(self.cache.get_stats(),
+                         {'size': 1, 'hits': 1, 'misses': 1})
+
+    def test_parsing_errors_cached(self):
+        for _ in range(2):
+            self.assertRaises(MethodParsingException, self.cache.get,
+                              FakeDriver, 'get_not_documented')
+        self.assertEqual(self.cache.get_stats(),
+                         {'size': 1, 'hits': 1, 'misses': 1})
+
+    def test_parsing_without_lock(self):
+        create_method_info = self.cache._create_method_info
+        locked = []
+
+        def create(driver_cls, method_name):
+            locked.append(self.cache._lock.locked())
+            return create_method_info(driver_cls, method_name)
+
+        with mock.patch.object(self.cache, '_create_method_info', create):
+            method_info = self.cache.get(FakeDriver, 'ex_create_fake')
+        self.assertEqual([False], locked)
+        self.assertTrue(method_info is
+                        self.cache.get(FakeDriver, 'ex_create_fake'))
+
+    def test_warm_up(self):
+        failures = self.cache.warm_up([FakeDriver])
+        self.assertEqual(set(failures[FakeDriver]),
+                         set(['get_not_documented', 'get_unknown_argument',
+                              'get_bad_docstring']))
+        misses = self.cache.misses
+        self.cache.get(FakeDriver, 'ex_create_fake')
+        self.assertEqual(self.cache.misses, misses)
+        self.cache.clear()
+        self.assertEqual(self.cache.get_stats(),
+                         {'size': 0, 'hits': 0, 'misses': 0})
+
+    def test_driver_method_shares_entries(self):
+        driver_method = DriverMethod(FakeDriver, 'ex_create_fake')
+        method_info = driver_methods_cache.get(FakeDriver, 'ex_create_fake')
+        self.assertTrue(driver_method.vargs_entries is
+                        method_info.vargs_entries)
+        self.assertTrue(DriverMethod(FakeDriver(), 'ex_create_fake'))
+
+
+class FakeProviders(object):
+    module_name = 'tests.fake_drivers_module'
+
+    class Provider(object):
+        FAKE = 'fake'
+        OTHER = 'other'
+        NOT_SUPPORTED = 'not_supported'
+
+    DRIVERS = {
+        'fake': (module_name, 'FakeDriver'),
+        'other': (module_name, 'OtherDriver'),
+    }
+
+
+class ProvidersRegistryTests(unittest2.TestCase):
+    def setUp(self):
+        module = types.ModuleType(FakeProviders.module_name)
+        module.FakeDriver = type('FakeDriver', (object, ),
+                                 {'name': 'Fake', 'website': 'http://fake'})
+        module.OtherDriver = type('OtherDriver', (object, ), {})
+        self.module = module
+        sys.modules[module.__name__] = module
+        self.import_patcher = mock.patch('__builtin__.__import__',
+                                         side_effect=self._import)
+        self.imports = []
+        self._real_import = __import__
+        self.import_patcher.start()
+
+    def tearDown(self):
+        self.import_patcher.stop()
+        del sys.modules[self.module.__name__]
+
+    def _import(self, name, *args, **kwargs):
+        if name == self.module.__name__:
+            self.imports.append(name)
+        return self._real_import(name, *args, **kwargs)
+
+    def test_lazy_import(self):
+        registry = ProvidersRegistry(FakeProviders)
+        self.assertEqual(['FAKE', 'OTHER'], registry.get_provider_names())
+        self.assertIn('fake', registry)
+        self.assertNotIn('not_supported', registry)
+        self.assertEqual([], self.imports)
+        self.assertIs(self.module.FakeDriver, registry.get_driver('fake'))
+        self.assertIs(self.module.FakeDriver, registry.get_driver('FAKE'))
+        self.assertEqual(1, len(self.imports))
+
+    def test_eager_import(self):
+        registry = ProvidersRegistry(FakeProviders, lazy=False)
+        self.assertEqual(2, len(self.imports))
+        registry.get_driver('other')
+        self.assertEqual(2, len(self.imports))
+
+    def test_not_supported(self):
+        registry = ProvidersRegistry(FakeProviders)
+        self.assertRaises(ProviderNotSupportedError,
+                          registry.get_driver, 'not_supported')
+        self.assertRaises(ProviderNotSupportedError,
+                          registry.get_driver, 'unknown')
+
+    def test_providers_info(self):
+        registry = ProvidersRegistry(FakeProviders)
+        providers_info = registry.get_providers_info()
+        self.assertEqual([{'id': 'FAKE', 'friendly_name': 'Fake',
+                           'website': 'http://fake'},
+                          {'id': 'OTHER', 'friendly_name': '',
+                           'website': ''}], providers_info)
+        self.assertIs(providers_info, registry.get_providers_info())
+
+
 
 if __name__ == '__main__':
     unittest2.main()
@@ -0,0 +1,147 @@
+# -*- coding:utf-8 -*-
+import os
+import shutil
+import stat
+import tempfile
+import unittest2
+
+from mock import patch
+from libcloud.common.openstack import OpenStackAuthConnection
+from libcloud.compute.drivers.dummy import DummyNodeDriver
+from libcloud.compute.drivers.rackspace import RackspaceNodeDriver
+from libcloud.test.compute.test_openstack import OpenStackMockHttp
+
+from libcloud_rest.api.pool import drivers_pool
+from libcloud_rest.api.tokens import MemoryTokenStore, FileTokenStore,\
+    install_token_store, parse_expires, get_auth_key
+from libcloud_rest.application import LibcloudRestApp
+
+#fixtures token expires at 2011-09-18T02:44:17.000-05:00
+NOW = parse_expires('2011-09-17T00:00:00Z')
+
+
+class ParseExpiresTests(unittest2.TestCase):
+    def test_parse(self):
+        self.assertEqual(parse_expires('2011-09-18T07:44:17Z'),
+                         parse_expires('2011-09-18T02:44:17.000-05:00'))
+        self.assertEqual(parse_expires('2011-09-18T07:44:17Z'),
+                         parse_expires('2011-09-18T09:44:17+0200'))
+        self.assertEqual(parse_expires('1970-01-01T00:01:00'), 60)
+        self.assertTrue(parse_expires('tomorrow') is None)
+        self.assertTrue(parse_expires(None) is None)
+
+
+class TokenStoreTestsMixin(object):
+    def setUp(self):
+        conn_classes = (OpenStackMockHttp, OpenStackMockHttp)
+        self.patches = [
+            patch.object(RackspaceNodeDriver.connectionCls,
+                         'conn_classes', conn_classes),
+            patch.object(OpenStackAuthConnection, 'conn_classes',
+                         conn_classes, create=True),
+            patch('libcloud_rest.api.tokens.time'),
+        ]
+        for p in self.patches:
+            mock = p.start()
+        mock.time.return_value = NOW
+        self.time = mock.time
+        OpenStackMockHttp.type = None
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    def _list_nodes(self, store, user='user'):
+        driver = RackspaceNodeDriver(user, 'key')
+        self.assertTrue(install_token_store(driver, store))
+        self.assertEqual(len(driver.list_nodes()), 1)
+        return driver
+
+    def _count_auth(self, func, *args):
+        authenticate = OpenStackAuthConnection.authenticate
+        with patch.object(OpenStackAuthConnection, 'authenticate',
+                          autospec=True,
+                          side_effect=authenticate) as auth_mock:
+            func(*args)
+        return auth_mock.call_count
+
+    def _use_drivers(self, store):
+        for _ in range(3):
+            self._list_nodes(store)
+
+    def test_one_authentication(self):
+        store = self.get_store()
+        self.assertEqual(self._count_auth(self._use_drivers, store), 1)
+        driver = self._list_nodes(store)
+        self.assertEqual(
+            store.get(get_auth_key(driver.connection))['auth_token'],
+            driver.connection.auth_token)
+
+    def test_different_credentials(self):
+        store = self.get_store()
+
+        def use_drivers():
+            self._list_nodes(store, 'user1')
+            self._list_nodes(store, 'user2')
+        self.assertEqual(self._count_auth(use_drivers), 2)
+
+    def test_expired_token(self):
+        store = self.get_store()
+        self.assertEqual(self._count_auth(self._list_nodes, store), 1)
+        self.time.return_value = NOW + 2 * 24 * 3600
+        self.assertEqual(self._count_auth(self._list_nodes, store), 1)
+
+    def test_not_openstack_driver(self):
+        driver = DummyNodeDriver(0)
+        self.assertFalse(install_token_store(driver, self.get_store()))
+
+
+class MemoryTokenStoreTests(TokenStoreTestsMixin, unittest2.TestCase):
+    def get_store(self):
+        return MemoryTokenStore()
+
+
+class FileTokenStoreTests(TokenStoreTestsMixin, unittest2.TestCase):
+    def setUp(self):
+        super(FileTokenStoreTests, self).setUp()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        super(FileTokenStoreTests, self).tearDown()
+        shutil.rmtree(self.directory)
+
+    def get_store(self):
+        return FileTokenStore(self.directory)
+
+    def test_private_directory(self):
+        directory = os.path.join(self.directory, 'tokens')
+        FileTokenStore(directory)
+        self.assertEqual(0700, stat.S_IMODE(os.stat(directory).st_mode))
+        #directory created by other user or with open mode is not used
+        os.chmod(directory, 0777)
+        self.assertRaises(OSError, FileTokenStore, directory)
+        link = os.path.join(self.directory, 'link')
+        os.symlink(self.directory, link)
+        self.assertRaises(OSError, FileTokenStore, link)
+        with patch('os.getuid') as getuid:
+            getuid.return_value = os.getuid() + 1
+            self.assertRaises(OSError, FileTokenStore, self.directory)
+
+    def test_shared_between_stores(self):
+        # every worker process creates own store
+        self.assertEqual(self._count_auth(self._list_nodes,
+                                          self.get_store()), 1)
+        self.assertEqual(self._count_auth(self._list_nodes,
+                                          self.get_store()), 0)
+
+    def test_application_token_store(self):
+        LibcloudRestApp(tokens_dir=self.directory)
+        self.assertTrue(isinstance(drivers_pool.token_store, FileTokenStore))
+        #application without tokens directory does not keep previous store
+        LibcloudRestApp()
+        self.assertTrue(isinstance(drivers_pool.token_store,
+                                   MemoryTokenStore))
+
+
+if __name__ == '__main__':
+    unittest2.main()